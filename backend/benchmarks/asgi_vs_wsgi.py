@@ -0,0 +1,199 @@
+"""
+Нагрузочный бенчмарк эндпоинтов бота: WSGI (gunicorn) против ASGI (uvicorn).
+
+Держит N одновременных клиентов с keep-alive соединениями и смешанной
+нагрузкой бота (регистрация, пользователь и задачи по telegram_id,
+создание задачи, смена статуса), затем печатает запросы в секунду,
+p50/p99 задержки и число ошибок для каждого адреса. Оба сервера должны
+смотреть в одну базу:
+
+    docker compose --profile asgi up -d backend backend-asgi
+    cd backend && python benchmarks/asgi_vs_wsgi.py \\
+        --wsgi http://localhost:8000/api --asgi http://localhost:8001/api
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+STATUSES = ('pending', 'in_progress', 'completed')
+
+
+class Connection:
+    """Минимальный HTTP/1.1 клиент поверх asyncio с keep-alive."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.reader = self.writer = None
+
+    async def request(self, method, endpoint, params=None, data=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        target = f'{self.prefix}/{endpoint}'
+        if params:
+            target += '?' + urlencode(params)
+        body = json.dumps(data).encode() if data is not None else b''
+        self.writer.write(
+            f'{method} {target} HTTP/1.1\r\n'
+            f'Host: {self.host}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+        )
+        try:
+            status, payload = await self.read_response()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            await self.close()
+            raise
+        return status, payload
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('соединение закрыто сервером')
+        status = int(status_line.split()[1])
+        length, close = 0, False
+        while True:
+            line = (await self.reader.readline()).strip()
+            if not line:
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                close = True
+        payload = await self.reader.readexactly(length)
+        if close:
+            await self.close()
+        return status, payload
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def prepare(base_url, users, tasks_per_user):
+    """Регистрирует пользователей и задачи; возвращает id задач по юзерам."""
+    connection = Connection(base_url)
+    tasks = {}
+    for telegram_id in users:
+        await connection.request('POST', 'users/register_telegram/', data={
+            'telegram_id': telegram_id, 'username': f'bench_{telegram_id}'
+        })
+        tasks[telegram_id] = []
+        for number in range(tasks_per_user):
+            status, payload = await connection.request(
+                'POST', 'tasks/create_for_telegram/',
+                data={'telegram_id': telegram_id, 'title': f'Задача {number}'}
+            )
+            if status == 201:
+                tasks[telegram_id].append(json.loads(payload)['id'])
+    await connection.close()
+    return tasks
+
+
+def bot_requests(users, tasks):
+    """Бесконечная смесь запросов, похожая на трафик бота."""
+    rng = random.Random(0)
+    while True:
+        telegram_id = rng.choice(users)
+        roll = rng.random()
+        if roll < 0.35:
+            yield 'GET', 'tasks/by_telegram/', {'telegram_id': telegram_id}, None
+        elif roll < 0.55:
+            yield 'GET', 'users/by_telegram/', {'telegram_id': telegram_id}, None
+        elif roll < 0.75:
+            yield 'POST', 'users/register_telegram/', None, {
+                'telegram_id': telegram_id, 'username': f'bench_{telegram_id}'
+            }
+        elif roll < 0.90 and tasks[telegram_id]:
+            task_id = rng.choice(tasks[telegram_id])
+            yield 'PATCH', f'tasks/{task_id}/', None, {
+                'status': rng.choice(STATUSES)
+            }
+        else:
+            yield 'POST', 'tasks/create_for_telegram/', None, {
+                'telegram_id': telegram_id, 'title': 'Новая задача'
+            }
+
+
+async def client(base_url, workload, deadline, latencies, errors):
+    connection = Connection(base_url)
+    while time.perf_counter() < deadline:
+        method, endpoint, params, data = next(workload)
+        started = time.perf_counter()
+        try:
+            status, _ = await connection.request(method, endpoint, params, data)
+        except (OSError, asyncio.IncompleteReadError):
+            errors.append(None)
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status >= 400:
+            errors.append(status)
+    await connection.close()
+
+
+async def run(base_url, args):
+    users = [args.first_telegram_id + n for n in range(args.users)]
+    tasks = await prepare(base_url, users, args.tasks_per_user)
+    workload = bot_requests(users, tasks)
+
+    warmup = time.perf_counter() + args.warmup
+    await asyncio.gather(*(
+        client(base_url, workload, warmup, [], [])
+        for _ in range(args.concurrency)
+    ))
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        client(base_url, workload, deadline, latencies, errors)
+        for _ in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, sorted(latencies), len(errors)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--wsgi', default='http://localhost:8000/api')
+    parser.add_argument('--asgi', default='http://localhost:8001/api')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tasks-per-user', type=int, default=10)
+    parser.add_argument('--first-telegram-id', type=int, default=7_000_000_000)
+    args = parser.parse_args()
+
+    print(
+        f'{"сервер":<6} {"запр/с":>10} {"p50, мс":>10} '
+        f'{"p99, мс":>10} {"ошибки":>8}'
+    )
+    for name, base_url in (('wsgi', args.wsgi), ('asgi', args.asgi)):
+        rate, latencies, errors = asyncio.run(run(base_url, args))
+        print(
+            f'{name:<6} {rate:>10,.0f} {percentile(latencies, 0.5):>10.1f} '
+            f'{percentile(latencies, 0.99):>10.1f} {errors:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Настройки backend, Celery worker и beat для сквозного бенчмарка
+(bot/benchmarks/end_to_end.py).
+
+Всё локально и без внешних сервисов: база - файл SQLite в WAL-режиме
+(или PostgreSQL из обычных настроек при E2E_USE_POSTGRES=1), кеш -
+файлы, брокер Celery - транспорт filesystem поверх общего каталога,
+Bot API - заглушка по TELEGRAM_API_URL. Каталог задаёт E2E_DATA_DIR,
+а check_due_tasks запускается beat каждые E2E_SCAN_SECONDS секунд
+вместо ежеминутного расписания из базы.
+"""
+
+import os
+from pathlib import Path
+
+from todo_project.settings import *  # noqa
+
+DATA_DIR = Path(os.environ['E2E_DATA_DIR'])
+BROKER_DIR = DATA_DIR / 'broker'
+
+if os.environ.get('E2E_USE_POSTGRES') != '1':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(DATA_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 30,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL;',
+            },
+        },
+    }
+    REPLICA_DATABASES = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(DATA_DIR / 'cache'),
+    }
+}
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+
+CELERY_BROKER_URL = 'filesystem://'
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'data_folder_in': str(BROKER_DIR),
+    'data_folder_out': str(BROKER_DIR),
+    'processed_folder': str(DATA_DIR / 'processed'),
+    'store_processed': False,
+    # По умолчанию транспорт опрашивает каталог раз в секунду, а у
+    # напоминания два перехода через брокер
+    'polling_interval': 0.1,
+}
+CELERY_RESULT_BACKEND = None
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    'check-due-tasks': {
+        'task': 'tasks.tasks.check_due_tasks',
+        'schedule': float(os.environ.get('E2E_SCAN_SECONDS', '5')),
+    },
+}
@@ -0,0 +1,96 @@
+"""
+Микробенчмарк генерации ULID: пропускная способность и расщепления страниц.
+
+Сравнивает построчный `str(ULID())` с монотонным пакетным
+`generate_ulids(n)`: сколько идентификаторов в секунду выдаёт каждый
+способ и как часто вставка полученных ключей расщепляет листовые
+страницы B-дерева (упрощённая модель с PostgreSQL-подобным делением
+правой страницы по fillfactor):
+
+    cd backend && python benchmarks/ulid_generation.py --count 200000
+"""
+
+import argparse
+import bisect
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
+django.setup()
+
+from ulid import ULID  # noqa: E402
+
+from tasks.fields import generate_ulids  # noqa: E402
+
+
+def per_row(count):
+    return [str(ULID()) for _ in range(count)]
+
+
+def batched(count):
+    return generate_ulids(count)
+
+
+def ids_per_second(generator, count, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        generator(count)
+    return count * repeats / (time.perf_counter() - started)
+
+
+def page_splits(keys, page_size, fillfactor):
+    """
+    Вставляет ключи в модель листового уровня B-дерева.
+
+    Возвращает число расщеплений и среднее заполнение страниц. Полная
+    правая страница при вставке в конец делится по fillfactor, любая
+    другая - пополам.
+    """
+    pages = [[]]
+    maxima = ['']
+    splits = 0
+    for key in keys:
+        index = min(bisect.bisect_left(maxima, key), len(pages) - 1)
+        page = pages[index]
+        bisect.insort(page, key)
+        maxima[index] = page[-1]
+        if len(page) <= page_size:
+            continue
+        splits += 1
+        rightmost = index == len(pages) - 1 and page[-1] == key
+        middle = int(page_size * fillfactor) if rightmost else len(page) // 2
+        pages[index:index + 1] = [page[:middle], page[middle:]]
+        maxima[index:index + 1] = [page[middle - 1], page[-1]]
+    fill = sum(len(page) for page in pages) / (len(pages) * page_size)
+    return splits, fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=256)
+    parser.add_argument('--fillfactor', type=float, default=0.9)
+    args = parser.parse_args()
+
+    print(
+        f'{"способ":<10} {"id/с":>12} {"расщ./1000":>12} {"заполнение":>12}'
+    )
+    for name, generator in (('str(ULID)', per_row), ('batch', batched)):
+        rate = ids_per_second(generator, args.count, args.repeats)
+        splits, fill = page_splits(
+            generator(args.count), args.page_size, args.fillfactor
+        )
+        print(
+            f'{name:<10} {rate:>12,.0f} '
+            f'{splits * 1000 / args.count:>12.2f} {fill:>12.0%}'
+        )
+
+
+if __name__ == '__main__':
+    main()
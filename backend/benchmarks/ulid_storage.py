@@ -0,0 +1,118 @@
+"""
+Бенчмарк хранения ULID-ключей: varchar(26) против 16-байтового uuid.
+
+Создаёт во временных таблицах пары родитель/потомок с ULID-ключами
+в обоих форматах, сравнивает размер индексов первичного и внешнего
+ключа и время соединения по ключу. Требует PostgreSQL из настроек
+проекта:
+
+    cd backend && python benchmarks/ulid_storage.py --parents 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from ulid import ULID  # noqa: E402
+
+LAYOUTS = {
+    'varchar': 'varchar(26)',
+    'uuid': 'uuid',
+}
+
+
+def create_tables(cursor, name, column_type, parents, children):
+    """Создаёт и заполняет таблицы родителей и потомков для формата."""
+    cursor.execute(
+        f'CREATE TEMP TABLE bench_{name}_parent (id {column_type} PRIMARY KEY)'
+    )
+    cursor.execute(
+        f'CREATE TEMP TABLE bench_{name}_child ('
+        f'id {column_type} PRIMARY KEY, '
+        f'parent_id {column_type} NOT NULL '
+        f'REFERENCES bench_{name}_parent (id))'
+    )
+    cursor.execute(
+        f'CREATE INDEX bench_{name}_child_parent ON bench_{name}_child (parent_id)'
+    )
+    cursor.execute(
+        f'INSERT INTO bench_{name}_parent (id) SELECT unnest(%s::{column_type}[])',
+        [[value(ulid, name) for ulid in parents]]
+    )
+    cursor.execute(
+        f'INSERT INTO bench_{name}_child (id, parent_id) '
+        f'SELECT unnest(%s::{column_type}[]), unnest(%s::{column_type}[])',
+        [
+            [value(ulid, name) for ulid, _ in children],
+            [value(parent, name) for _, parent in children],
+        ]
+    )
+    cursor.execute(f'ANALYZE bench_{name}_parent')
+    cursor.execute(f'ANALYZE bench_{name}_child')
+
+
+def value(ulid, name):
+    """Представление ULID для конкретного формата хранения."""
+    return str(ulid.to_uuid()) if name == 'uuid' else str(ulid)
+
+
+def index_size(cursor, index):
+    cursor.execute('SELECT pg_relation_size(%s::regclass)', [index])
+    return cursor.fetchone()[0]
+
+
+def join_time(cursor, name, repeats):
+    """Среднее время соединения потомков с родителями, мс."""
+    sql = (
+        f'SELECT count(*) FROM bench_{name}_child c '
+        f'JOIN bench_{name}_parent p ON p.id = c.parent_id'
+    )
+    cursor.execute(sql)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        cursor.execute(sql)
+        cursor.fetchone()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--parents', type=int, default=50000)
+    parser.add_argument('--children-per-parent', type=int, default=4)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        sys.exit('Бенчмарк требует PostgreSQL.')
+
+    parents = [ULID() for _ in range(args.parents)]
+    children = [
+        (ULID(), parent)
+        for parent in parents
+        for _ in range(args.children_per_parent)
+    ]
+
+    print(f'{"формат":<8} {"PK, КБ":>10} {"FK, КБ":>10} {"join, мс":>10}')
+    with connection.cursor() as cursor:
+        for name, column_type in LAYOUTS.items():
+            create_tables(cursor, name, column_type, parents, children)
+            pk_size = index_size(cursor, f'bench_{name}_child_pkey')
+            fk_size = index_size(cursor, f'bench_{name}_child_parent')
+            elapsed = join_time(cursor, name, args.repeats)
+            print(
+                f'{name:<8} {pk_size / 1024:>10.0f} '
+                f'{fk_size / 1024:>10.0f} {elapsed:>10.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ Admin configuration for ToDo List application.
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Category, Task
+from .models import User, Category, Task, ArchivedTask, Change
 
 
 @admin.register(User)
@@ -53,3 +53,29 @@ class TaskAdmin(admin.ModelAdmin):
             'fields': ('categories',)
         }),
     )
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    """Административный интерфейс для модели ArchivedTask."""
+    list_display = ['title', 'user', 'status', 'created_at', 'archived_at']
+    list_filter = ['archived_at', 'created_at']
+    search_fields = ['title', 'description', 'user__username']
+    filter_horizontal = ['categories']
+    ordering = ['-archived_at']
+    date_hierarchy = 'archived_at'
+
+
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    """Административный интерфейс журнала изменений (только просмотр)."""
+    list_display = ['cursor', 'user', 'kind', 'object_id', 'action']
+    list_filter = ['kind', 'action']
+    search_fields = ['user__username']
+    ordering = ['-cursor']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
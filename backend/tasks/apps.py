@@ -5,3 +5,6 @@ class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
     verbose_name = 'Управление задачами'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,191 @@
+"""
+Асинхронные версии горячих эндпоинтов Telegram-бота.
+
+Подключаются вместо синхронных при ASYNC_BOT_ENDPOINTS=1 и рассчитаны на
+ASGI-сервер (профиль `asgi` в docker-compose): пока запрос ждёт PostgreSQL,
+воркер обслуживает другие запросы. Пути, формат запросов и ответов
+совпадают с синхронными действиями DRF, поэтому бот ничего не замечает.
+"""
+
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import ValidationError
+
+from .fields import is_valid_ulid
+from .models import User, Category, Task, ArchivedTask
+from .serializers import (
+    UserSerializer, TaskSerializer, TaskCreateSerializer,
+    TaskListSerializer, UserRegistrationSerializer
+)
+from .views import (
+    NewestFirst, TaskViewSet, filter_created_range, include_archived,
+    parse_telegram_id
+)
+
+task_detail_view = TaskViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+})
+
+
+class BadRequest(Exception):
+    """Ошибка разбора запроса; `detail` уходит клиенту с кодом 400."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def request_data(request):
+    """Тело запроса: JSON от бота или обычная форма."""
+    if request.content_type != 'application/json':
+        return request.POST
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError as exc:
+        raise BadRequest({'detail': f'JSON parse error - {exc}'})
+
+
+def require_telegram_id(params):
+    telegram_id = params.get('telegram_id')
+    if not telegram_id:
+        raise BadRequest({'error': 'telegram_id is required'})
+    return parse_telegram_id(telegram_id)
+
+
+def bot_endpoint(*methods):
+    """
+    Обёртка асинхронного эндпоинта: метод, CSRF и ошибки как в DRF.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if methods and request.method not in methods:
+                return JsonResponse(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=405
+                )
+            try:
+                return await view(request, *args, **kwargs)
+            except BadRequest as exc:
+                return JsonResponse(exc.detail, status=400)
+            except ValidationError as exc:
+                return JsonResponse(exc.detail, status=400)
+            except Http404 as exc:
+                return JsonResponse({'detail': str(exc)}, status=404)
+        return wrapper
+    return decorator
+
+
+def create_user(data):
+    """Создание пользователя: проверки уникальности остаются синхронными."""
+    serializer = UserRegistrationSerializer(data=data)
+    if serializer.is_valid():
+        return UserSerializer(serializer.save()).data, None
+    return None, serializer.errors
+
+
+@bot_endpoint('POST')
+async def register_telegram(request):
+    """Регистрация пользователя через Telegram."""
+    data = request_data(request)
+    telegram_id = require_telegram_id(data)
+
+    user = await User.objects.filter(telegram_id=telegram_id).afirst()
+    if user:
+        return JsonResponse(UserSerializer(user).data)
+
+    user_data, errors = await sync_to_async(create_user)({
+        'username': data.get('username') or f'telegram_{telegram_id}',
+        'telegram_id': telegram_id
+    })
+    if errors:
+        return JsonResponse(errors, status=400)
+    return JsonResponse(user_data, status=201)
+
+
+@bot_endpoint('GET')
+async def user_by_telegram(request):
+    """Получение пользователя по Telegram ID."""
+    telegram_id = require_telegram_id(request.GET)
+    user = await aget_object_or_404(User, telegram_id=telegram_id)
+    return JsonResponse(UserSerializer(user).data)
+
+
+@bot_endpoint('GET')
+async def tasks_by_telegram(request):
+    """Получение задач пользователя по Telegram ID."""
+    telegram_id = require_telegram_id(request.GET)
+
+    tasks = filter_created_range(
+        Task.objects.filter(user__telegram_id=telegram_id)
+        .order_by('-created_at'),
+        request.GET
+    )
+    if include_archived(request.GET):
+        # Слияние уже упорядоченных выборок, как в синхронном by_telegram
+        tasks = await sync_to_async(list)(NewestFirst(
+            tasks,
+            filter_created_range(
+                ArchivedTask.objects.filter(user__telegram_id=telegram_id),
+                request.GET
+            )
+        ))
+    else:
+        tasks = [task async for task in tasks]
+
+    return JsonResponse(TaskListSerializer(tasks, many=True).data, safe=False)
+
+
+@bot_endpoint('POST')
+async def create_for_telegram(request):
+    """Создание задачи для пользователя по Telegram ID."""
+    data = request_data(request)
+    telegram_id = require_telegram_id(data)
+    user = await aget_object_or_404(User, telegram_id=telegram_id)
+
+    serializer = TaskCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    fields = dict(serializer.validated_data)
+    category_ids = [
+        c for c in fields.pop('category_ids', []) if is_valid_ulid(c)
+    ]
+    task = await Task.objects.acreate(user=user, **fields)
+    if category_ids:
+        await task.categories.aset([
+            category async for category in Category.objects.filter(
+                id__in=category_ids, user=user
+            )
+        ])
+    return JsonResponse(TaskSerializer(task).data, status=201)
+
+
+@bot_endpoint()
+async def task_detail(request, pk):
+    """
+    Задача по id; смена статуса (PATCH только со status) - асинхронно.
+
+    Остальные операции передаются синхронному TaskViewSet.
+    """
+    if request.method == 'PATCH' and request.content_type == 'application/json':
+        data = request_data(request)
+        if isinstance(data, dict) and set(data) == {'status'}:
+            task = await aget_object_or_404(Task, pk=pk)
+            serializer = TaskSerializer(task, data=data, partial=True)
+            if not serializer.is_valid():
+                return JsonResponse(serializer.errors, status=400)
+            task.status = serializer.validated_data['status']
+            await task.asave(update_fields=['status', 'updated_at'])
+            return JsonResponse(TaskSerializer(task).data)
+
+    return await sync_to_async(task_detail_view)(request, pk=pk)
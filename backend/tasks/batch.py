@@ -0,0 +1,111 @@
+"""
+Пакетное выполнение запросов к API в одном HTTP-запросе.
+
+Подзапросы `{method, path, body}` разрешаются через URLconf проекта и
+выполняются по порядку внутри процесса теми же view, что и обычные
+запросы, поэтому проверки и формат ответов не дублируются. Путь
+указывается относительно корня API (`tasks/by_telegram/?telegram_id=1`).
+"""
+
+import json
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+API_PREFIX = '/api/'
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class BatchError(ValueError):
+    """Некорректное описание подзапроса."""
+
+
+def parse_subrequest(spec):
+    """Проверяет описание подзапроса; возвращает (метод, путь, query, тело)."""
+    if not isinstance(spec, dict):
+        raise BatchError('Each request must be an object.')
+    method = str(spec.get('method', 'GET')).upper()
+    if method not in METHODS:
+        raise BatchError(f'Unsupported method: {method}.')
+
+    parts = urlsplit(str(spec.get('path', '')))
+    path = parts.path.lstrip('/')
+    if path.startswith(API_PREFIX.strip('/') + '/'):
+        path = path[len(API_PREFIX) - 1:]
+    if not path or parts.scheme or parts.netloc:
+        raise BatchError('Path must be relative to the API root.')
+    return method, API_PREFIX + path, parts.query, spec.get('body')
+
+
+def build_request(parent, method, path, query, body):
+    """Внутренний запрос с заголовками и пользователем родительского."""
+    request = HttpRequest()
+    request.method = method
+    request.path = request.path_info = path
+    request.META = {
+        key: value for key, value in parent.META.items()
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING')
+    }
+    request.META.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+    })
+    request.GET = QueryDict(query)
+    content = b'' if body is None else json.dumps(body).encode()
+    request.META['CONTENT_TYPE'] = 'application/json'
+    request.META['CONTENT_LENGTH'] = str(len(content))
+    request._body = content
+    request._stream = BytesIO(content)
+    request._read_started = False
+    for attribute in ('user', 'session'):
+        if hasattr(parent, attribute):
+            setattr(request, attribute, getattr(parent, attribute))
+    return request
+
+
+def response_body(response):
+    if hasattr(response, 'render'):
+        response.render()
+    if not response.content:
+        return None
+    try:
+        return json.loads(response.content)
+    except ValueError:
+        return response.content.decode(response.charset, 'replace')
+
+
+def run_subrequest(parent, spec):
+    """Выполняет подзапрос; возвращает {status, body}."""
+    method, path, query, body = parse_subrequest(spec)
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+    if match.url_name == 'batch':
+        return {
+            'status': 400,
+            'body': {'error': 'Nested batch requests are not allowed.'}
+        }
+
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    request = build_request(parent, method, path, query, body)
+    response = view(request, *match.args, **match.kwargs)
+    return {'status': response.status_code, 'body': response_body(response)}
+
+
+def validate_batch(requests):
+    if not isinstance(requests, list) or not requests:
+        raise BatchError('requests must be a non-empty list.')
+    if len(requests) > settings.BATCH_MAX_REQUESTS:
+        raise BatchError(
+            f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.'
+        )
+    for spec in requests:
+        parse_subrequest(spec)
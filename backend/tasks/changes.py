@@ -0,0 +1,138 @@
+"""
+Журнал изменений для инкрементальной синхронизации клиентов.
+
+Сигналы дописывают в Change запись о каждом создании, изменении или
+удалении задачи и категории. Клиент хранит курсор (ULID последней
+прочитанной записи) и забирает только изменения после него:
+
+1. `tasks/changes/?telegram_id=` без since - текущий курсор;
+2. полные списки задач и категорий - начальное состояние;
+3. `tasks/changes/?telegram_id=&since=<курсор>` - дельты.
+
+Записи новее CHANGE_FEED_LAG_SECONDS не выдаются: ULID из разных
+процессов могут зафиксироваться не в порядке курсоров, и короткая
+задержка не даёт клиенту перескочить ещё не видимую запись.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+
+from .fields import generate_ulids, ulid_floor
+from .models import Category, Change, Task
+from .serializers import CategorySerializer, TaskSerializer
+
+_suppressed = ContextVar('change_log_suppressed', default=False)
+
+
+class CursorExpired(Exception):
+    """Курсор старше срока хранения журнала - нужна полная синхронизация."""
+
+
+@contextmanager
+def suppress_change_log():
+    """Отключает запись из сигналов (например, при пакетной записи журнала)."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def record_changes(user_id, kind, object_ids, action, using=None):
+    """Дописывает в журнал записи об объектах одним запросом."""
+    object_ids = list(object_ids)
+    if _suppressed.get() or not object_ids:
+        return
+    Change.objects.db_manager(using).bulk_create([
+        Change(
+            cursor=cursor,
+            user_id=user_id,
+            kind=kind,
+            object_id=object_id,
+            action=action
+        )
+        for cursor, object_id in zip(generate_ulids(len(object_ids)), object_ids)
+    ])
+
+
+def record_change(instance, action, using=None):
+    kind = Change.Kind.TASK if isinstance(instance, Task) else Change.Kind.CATEGORY
+    record_changes(instance.user_id, kind, [instance.id], action, using)
+
+
+def retention_floor(now):
+    return ulid_floor(now - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS))
+
+
+def changes_since(user, since, limit, now):
+    """
+    Изменения пользователя после курсора `since`.
+
+    Несколько записей об одном объекте сворачиваются в одну с последним
+    курсором; для созданных и изменённых объектов отдаётся текущее
+    состояние, для удалённых - tombstone без данных. Возвращает
+    {changes, cursor, has_more}; курсор передаётся в следующий запрос.
+    """
+    upper = ulid_floor(now - timedelta(seconds=settings.CHANGE_FEED_LAG_SECONDS))
+    if since is None:
+        return {'changes': [], 'cursor': upper, 'has_more': False}
+    if since < retention_floor(now):
+        raise CursorExpired(since)
+
+    entries = list(
+        Change.objects.filter(
+            user=user, cursor__gt=since, cursor__lt=upper
+        ).order_by('cursor')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for entry in entries:
+        key = (entry.kind, entry.object_id)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    def upserted(kind):
+        return [
+            object_id for (entry_kind, object_id), entry in latest.items()
+            if entry_kind == kind and entry.action == Change.Action.UPSERT
+        ]
+
+    objects = {
+        Change.Kind.TASK: Task.objects.filter(user=user).in_bulk(
+            upserted(Change.Kind.TASK)
+        ),
+        Change.Kind.CATEGORY: Category.objects.filter(user=user).in_bulk(
+            upserted(Change.Kind.CATEGORY)
+        ),
+    }
+    serializers = {
+        Change.Kind.TASK: TaskSerializer,
+        Change.Kind.CATEGORY: CategorySerializer,
+    }
+
+    changes = []
+    for (kind, object_id), entry in latest.items():
+        instance = None
+        if entry.action == Change.Action.UPSERT:
+            instance = objects[kind].get(object_id)
+        changes.append({
+            'cursor': entry.cursor,
+            'kind': kind,
+            'id': object_id,
+            'action': Change.Action.UPSERT if instance else Change.Action.DELETE,
+            'data': serializers[kind](instance).data if instance else None,
+        })
+
+    cursor = entries[-1].cursor if has_more else upper
+    return {'changes': changes, 'cursor': cursor, 'has_more': has_more}
+
+
+def prune_changes(now):
+    """Удаляет записи старше CHANGE_LOG_RETENTION_DAYS; возвращает их число."""
+    deleted, _ = Change.objects.filter(cursor__lt=retention_floor(now)).delete()
+    return deleted
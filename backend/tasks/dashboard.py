@@ -0,0 +1,97 @@
+"""
+Сводка «домашнего экрана» бота: всё, что рисует окно списка задач.
+
+Сводка собирается фиксированным числом запросов (пользователь, счётчики
+по статусам, первая страница задач, категории) и кешируется по версии
+пользователя. Версия хранится в кеше по id пользователя и увеличивается
+сигналами после фиксации любой записи его данных, поэтому устаревшая сводка
+никогда не отдаётся, а старые версии просто истекают по TTL. Из кеша
+сводка отдаётся за один запрос - поиск пользователя по telegram_id.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import User, Task
+from .serializers import (
+    UserSerializer, CategoryListSerializer, DashboardTaskSerializer
+)
+
+VERSION_KEY = 'dashboard:version:{}'
+DASHBOARD_KEY = 'dashboard:{}:{}'
+
+
+def dashboard_version(user_id):
+    """
+    Текущая версия данных пользователя.
+
+    Начальная версия - время в микросекундах: если ключ версии вытеснен
+    из кеша, новая версия не совпадёт с версиями старых сводок.
+    """
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    try:
+        cache.incr(VERSION_KEY.format(user_id))
+    except ValueError:
+        # Версии нет - сводка не кешировалась или уже вытеснена
+        pass
+
+
+def invalidate_dashboard(user_id):
+    """
+    Сбрасывает сводку пользователя, увеличивая его версию.
+
+    Версия увеличивается после фиксации транзакции: иначе параллельный
+    запрос мог бы собрать сводку из ещё не изменённых данных и сохранить
+    её под новой версией, и она отдавалась бы до истечения TTL.
+    """
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+def build_dashboard(user):
+    """Сводка пользователя: ещё три запроса к базе."""
+    tasks = Task.objects.filter(user=user)
+    counts = dict(
+        tasks.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    status_counts = {value: counts.get(value, 0) for value in Task.Status.values}
+    page = tasks.only(
+        'id', 'title', 'description', 'status', 'category_snapshot',
+        'due_date', 'created_at'
+    ).order_by('-created_at')[:settings.DASHBOARD_TASKS_LIMIT]
+
+    return {
+        'user': UserSerializer(user).data,
+        'tasks': DashboardTaskSerializer(page, many=True).data,
+        'tasks_count': sum(status_counts.values()),
+        'status_counts': status_counts,
+        'categories': CategoryListSerializer(
+            user.categories.all(), many=True
+        ).data,
+    }
+
+
+def get_dashboard(telegram_id):
+    """Сводка из кеша или из базы; None, если пользователя нет."""
+    user = User.objects.filter(telegram_id=telegram_id).first()
+    if user is None:
+        return None
+
+    key = DASHBOARD_KEY.format(user.id, dashboard_version(user.id))
+    dashboard = cache.get(key)
+    if dashboard is not None:
+        return dashboard
+    dashboard = build_dashboard(user)
+    cache.set(key, dashboard, settings.DASHBOARD_CACHE_SECONDS)
+    return dashboard
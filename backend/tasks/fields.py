@@ -4,13 +4,128 @@ ULID (Universally Unique Lexicographically Sortable Identifier) использу
 вместо UUID, random, стандартных функций Postgres и целочисленных инкрементов.
 """
 
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core import exceptions
 from django.db import models
 from ulid import ULID
+from ulid.base32 import ENCODE, encode_timestamp
+
+RANDOMNESS_BITS = 80
+RANDOMNESS_MAX = (1 << RANDOMNESS_BITS) - 1
+LOW_BITS = 20
+LOW_MASK = (1 << LOW_BITS) - 1
+TIMESTAMP_MAX = (1 << 48) - 1
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Две base32-цифры на каждые 10 бит случайной части
+BASE32_PAIRS = [a + b for a in ENCODE for b in ENCODE]
+
+_lock = threading.Lock()
+_last_milliseconds = 0
+_last_randomness = 0
+
+
+def _reset_monotonic_state():
+    """Сбрасывает состояние генератора (после fork у потомка своё)."""
+    global _last_milliseconds, _last_randomness
+    _last_milliseconds = 0
+    _last_randomness = 0
+
+
+os.register_at_fork(after_in_child=_reset_monotonic_state)
+
+
+def _reserve(count):
+    """
+    Резервирует `count` последовательных значений случайной части.
+
+    Внутри одной миллисекунды случайная часть увеличивается на единицу,
+    в новой миллисекунде берётся заново. Если значений не хватает до
+    переполнения, временная метка сдвигается на миллисекунду вперёд.
+    """
+    global _last_milliseconds, _last_randomness
+    with _lock:
+        milliseconds = time.time_ns() // 1_000_000
+        if milliseconds <= _last_milliseconds:
+            milliseconds = _last_milliseconds
+            randomness = _last_randomness + 1
+        else:
+            randomness = int.from_bytes(os.urandom(10), 'big')
+        if randomness + count - 1 > RANDOMNESS_MAX:
+            milliseconds += 1
+            randomness = int.from_bytes(os.urandom(10), 'big') >> 1
+        _last_milliseconds = milliseconds
+        _last_randomness = randomness + count - 1
+    return milliseconds, randomness
+
+
+def generate_ulids(count):
+    """
+    Генерирует `count` строго возрастающих ULID одной пачкой.
+
+    Вставка монотонных ключей дописывает правую страницу B-дерева
+    вместо случайных вставок внутрь индекса. Временная метка и старшие
+    60 бит случайной части кодируются один раз на блок, в цикле
+    кодируются только младшие 20 бит.
+    """
+    if count <= 0:
+        return []
+    milliseconds, randomness = _reserve(count)
+    timestamp = encode_timestamp(milliseconds.to_bytes(6, 'big'))
+    pairs = BASE32_PAIRS
+
+    ulids = []
+    append = ulids.append
+    end = randomness + count
+    while randomness < end:
+        high = randomness >> LOW_BITS
+        head = timestamp + ''.join(
+            pairs[(high >> shift) & 1023] for shift in (50, 40, 30, 20, 10, 0)
+        )
+        block_end = min(end, (high + 1) << LOW_BITS)
+        low = randomness & LOW_MASK
+        for value in range(low, low + block_end - randomness):
+            append(head + pairs[value >> 10] + pairs[value & 1023])
+        randomness = block_end
+    return ulids
 
 
 def generate_ulid():
     """Генерирует новый ULID."""
-    return str(ULID())
+    return generate_ulids(1)[0]
+
+
+def ulid_floor(moment):
+    """
+    Возвращает наименьший ULID для момента времени `moment`.
+
+    Все ULID, созданные не раньше `moment`, больше либо равны результату,
+    поэтому условие по времени создания сводится к диапазону первичного
+    ключа. Моменты вне диапазона 48-битной метки (до 1970 года и после
+    10889) приводятся к его границам.
+    """
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    # Целочисленно: умножение float на 1000 может занизить метку на 1 мс
+    milliseconds = (moment - EPOCH) // timedelta(milliseconds=1)
+    milliseconds = min(max(milliseconds, 0), TIMESTAMP_MAX)
+    return str(ULID.from_bytes(milliseconds.to_bytes(6, 'big') + bytes(10)))
+
+
+def is_valid_ulid(value):
+    """Проверяет, что значение - корректная строка ULID."""
+    if not isinstance(value, str) or len(value) != 26:
+        return False
+    try:
+        ULID.from_str(value.upper())
+    except ValueError:
+        return False
+    return True
 
 
 class ULIDField(models.CharField):
@@ -18,8 +133,24 @@ class ULIDField(models.CharField):
     Поле для хранения ULID как первичного ключа.
     ULID - это лексикографически сортируемый уникальный идентификатор,
     который содержит временную метку и случайную часть.
+
+    В Python и в API значение остаётся канонической строкой Crockford
+    base32 из 26 символов, а в базе хранится 16 байт: нативный `uuid`
+    в PostgreSQL и бинарная строка в остальных СУБД. Порядок байтов
+    совпадает с порядком строк, поэтому сортировка по ключу не меняется.
     """
 
+    description = 'ULID (16 байт)'
+
+    binary_db_types = {
+        'postgresql': 'uuid',
+        'mysql': 'binary(16)',
+        'oracle': 'RAW(16)',
+    }
+    default_error_messages = {
+        'invalid': '“%(value)s” is not a valid ULID.',
+    }
+
     def __init__(self, *args, **kwargs):
         kwargs.setdefault('max_length', 26)
         kwargs.setdefault('default', generate_ulid)
@@ -35,3 +166,50 @@ class ULIDField(models.CharField):
         if kwargs.get('editable') is False:
             del kwargs['editable']
         return name, path, args, kwargs
+
+    def db_type(self, connection):
+        return self.binary_db_types.get(connection.vendor, 'blob')
+
+    def cast_db_type(self, connection):
+        return self.db_type(connection)
+
+    def to_python(self, value):
+        if value is None or value == '':
+            return value
+        if isinstance(value, ULID):
+            return str(value)
+        if isinstance(value, uuid.UUID):
+            return str(ULID.from_uuid(value))
+        if isinstance(value, (bytes, memoryview)):
+            value = bytes(value)
+            if len(value) == 16:
+                return str(ULID.from_bytes(value))
+        elif is_valid_ulid(value):
+            return str(ULID.from_str(value.upper()))
+        raise exceptions.ValidationError(
+            self.error_messages['invalid'],
+            code='invalid',
+            params={'value': value},
+        )
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or value == '':
+            return None
+        return ULID.from_str(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return None
+        if not isinstance(value, ULID):
+            value = ULID.from_str(self.to_python(value))
+        if connection.vendor == 'postgresql':
+            return value.to_uuid()
+        return value.bytes
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.to_python(value)
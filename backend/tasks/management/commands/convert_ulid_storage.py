@@ -0,0 +1,129 @@
+"""
+Перевод ULID-ключей PostgreSQL из varchar(26) в нативный uuid.
+
+Нужен для баз, созданных до перехода ULIDField на 16-байтовое хранение.
+Все первичные и внешние ключи ULID конвертируются в одной транзакции:
+внешние ключи снимаются, тип колонок меняется с декодированием строки
+Crockford base32 прямо в SQL, после чего ограничения восстанавливаются.
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from tasks.fields import ULIDField
+
+ULID_TO_UUID_SQL = """
+CREATE OR REPLACE FUNCTION pg_temp.ulid_to_uuid(value text) RETURNS uuid AS $$
+DECLARE
+    alphabet CONSTANT text := '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+    number numeric := 0;
+    hex text := '';
+BEGIN
+    FOR i IN 1..26 LOOP
+        number := number * 32 + strpos(alphabet, upper(substr(value, i, 1))) - 1;
+    END LOOP;
+    FOR i IN 1..32 LOOP
+        hex := substr('0123456789abcdef', mod(number, 16)::int + 1, 1) || hex;
+        number := div(number, 16);
+    END LOOP;
+    RETURN hex::uuid;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT
+"""
+
+
+def ulid_columns():
+    """Возвращает пары (таблица, колонка) для всех ULID-ключей проекта."""
+    columns = []
+    for model in apps.get_models(include_auto_created=True):
+        for field in model._meta.local_concrete_fields:
+            target = field.target_field if field.is_relation else field
+            if isinstance(target, ULIDField):
+                columns.append((model._meta.db_table, field.column))
+    return columns
+
+
+class Command(BaseCommand):
+    help = 'Конвертирует ULID-ключи PostgreSQL из varchar(26) в uuid.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать SQL, не выполняя его.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Конвертация требуется только для PostgreSQL.')
+
+        with connection.cursor() as cursor:
+            statements = self.build_statements(cursor)
+
+        if not statements:
+            self.stdout.write('ULID-ключи уже хранятся как uuid.')
+            return
+
+        if options['dry_run']:
+            for sql in statements:
+                self.stdout.write(f'{sql};')
+            return
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        self.stdout.write(self.style.SUCCESS(
+            f'Конвертировано колонок: {len(self.pending)}'
+        ))
+
+    def build_statements(self, cursor):
+        """Собирает SQL конвертации для колонок, ещё хранящих varchar."""
+        qn = connection.ops.quote_name
+        self.pending = []
+        for table, column in ulid_columns():
+            cursor.execute(
+                'SELECT data_type FROM information_schema.columns '
+                'WHERE table_schema = current_schema() '
+                'AND table_name = %s AND column_name = %s',
+                [table, column]
+            )
+            row = cursor.fetchone()
+            if row and row[0] == 'character varying':
+                self.pending.append((table, column))
+
+        if not self.pending:
+            return []
+
+        tables = sorted({table for table, _ in self.pending})
+        cursor.execute(
+            'SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) '
+            'FROM pg_constraint '
+            "WHERE contype = 'f' AND confrelid = ANY(%s::regclass[])",
+            [tables]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            'SELECT indexname FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = ANY(%s) '
+            "AND indexdef LIKE '%%varchar_pattern_ops%%'",
+            [tables]
+        )
+        like_indexes = [row[0] for row in cursor.fetchall()]
+
+        statements = [ULID_TO_UUID_SQL.strip()]
+        statements += [
+            f'ALTER TABLE {table} DROP CONSTRAINT {qn(name)}'
+            for table, name, _ in foreign_keys
+        ]
+        statements += [f'DROP INDEX {qn(name)}' for name in like_indexes]
+        statements += [
+            f'ALTER TABLE {qn(table)} ALTER COLUMN {qn(column)} '
+            f'TYPE uuid USING pg_temp.ulid_to_uuid({qn(column)})'
+            for table, column in self.pending
+        ]
+        statements += [
+            f'ALTER TABLE {table} ADD CONSTRAINT {qn(name)} {definition}'
+            for table, name, definition in foreign_keys
+        ]
+        return statements
@@ -0,0 +1,50 @@
+"""
+Перевод таблицы задач PostgreSQL в секционированную по диапазонам ULID.
+
+Существующие строки остаются на месте в секции `<table>_legacy`, новые
+попадают в месячные секции, которые затем поддерживает периодическая
+задача maintain_task_partitions.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.partitions import (
+    is_partitioned, maintenance_statements, partition_table_statements
+)
+
+
+class Command(BaseCommand):
+    help = 'Секционирует таблицу задач PostgreSQL по месяцам диапазонами ULID.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать SQL, не выполняя его.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование поддерживается только в PostgreSQL.')
+
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            if is_partitioned(cursor, Task._meta.db_table):
+                self.stdout.write('Таблица задач уже секционирована.')
+                return
+            statements = partition_table_statements(cursor, now)
+
+        if options['dry_run']:
+            for sql in statements:
+                self.stdout.write(f'{sql};')
+            return
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+            for sql in maintenance_statements(cursor, now):
+                cursor.execute(sql)
+        self.stdout.write(self.style.SUCCESS('Таблица задач секционирована.'))
@@ -0,0 +1,24 @@
+"""
+Полный пересчёт снимков категорий задач (Task.category_snapshot).
+
+Нужен один раз после добавления колонки в существующую базу; дальше
+снимки поддерживаются сигналами.
+"""
+
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task, ArchivedTask
+from tasks.snapshots import refresh_category_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает снимки категорий всех задач.'
+
+    def handle(self, *args, **options):
+        for model in (Task, ArchivedTask):
+            count = refresh_category_snapshots(
+                model, model.objects.values_list('id', flat=True).iterator()
+            )
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: пересчитано {count}'
+            )
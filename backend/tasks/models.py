@@ -2,11 +2,21 @@
 Models for ToDo List application.
 """
 
+from zoneinfo import ZoneInfo, available_timezones
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from .fields import ULIDField, generate_ulid
 
 
+def validate_timezone(value):
+    """Имя часового пояса из базы IANA, например Europe/Moscow."""
+    if value and value not in available_timezones():
+        raise ValidationError(f'Unknown time zone: {value}')
+
+
 class User(AbstractUser):
     """
     Расширенная модель пользователя с ULID как первичным ключом.
@@ -19,6 +29,13 @@ class User(AbstractUser):
         blank=True,
         verbose_name='Telegram ID'
     )
+    timezone = models.CharField(
+        max_length=64,
+        blank=True,
+        validators=[validate_timezone],
+        verbose_name='Часовой пояс',
+        help_text='IANA, например Europe/Moscow; пусто - часовой пояс проекта'
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -27,6 +44,12 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def tzinfo(self):
+        """Часовой пояс пользователя или проекта (America/Adak)."""
+        if self.timezone:
+            return ZoneInfo(self.timezone)
+        return timezone.get_default_timezone()
+
 
 class Category(models.Model):
     """
@@ -63,6 +86,21 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'name', 'color'} <= set(field_names):
+            instance._loaded_snapshot = instance.snapshot()
+        return instance
+
+    def snapshot(self):
+        """Представление категории в Task.category_snapshot."""
+        return {'id': self.id, 'name': self.name, 'color': self.color}
+
+    def snapshot_changed(self):
+        """Изменились ли имя или цвет с момента загрузки из базы."""
+        return getattr(self, '_loaded_snapshot', None) != self.snapshot()
+
 
 class Task(models.Model):
     """
@@ -106,6 +144,13 @@ class Task(models.Model):
         blank=True,
         verbose_name='Категории'
     )
+    category_snapshot = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name='Снимок категорий',
+        help_text='Денормализованный список [{id, name, color}] категорий задачи'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания'
@@ -123,6 +168,142 @@ class Task(models.Model):
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
         ordering = ['-created_at']
+        indexes = [
+            # Окна по сроку (upcoming/overdue, due_before/due_after):
+            # частичный индекс только по задачам со сроком
+            models.Index(
+                fields=['user', 'due_date'],
+                name='task_user_due_date_idx',
+                condition=models.Q(due_date__isnull=False),
+            ),
+            # Проверка сроков check_due_tasks: только задачи без
+            # отправленного напоминания
+            models.Index(
+                fields=['due_date'],
+                name='task_due_unnotified_idx',
+                condition=models.Q(
+                    due_date__isnull=False, notification_sent=False
+                ),
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ArchivedTask(models.Model):
+    """
+    Архивная (холодная) копия завершённой задачи.
+
+    Задачи переносятся сюда периодической задачей archive_completed_tasks,
+    чтобы основная таблица Task содержала только актуальную работу.
+    Поля повторяют Task, даты копируются без изменений.
+    """
+    id = ULIDField(primary_key=True, default=generate_ulid)
+    title = models.CharField(
+        max_length=255,
+        verbose_name='Название'
+    )
+    description = models.TextField(
+        blank=True,
+        verbose_name='Описание'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Task.Status.choices,
+        default=Task.Status.COMPLETED,
+        verbose_name='Статус'
+    )
+    due_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата исполнения'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        verbose_name='Пользователь'
+    )
+    categories = models.ManyToManyField(
+        Category,
+        related_name='archived_tasks',
+        blank=True,
+        verbose_name='Категории'
+    )
+    category_snapshot = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name='Снимок категорий'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата обновления'
+    )
+    notification_sent = models.BooleanField(
+        default=False,
+        verbose_name='Уведомление отправлено'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата архивации'
+    )
+
+    class Meta:
+        verbose_name = 'Архивная задача'
+        verbose_name_plural = 'Архивные задачи'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.title
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений задач и категорий пользователя.
+
+    Журнал только дополняется; курсор - монотонный ULID, поэтому записи
+    пользователя читаются диапазоном по индексу (user, cursor).
+    Удаление записывается как tombstone (action=delete).
+    """
+
+    class Kind(models.TextChoices):
+        TASK = 'task', 'Задача'
+        CATEGORY = 'category', 'Категория'
+
+    class Action(models.TextChoices):
+        UPSERT = 'upsert', 'Создание или изменение'
+        DELETE = 'delete', 'Удаление'
+
+    cursor = ULIDField(primary_key=True, default=generate_ulid)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='changes',
+        verbose_name='Пользователь'
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=Kind.choices,
+        verbose_name='Тип объекта'
+    )
+    object_id = ULIDField(default=None, verbose_name='ID объекта')
+    action = models.CharField(
+        max_length=10,
+        choices=Action.choices,
+        verbose_name='Действие'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ['cursor']
+        indexes = [
+            models.Index(fields=['user', 'cursor'], name='change_user_cursor_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} {self.action}'
@@ -0,0 +1,260 @@
+"""
+Декларативное секционирование таблицы задач в PostgreSQL.
+
+Таблица Task секционируется по диапазонам первичного ключа: первые 48 бит
+ULID - время создания, поэтому месячная секция - это диапазон
+[ulid_floor(начало месяца), ulid_floor(начало следующего месяца)).
+Ключ секционирования совпадает с первичным ключом, так что модель Django
+и внешние ключи не меняются. Лишние секции отсекают только фильтры по
+диапазону id (created_after/created_before); списки задач пользователя
+и проверка сроков фильтруют по user и due_date и просматривают все
+секции. Секционирование нужно для хранения: старые секции отсоединяются
+целиком, без массового DELETE.
+
+Секционирование включается настройкой TASK_PARTITIONING и переводом
+таблицы командой `partition_tasks`. Без него (в том числе в тестах на
+SQLite) таблица остаётся обычной, а обслуживание секций ничего не делает.
+"""
+
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from ulid import ULID
+
+from .fields import ulid_floor
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME_RE = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def month_start(moment, offset=0):
+    """Начало месяца (UTC) со сдвигом на `offset` месяцев."""
+    moment = moment.astimezone(dt_timezone.utc)
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_bound(moment):
+    """Граница секции: наименьший ULID момента в виде uuid-литерала."""
+    return str(ULID.from_str(ulid_floor(moment)).to_uuid())
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def partition_month(table, name):
+    """Месяц секции по её имени или None для чужих таблиц."""
+    match = PARTITION_NAME_RE.search(name)
+    if not name.startswith(table) or not match:
+        return None
+    return datetime(
+        int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc
+    )
+
+
+def create_partition_sql(table, month):
+    qn = connection.ops.quote_name
+    return (
+        f'CREATE TABLE IF NOT EXISTS {qn(partition_name(table, month))} '
+        f'PARTITION OF {qn(table)} FOR VALUES '
+        f"FROM ('{partition_bound(month)}') "
+        f"TO ('{partition_bound(month_start(month, 1))}')"
+    )
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def default_has_rows(cursor, table, month):
+    """Есть ли в секции по умолчанию строки месяца `month`."""
+    default = connection.ops.quote_name(default_partition_name(table))
+    cursor.execute(
+        f'SELECT 1 FROM {default} WHERE id >= %s AND id < %s LIMIT 1',
+        [partition_bound(month), partition_bound(month_start(month, 1))]
+    )
+    return cursor.fetchone() is not None
+
+
+def move_default_rows_sql(table, month):
+    """
+    SQL создания секции месяца, строки которого уже попали в секцию по
+    умолчанию (обслуживание не запускалось вовремя).
+
+    CREATE TABLE ... PARTITION OF в этом случае падает с ошибкой
+    пересечения, поэтому секция создаётся отдельной таблицей, строки
+    переносятся в неё и она присоединяется. Команды выполняются в одной
+    транзакции, а внешние ключи Django отложенные и проверяются после
+    присоединения.
+    """
+    qn = connection.ops.quote_name
+    name = qn(partition_name(table, month))
+    lower = partition_bound(month)
+    upper = partition_bound(month_start(month, 1))
+    where = f"id >= '{lower}' AND id < '{upper}'"
+    default = qn(default_partition_name(table))
+    return [
+        f'CREATE TABLE {name} (LIKE {qn(table)} INCLUDING ALL)',
+        f'INSERT INTO {name} SELECT * FROM {default} WHERE {where}',
+        f'DELETE FROM {default} WHERE {where}',
+        f'ALTER TABLE {qn(table)} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')",
+    ]
+
+
+def detach_partition_sql(table, name):
+    """
+    SQL отсоединения секции. Секция остаётся отдельной таблицей, которую
+    можно выгрузить или удалить.
+    """
+    qn = connection.ops.quote_name
+    return f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}'
+
+
+def partition_is_empty(cursor, name):
+    """
+    Пуста ли секция.
+
+    Секция месяца создания хранит и незавершённые задачи, у которых нет
+    срока хранения, поэтому отсоединяются только секции, которые
+    архивация завершённых задач уже опустошила.
+    """
+    cursor.execute(
+        f'SELECT 1 FROM {connection.ops.quote_name(name)} LIMIT 1'
+    )
+    return cursor.fetchone() is None
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+        [table]
+    )
+    return cursor.fetchone() is not None
+
+
+def attached_partitions(cursor, table):
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = %s::regclass',
+        [table]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def maintenance_statements(cursor, now):
+    """
+    SQL обслуживания секций на момент `now`.
+
+    Заранее создаёт секции TASK_PARTITION_PREMAKE_MONTHS следующих
+    месяцев (текущий месяц создан прошлыми запусками или покрыт секцией
+    `_legacy` после перевода таблицы), перенося их строки из секции по
+    умолчанию, если они туда уже попали, и отсоединяет месячные секции
+    старше TASK_PARTITION_RETENTION_MONTHS, если срок хранения задан и
+    в секции не осталось задач.
+    """
+    from .models import Task
+
+    table = Task._meta.db_table
+    if not is_partitioned(cursor, table):
+        return []
+
+    current = month_start(now)
+    statements = []
+    for offset in range(1, settings.TASK_PARTITION_PREMAKE_MONTHS + 1):
+        month = month_start(current, offset)
+        if default_has_rows(cursor, table, month):
+            logger.warning(
+                f"Moving {partition_name(table, month)} rows "
+                f"out of the default partition"
+            )
+            statements += move_default_rows_sql(table, month)
+        else:
+            statements.append(create_partition_sql(table, month))
+
+    retention = settings.TASK_PARTITION_RETENTION_MONTHS
+    if retention:
+        oldest = month_start(current, -retention)
+        for name in sorted(attached_partitions(cursor, table)):
+            month = partition_month(table, name)
+            if month is None or month >= oldest:
+                continue
+            if partition_is_empty(cursor, name):
+                statements.append(detach_partition_sql(table, name))
+            else:
+                logger.warning(
+                    f"Partition {name} still holds tasks, not detaching"
+                )
+    return statements
+
+
+def maintain_partitions(now):
+    """Выполняет обслуживание секций; возвращает число SQL-команд."""
+    if not settings.TASK_PARTITIONING or connection.vendor != 'postgresql':
+        return 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        statements = maintenance_statements(cursor, now)
+        for sql in statements:
+            cursor.execute(sql)
+    return len(statements)
+
+
+def partition_table_statements(cursor, now):
+    """
+    SQL перевода обычной таблицы задач в секционированную.
+
+    Существующая таблица без копирования данных становится секцией
+    `<table>_legacy` с диапазоном до начала следующего месяца, новые
+    строки попадают в месячные секции и в секцию по умолчанию.
+    Внешние ключи снимаются и восстанавливаются на новой таблице.
+    """
+    from .models import Task
+
+    qn = connection.ops.quote_name
+    table = Task._meta.db_table
+    legacy = f'{table}_legacy'
+
+    cursor.execute(
+        'SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) '
+        'FROM pg_constraint '
+        "WHERE contype = 'f' AND confrelid = %s::regclass",
+        [table]
+    )
+    incoming = cursor.fetchall()
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE contype = 'f' AND conrelid = %s::regclass",
+        [table]
+    )
+    outgoing = cursor.fetchall()
+
+    statements = [
+        f'ALTER TABLE {referencing} DROP CONSTRAINT {qn(name)}'
+        for referencing, name, _ in incoming
+    ]
+    statements += [
+        f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}',
+        f'ALTER INDEX {qn(table + "_pkey")} RENAME TO {qn(legacy + "_pkey")}',
+        f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING ALL) '
+        f'PARTITION BY RANGE (id)',
+        f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(legacy)} '
+        f"FOR VALUES FROM (MINVALUE) TO ('{partition_bound(month_start(now, 1))}')",
+        f'CREATE TABLE {qn(default_partition_name(table))} '
+        f'PARTITION OF {qn(table)} DEFAULT',
+    ]
+    statements += [
+        f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}'
+        for name, definition in outgoing
+    ]
+    statements += [
+        f'ALTER TABLE {referencing} ADD CONSTRAINT {qn(name)} {definition}'
+        for referencing, name, definition in incoming
+    ]
+    return statements
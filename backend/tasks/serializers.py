@@ -3,7 +3,8 @@ Serializers for ToDo List API.
 """
 
 from rest_framework import serializers
-from .models import User, Category, Task
+from .fields import is_valid_ulid
+from .models import User, Category, Task, ArchivedTask
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -11,7 +12,9 @@ class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'telegram_id', 'date_joined']
+        fields = [
+            'id', 'username', 'email', 'telegram_id', 'timezone', 'date_joined'
+        ]
         read_only_fields = ['id', 'date_joined']
 
 
@@ -34,7 +37,7 @@ class CategoryListSerializer(serializers.ModelSerializer):
 
 class TaskSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Task."""
-    categories = CategoryListSerializer(many=True, read_only=True)
+    categories = serializers.JSONField(source='category_snapshot', read_only=True)
     category_ids = serializers.ListField(
         child=serializers.CharField(),
         write_only=True,
@@ -53,6 +56,7 @@ class TaskSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         category_ids = validated_data.pop('category_ids', [])
         task = Task.objects.create(**validated_data)
+        category_ids = [c for c in category_ids if is_valid_ulid(c)]
         if category_ids:
             categories = Category.objects.filter(id__in=category_ids, user=task.user)
             task.categories.set(categories)
@@ -65,20 +69,44 @@ class TaskSerializer(serializers.ModelSerializer):
         instance.save()
 
         if category_ids is not None:
+            category_ids = [c for c in category_ids if is_valid_ulid(c)]
             categories = Category.objects.filter(id__in=category_ids, user=instance.user)
             instance.categories.set(categories)
         return instance
 
 
+class TaskCreateSerializer(TaskSerializer):
+    """Проверка новой задачи без поля user - владелец задаётся явно."""
+
+    class Meta(TaskSerializer.Meta):
+        fields = [f for f in TaskSerializer.Meta.fields if f != 'user']
+
+
 class TaskListSerializer(serializers.ModelSerializer):
-    """Сериализатор для списка задач с категориями."""
-    categories = CategoryListSerializer(many=True, read_only=True)
+    """Сериализатор для списка задач с категориями (из снимка, без JOIN)."""
+    categories = serializers.JSONField(source='category_snapshot', read_only=True)
+    archived = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'description', 'status',
-            'due_date', 'categories', 'created_at'
+            'due_date', 'categories', 'created_at', 'archived'
+        ]
+
+    def get_archived(self, obj):
+        return isinstance(obj, ArchivedTask)
+
+
+class DashboardTaskSerializer(serializers.ModelSerializer):
+    """Задача в сводке бота - поля окна списка и карточки задачи."""
+    categories = serializers.JSONField(source='category_snapshot', read_only=True)
+
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'title', 'description', 'status', 'categories',
+            'due_date', 'created_at'
         ]
 
 
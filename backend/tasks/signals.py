@@ -0,0 +1,151 @@
+"""
+Signal handlers for ToDo List application.
+"""
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from todo_project.db_router import mark_recent_write
+from .changes import record_change, record_changes
+from .dashboard import invalidate_dashboard
+from .models import User, Category, Task, ArchivedTask, Change
+from .snapshots import category_snapshots, refresh_category_snapshots
+
+
+def owner_telegram_id(instance):
+    """telegram_id владельца объекта (из основной базы)."""
+    if isinstance(instance, User):
+        return instance.telegram_id
+    return User.objects.using('default').filter(
+        id=instance.user_id
+    ).values_list('telegram_id', flat=True).first()
+
+
+def deleting_user(origin):
+    """Удаление идёт каскадом от пользователя - журнал удаляется вместе с ним."""
+    return isinstance(origin, User) or (
+        isinstance(origin, QuerySet) and origin.model is User
+    )
+
+
+def record_task_changes(user_id, task_ids, using=None):
+    record_changes(
+        user_id, Change.Kind.TASK, task_ids, Change.Action.UPSERT, using
+    )
+
+
+@receiver(post_save, sender=Task)
+def log_task_save(sender, instance, using=None, **kwargs):
+    record_change(instance, Change.Action.UPSERT, using)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Category)
+def log_delete(sender, instance, origin=None, using=None, **kwargs):
+    """Удаление задачи или категории - tombstone в журнале."""
+    if not deleting_user(origin):
+        record_change(instance, Change.Action.DELETE, using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Task)
+def track_user_write(sender, instance, **kwargs):
+    """
+    После записи читаем данные пользователя из основной базы
+    и сбрасываем его сводку для бота.
+    """
+    user_id = instance.id if isinstance(instance, User) else instance.user_id
+    invalidate_dashboard(user_id)
+    if settings.REPLICA_DATABASES:
+        mark_recent_write(owner_telegram_id(instance), user_id, instance.id)
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+def track_categories_change(sender, instance, action, **kwargs):
+    """Изменение категорий задачи - тоже запись."""
+    if action.startswith('post_'):
+        track_user_write(sender, instance)
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+@receiver(m2m_changed, sender=ArchivedTask.categories.through)
+def update_category_snapshot(
+    sender, instance, action, reverse, model, pk_set, using=None, **kwargs
+):
+    """
+    Пересчитывает снимок категорий при изменении связей задачи.
+    Прямое изменение (task.categories.set) обновляет и сам объект задачи.
+    Изменённые задачи (не архивные) попадают в журнал изменений.
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            snapshot = category_snapshots(type(instance), [instance.id])[instance.id]
+            type(instance).objects.filter(id=instance.id).update(
+                category_snapshot=snapshot
+            )
+            instance.category_snapshot = snapshot
+            if isinstance(instance, Task):
+                record_task_changes(instance.user_id, [instance.id], using)
+    elif action == 'pre_clear':
+        # Со стороны категории: model - модель задач
+        instance._snapshot_task_ids = {
+            model: list(
+                model.objects.filter(categories=instance).values_list('id', flat=True)
+            )
+        }
+    elif action == 'post_clear':
+        task_ids = instance._snapshot_task_ids.pop(model)
+        refresh_category_snapshots(model, task_ids)
+        if model is Task:
+            record_task_changes(instance.user_id, task_ids, using)
+    elif action.startswith('post_'):
+        refresh_category_snapshots(model, pk_set)
+        if model is Task:
+            record_task_changes(instance.user_id, pk_set, using)
+
+
+@receiver(post_save, sender=Category)
+def fan_out_category_change(sender, instance, created, using=None, **kwargs):
+    """
+    Переименование или смена цвета обновляет снимки всех задач категории.
+    В журнал изменений попадают новая или изменённая категория и её задачи.
+    """
+    if not created and not instance.snapshot_changed():
+        return
+    record_change(instance, Change.Action.UPSERT, using)
+    if not created:
+        for model in (Task, ArchivedTask):
+            task_ids = list(
+                model.objects.filter(categories=instance).values_list('id', flat=True)
+            )
+            refresh_category_snapshots(model, task_ids)
+            if model is Task:
+                record_task_changes(instance.user_id, task_ids, using)
+    instance._loaded_snapshot = instance.snapshot()
+
+
+@receiver(pre_delete, sender=Category)
+def remember_deleted_category_tasks(sender, instance, **kwargs):
+    """Связи удаляются каскадно без m2m_changed - запоминаем задачи."""
+    instance._snapshot_task_ids = {
+        model: list(
+            model.objects.filter(categories=instance).values_list('id', flat=True)
+        )
+        for model in (Task, ArchivedTask)
+    }
+
+
+@receiver(post_delete, sender=Category)
+def drop_deleted_category(sender, instance, origin=None, using=None, **kwargs):
+    """После удаления категории убираем её из снимков задач."""
+    for model, task_ids in getattr(instance, '_snapshot_task_ids', {}).items():
+        refresh_category_snapshots(model, task_ids)
+        if model is Task and not deleting_user(origin):
+            record_task_changes(instance.user_id, task_ids, using)
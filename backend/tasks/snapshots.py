@@ -0,0 +1,48 @@
+"""
+Денормализованный снимок категорий задачи.
+
+Task.category_snapshot (и ArchivedTask.category_snapshot) хранит
+[{id, name, color}] категорий задачи, чтобы списки задач и напоминания
+читали одну таблицу без запроса через таблицу связей. Снимок
+пересчитывается сигналами при изменении связей и при переименовании
+или смене цвета категории.
+"""
+
+from django.conf import settings
+
+
+def category_snapshots(model, task_ids):
+    """Снимки категорий задач модели: {task_id: [{id, name, color}, ...]}."""
+    through = model.categories.through
+    task_column = model.categories.field.m2m_field_name() + '_id'
+
+    snapshots = {task_id: [] for task_id in task_ids}
+    links = through.objects.filter(
+        **{f'{task_column}__in': task_ids}
+    ).order_by('category__name').values_list(
+        task_column, 'category_id', 'category__name', 'category__color'
+    )
+    for task_id, category_id, name, color in links:
+        snapshots[task_id].append(
+            {'id': category_id, 'name': name, 'color': color}
+        )
+    return snapshots
+
+
+def refresh_category_snapshots(model, task_ids):
+    """
+    Пересчитывает снимки категорий задач пачками по
+    CATEGORY_SNAPSHOT_BATCH_SIZE: два запроса на пачку.
+    """
+    task_ids = list(task_ids)
+    batch_size = settings.CATEGORY_SNAPSHOT_BATCH_SIZE
+    for start in range(0, len(task_ids), batch_size):
+        snapshots = category_snapshots(model, task_ids[start:start + batch_size])
+        model.objects.bulk_update(
+            [
+                model(id=task_id, category_snapshot=snapshot)
+                for task_id, snapshot in snapshots.items()
+            ],
+            ['category_snapshot']
+        )
+    return len(task_ids)
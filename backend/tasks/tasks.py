@@ -1,13 +1,23 @@
 """
 Celery tasks for ToDo List application.
-Задачи для отправки уведомлений при наступлении даты исполнения.
+Задачи для отправки уведомлений при наступлении даты исполнения,
+архивации завершённых задач, обслуживания секций таблицы задач
+и очистки журнала изменений.
 """
 
+from datetime import timedelta
+
 import requests
 from celery import shared_task
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
 
+from todo_project.db_router import replica_reads
+from .changes import prune_changes, record_changes, suppress_change_log
+from .partitions import maintain_partitions
+
 
 @shared_task
 def send_task_notification(task_id):
@@ -18,7 +28,7 @@ def send_task_notification(task_id):
 
     try:
         task = Task.objects.select_related('user').get(id=task_id)
-    except Task.DoesNotExist:
+    except (Task.DoesNotExist, ValidationError):
         return f"Task {task_id} not found"
 
     if not task.user.telegram_id:
@@ -37,9 +47,9 @@ def send_task_notification(task_id):
     if task.due_date:
         message += f"📅 Срок: {task.due_date.strftime('%d.%m.%Y %H:%M')}\n"
 
-    categories = task.categories.all()
+    categories = task.category_snapshot
     if categories:
-        category_names = ', '.join([c.name for c in categories])
+        category_names = ', '.join([c['name'] for c in categories])
         message += f"🏷 Категории: {category_names}"
 
     # Отправляем сообщение через Telegram Bot API
@@ -47,7 +57,7 @@ def send_task_notification(task_id):
     if not bot_token:
         return "TELEGRAM_BOT_TOKEN not configured"
 
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    url = f"{settings.TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
     payload = {
         'chat_id': task.user.telegram_id,
         'text': message,
@@ -83,10 +93,117 @@ def check_due_tasks():
         status__in=['pending', 'in_progress']
     ).select_related('user')
 
+    # Окно по сроку: напоминания о задачах, срок которых прошёл больше
+    # окна назад, уже неактуальны; время создания задачи не важно
+    window = settings.TASK_DUE_SCAN_WINDOW_DAYS
+    if window:
+        tasks = tasks.filter(due_date__gte=now - timedelta(days=window))
+
     sent_count = 0
-    for task in tasks:
-        if task.user.telegram_id:
-            send_task_notification.delay(task.id)
-            sent_count += 1
+    with replica_reads(settings.TASK_DUE_SCAN_USE_REPLICA):
+        for task in tasks:
+            if task.user.telegram_id:
+                send_task_notification.delay(task.id)
+                sent_count += 1
 
     return f"Scheduled {sent_count} notifications"
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Переносит одну пачку завершённых задач в архив.
+
+    Пачка блокируется с SKIP LOCKED, поэтому параллельные обновления
+    отдельных задач не ждут окончания архивации.
+    """
+    from .models import Task, ArchivedTask, Change
+
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True).filter(
+                status=Task.Status.COMPLETED,
+                updated_at__lt=cutoff
+            ).order_by('id')[:batch_size]
+        )
+        if not tasks:
+            return 0
+
+        task_ids = [task.id for task in tasks]
+        links = Task.categories.through.objects.filter(
+            task_id__in=task_ids
+        ).values_list('task_id', 'category_id')
+
+        ArchivedTask.objects.bulk_create([
+            ArchivedTask(
+                id=task.id,
+                title=task.title,
+                description=task.description,
+                status=task.status,
+                due_date=task.due_date,
+                user_id=task.user_id,
+                created_at=task.created_at,
+                updated_at=task.updated_at,
+                notification_sent=task.notification_sent,
+                category_snapshot=task.category_snapshot,
+            )
+            for task in tasks
+        ])
+        ArchivedTask.categories.through.objects.bulk_create([
+            ArchivedTask.categories.through(
+                archivedtask_id=task_id,
+                category_id=category_id
+            )
+            for task_id, category_id in links
+        ])
+        # Tombstones для журнала изменений - пачкой, а не по сигналу на задачу
+        with suppress_change_log():
+            Task.objects.filter(id__in=task_ids).delete()
+        by_user = {}
+        for task in tasks:
+            by_user.setdefault(task.user_id, []).append(task.id)
+        for user_id, ids in by_user.items():
+            record_changes(user_id, Change.Kind.TASK, ids, Change.Action.DELETE)
+
+    return len(tasks)
+
+
+@shared_task
+def archive_completed_tasks():
+    """
+    Периодическая задача переноса старых завершённых задач в архив.
+    Задачи переносятся пачками по TASK_ARCHIVE_BATCH_SIZE вместе
+    со связями с категориями, каждая пачка - отдельной транзакцией.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+    batch_size = settings.TASK_ARCHIVE_BATCH_SIZE
+
+    archived_count = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        archived_count += moved
+        if moved < batch_size:
+            break
+
+    return f"Archived {archived_count} tasks"
+
+
+@shared_task
+def maintain_task_partitions():
+    """
+    Ежедневное обслуживание секций таблицы задач: создание будущих
+    месячных секций и отсоединение устаревших. Без TASK_PARTITIONING
+    ничего не делает.
+    """
+    executed = maintain_partitions(timezone.now())
+    return f"Executed {executed} partition statements"
+
+
+@shared_task
+def prune_change_log():
+    """
+    Ежедневная очистка журнала изменений от записей старше
+    CHANGE_LOG_RETENTION_DAYS. Клиенты с более старым курсором
+    получают 410 и выполняют полную синхронизацию.
+    """
+    deleted = prune_changes(timezone.now())
+    return f"Pruned {deleted} change log entries"
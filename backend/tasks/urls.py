@@ -2,16 +2,36 @@
 URL configuration for tasks API.
 """
 
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, CategoryViewSet, TaskViewSet, health_check
+from . import async_views
+from .views import (
+    UserViewSet, CategoryViewSet, TaskViewSet, batch, health_check
+)
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'tasks', TaskViewSet)
 
+# Асинхронные эндпоинты бота (ASGI) перекрывают одноимённые действия DRF.
+async_urlpatterns = [
+    path('users/register_telegram/', async_views.register_telegram),
+    path('users/by_telegram/', async_views.user_by_telegram),
+    path('tasks/by_telegram/', async_views.tasks_by_telegram),
+    path('tasks/create_for_telegram/', async_views.create_for_telegram),
+    re_path(
+        r'^tasks/(?P<pk>[0-9A-HJKMNP-TV-Za-hjkmnp-tv-z]{26})/$',
+        async_views.task_detail
+    ),
+]
+
 urlpatterns = [
     path('', include(router.urls)),
     path('health/', health_check, name='health-check'),
+    path('batch/', batch, name='batch'),
 ]
+
+if settings.ASYNC_BOT_ENDPOINTS:
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -2,17 +2,189 @@
 API Views for ToDo List application.
 """
 
+import heapq
+from contextlib import nullcontext
+from datetime import datetime, time, timedelta
+from itertools import islice
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import User, Category, Task
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .batch import BatchError, run_subrequest, validate_batch
+from .changes import CursorExpired, changes_since
+from .dashboard import get_dashboard
+from .fields import is_valid_ulid, ulid_floor
+from .models import User, Category, Task, ArchivedTask
 from .serializers import (
     UserSerializer, CategorySerializer, TaskSerializer,
     TaskListSerializer, UserRegistrationSerializer
 )
 
 
+def parse_moment(params, name, tz=None):
+    """
+    Разбирает дату или дату-время из query-параметра.
+
+    Дата без времени и время без смещения относятся к часовому поясу
+    `tz` (по умолчанию - часовому поясу проекта).
+    """
+    value = params.get(name)
+    if not value:
+        return None
+
+    # Верный формат с невозможным значением (2024-02-30) даёт ValueError
+    try:
+        moment = parse_datetime(value)
+        date = parse_date(value) if moment is None else None
+    except ValueError:
+        moment = date = None
+    if moment is None:
+        if date is None:
+            raise ValidationError({name: 'Invalid date or datetime.'})
+        moment = datetime.combine(date, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, tz)
+    return moment
+
+
+def parse_telegram_id(value):
+    """Telegram ID из запроса; не целое число - ошибка 400."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({'telegram_id': 'A valid integer is required.'})
+
+
+def filter_created_range(queryset, params):
+    """
+    Фильтрация по времени создания через диапазон первичного ключа.
+
+    Первые 48 бит ULID - время создания, поэтому created_after и
+    created_before обслуживаются индексом первичного ключа без
+    отдельного индекса по created_at.
+    """
+    created_after = parse_moment(params, 'created_after')
+    created_before = parse_moment(params, 'created_before')
+
+    if created_after:
+        queryset = queryset.filter(id__gte=ulid_floor(created_after))
+    if created_before:
+        queryset = queryset.filter(id__lt=ulid_floor(created_before))
+    return queryset
+
+
+def filter_due(queryset, params, tz=None):
+    """
+    Фильтры по сроку: due_after, due_before и overdue=1.
+
+    Все условия задают диапазон по due_date и обслуживаются частичным
+    индексом (user, due_date) по задачам со сроком.
+    """
+    due_after = parse_moment(params, 'due_after', tz)
+    due_before = parse_moment(params, 'due_before', tz)
+
+    if due_after:
+        queryset = queryset.filter(due_date__gte=due_after)
+    if due_before:
+        queryset = queryset.filter(due_date__lt=due_before)
+    if is_true(params.get('overdue')):
+        queryset = overdue_tasks(queryset, timezone.now())
+    return queryset
+
+
+def overdue_tasks(queryset, now):
+    """Незавершённые задачи с истёкшим сроком."""
+    return queryset.filter(due_date__lt=now).exclude(
+        status=Task.Status.COMPLETED
+    )
+
+
+DUE_WINDOWS = ('today', 'tomorrow', 'week')
+
+
+def due_window(name, now, tz):
+    """
+    Границы окна [начало, конец) в часовом поясе пользователя.
+
+    today - с текущего момента до полуночи, tomorrow - следующие сутки,
+    week - с текущего момента до начала следующего понедельника.
+    Полночь вычисляется по местному календарю, поэтому переход на
+    летнее время не сдвигает границы.
+    """
+    today = timezone.localtime(now, tz).date()
+
+    def midnight(days):
+        return timezone.make_aware(
+            datetime.combine(today + timedelta(days=days), time.min), tz
+        )
+
+    if name == 'today':
+        return now, midnight(1)
+    if name == 'tomorrow':
+        return midnight(1), midnight(2)
+    return now, midnight(7 - today.weekday())
+
+
+def is_true(value):
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+
+def include_archived(params):
+    """Нужно ли добавлять к ответу архивные задачи."""
+    return is_true(params.get('include_archived'))
+
+
+def newest_key(task):
+    return task.created_at, task.id
+
+
+class NewestFirst:
+    """
+    Задачи из нескольких выборок (например, с архивными), новые первыми,
+    как одна последовательность для пагинатора.
+
+    Срез читает из каждой выборки только строки до своего конца и сливает
+    уже упорядоченные результаты, поэтому страница не загружает весь
+    архив в память: для страницы N каждая выборка отдаёт не больше
+    N * PAGE_SIZE строк.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = [
+            queryset.order_by('-created_at', '-id') for queryset in querysets
+        ]
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def _merge(self, querysets):
+        return heapq.merge(*querysets, key=newest_key, reverse=True)
+
+    def __iter__(self):
+        return iter(self._merge(self.querysets))
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('NewestFirst supports only plain slices.')
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            return list(islice(self, start, None))
+        return list(islice(
+            self._merge(queryset[:stop] for queryset in self.querysets),
+            start, stop
+        ))
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """ViewSet для управления пользователями."""
     queryset = User.objects.all()
@@ -29,6 +201,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 {'error': 'telegram_id is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        telegram_id = parse_telegram_id(telegram_id)
 
         # Проверяем, существует ли пользователь с таким telegram_id
         user = User.objects.filter(telegram_id=telegram_id).first()
@@ -57,6 +230,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 {'error': 'telegram_id is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        telegram_id = parse_telegram_id(telegram_id)
 
         user = get_object_or_404(User, telegram_id=telegram_id)
         return Response(UserSerializer(user).data)
@@ -74,9 +248,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
         telegram_id = self.request.query_params.get('telegram_id')
 
         if user_id:
+            if not is_valid_ulid(user_id):
+                return queryset.none()
             queryset = queryset.filter(user_id=user_id)
         elif telegram_id:
-            queryset = queryset.filter(user__telegram_id=telegram_id)
+            queryset = queryset.filter(
+                user__telegram_id=parse_telegram_id(telegram_id)
+            )
 
         return queryset
 
@@ -92,20 +270,76 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Фильтрация задач по пользователю и статусу."""
-        queryset = Task.objects.all().prefetch_related('categories')
+        return self.filter_tasks(Task.objects.all())
+
+    def filter_tasks(self, queryset):
+        """Применяет фильтры запроса к задачам или архивным задачам."""
         user_id = self.request.query_params.get('user_id')
         telegram_id = self.request.query_params.get('telegram_id')
         task_status = self.request.query_params.get('status')
 
         if user_id:
+            if not is_valid_ulid(user_id):
+                return queryset.none()
             queryset = queryset.filter(user_id=user_id)
         elif telegram_id:
-            queryset = queryset.filter(user__telegram_id=telegram_id)
+            queryset = queryset.filter(
+                user__telegram_id=parse_telegram_id(telegram_id)
+            )
 
         if task_status:
             queryset = queryset.filter(status=task_status)
 
-        return queryset
+        queryset = filter_due(
+            queryset, self.request.query_params,
+            self.user_tzinfo(user_id, telegram_id)
+        )
+        return filter_created_range(queryset, self.request.query_params)
+
+    def user_tzinfo(self, user_id, telegram_id):
+        """
+        Часовой пояс для due_after/due_before без смещения: пояс
+        пользователя из фильтра запроса, иначе - пояс проекта.
+        """
+        params = self.request.query_params
+        if not (params.get('due_after') or params.get('due_before')):
+            return None
+        if user_id:
+            user = User.objects.filter(id=user_id).first()
+        elif telegram_id:
+            user = User.objects.filter(telegram_id=telegram_id).first()
+        else:
+            user = None
+        return user.tzinfo() if user else None
+
+    def with_archived(self, tasks):
+        """Объединяет задачи с архивными, новые задачи первыми."""
+        return NewestFirst(tasks, self.filter_tasks(ArchivedTask.objects.all()))
+
+    def list(self, request, *args, **kwargs):
+        """Список задач; архивные добавляются по include_archived=1."""
+        if not include_archived(request.query_params):
+            return super().list(request, *args, **kwargs)
+
+        tasks = self.with_archived(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(tasks)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(tasks, many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Задача по id; с include_archived=1 - и архивная (только чтение)."""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not include_archived(request.query_params):
+                raise
+        archived = get_object_or_404(
+            self.filter_tasks(ArchivedTask.objects.all()), pk=kwargs['pk']
+        )
+        return Response(TaskListSerializer(archived).data)
 
     @action(detail=False, methods=['get'])
     def by_telegram(self, request):
@@ -116,14 +350,126 @@ class TaskViewSet(viewsets.ModelViewSet):
                 {'error': 'telegram_id is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        telegram_id = parse_telegram_id(telegram_id)
 
-        tasks = Task.objects.filter(
+        tasks = filter_created_range(Task.objects.filter(
             user__telegram_id=telegram_id
-        ).prefetch_related('categories').order_by('-created_at')
+        ).order_by('-created_at'), request.query_params)
+        if include_archived(request.query_params):
+            tasks = self.with_archived(tasks)
+
+        serializer = TaskListSerializer(tasks, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def upcoming(self, request):
+        """
+        Незавершённые задачи со сроком в окне window=today|tomorrow|week
+        (по умолчанию week) в часовом поясе пользователя.
+        """
+        telegram_id = request.query_params.get('telegram_id')
+        if not telegram_id:
+            return Response(
+                {'error': 'telegram_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        telegram_id = parse_telegram_id(telegram_id)
+        window = request.query_params.get('window', 'week')
+        if window not in DUE_WINDOWS:
+            return Response(
+                {'window': f'Expected one of: {", ".join(DUE_WINDOWS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = get_object_or_404(User, telegram_id=telegram_id)
+        start, end = due_window(window, timezone.now(), user.tzinfo())
+        tasks = Task.objects.filter(
+            user=user, due_date__gte=start, due_date__lt=end
+        ).exclude(status=Task.Status.COMPLETED).order_by('due_date')
 
         serializer = TaskListSerializer(tasks, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def overdue(self, request):
+        """Незавершённые задачи пользователя с истёкшим сроком."""
+        telegram_id = request.query_params.get('telegram_id')
+        if not telegram_id:
+            return Response(
+                {'error': 'telegram_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        telegram_id = parse_telegram_id(telegram_id)
+
+        user = get_object_or_404(User, telegram_id=telegram_id)
+        tasks = overdue_tasks(
+            Task.objects.filter(user=user), timezone.now()
+        ).order_by('due_date')
+
+        serializer = TaskListSerializer(tasks, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Изменения задач и категорий пользователя после курсора since.
+
+        Без since возвращает только текущий курсор. limit ограничивает
+        число записей журнала (не больше CHANGE_FEED_PAGE_SIZE).
+        """
+        telegram_id = request.query_params.get('telegram_id')
+        if not telegram_id:
+            return Response(
+                {'error': 'telegram_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        telegram_id = parse_telegram_id(telegram_id)
+        since = request.query_params.get('since') or None
+        if since is not None:
+            if not is_valid_ulid(since):
+                return Response(
+                    {'since': 'Invalid cursor.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            since = since.upper()
+        try:
+            limit = int(request.query_params.get('limit', settings.CHANGE_FEED_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {'limit': 'A valid integer is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.CHANGE_FEED_PAGE_SIZE))
+
+        user = get_object_or_404(User, telegram_id=telegram_id)
+        try:
+            feed = changes_since(user, since, limit, timezone.now())
+        except CursorExpired:
+            return Response(
+                {'error': 'cursor expired, full sync required'},
+                status=status.HTTP_410_GONE
+            )
+        return Response(feed)
+
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """Сводка для окна списка задач бота (кешируется по версии)."""
+        telegram_id = request.query_params.get('telegram_id')
+        if not telegram_id:
+            return Response(
+                {'error': 'telegram_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        telegram_id = parse_telegram_id(telegram_id)
+
+        dashboard = get_dashboard(telegram_id)
+        if dashboard is None:
+            return Response(
+                {'detail': 'No User matches the given query.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(dashboard)
+
     @action(detail=False, methods=['post'])
     def create_for_telegram(self, request):
         """Создание задачи для пользователя по Telegram ID."""
@@ -133,6 +479,7 @@ class TaskViewSet(viewsets.ModelViewSet):
                 {'error': 'telegram_id is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        telegram_id = parse_telegram_id(telegram_id)
 
         user = get_object_or_404(User, telegram_id=telegram_id)
 
@@ -150,3 +497,34 @@ class TaskViewSet(viewsets.ModelViewSet):
 def health_check(request):
     """Проверка работоспособности API."""
     return Response({'status': 'ok'})
+
+
+@api_view(['POST'])
+def batch(request):
+    """
+    Выполнение нескольких запросов к API за один HTTP-запрос.
+
+    Подзапросы выполняются по порядку; при atomic=true - в одной
+    транзакции, которая откатывается на первом ответе с ошибкой
+    (оставшиеся подзапросы не выполняются).
+    """
+    data = request.data if isinstance(request.data, dict) else {}
+    requests = data.get('requests')
+    try:
+        validate_batch(requests)
+    except BatchError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    atomic = bool(data.get('atomic'))
+    results = []
+    committed = True
+    with transaction.atomic() if atomic else nullcontext():
+        for spec in requests:
+            result = run_subrequest(request._request, spec)
+            results.append(result)
+            if atomic and result['status'] >= 400:
+                transaction.set_rollback(True)
+                committed = False
+                break
+
+    return Response({'results': results, 'committed': committed})
@@ -0,0 +1,298 @@
+"""
+Tests for async bot endpoints served through the ASGI handler.
+"""
+
+import pytest
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import include, path
+from django.utils import timezone
+from datetime import timedelta
+from ulid import ULID
+
+from tasks import urls as task_urls
+from tasks.models import User, Task, ArchivedTask
+from tasks.views import NewestFirst
+
+
+class SyncAsyncClient:
+    """AsyncClient driven from sync tests, so the ORM stays in this thread."""
+
+    def __init__(self):
+        self.client = AsyncClient()
+
+    def __getattr__(self, method):
+        return async_to_sync(getattr(self.client, method))
+
+
+class AsyncBotUrls:
+    """URLconf with async endpoints in front, as with ASYNC_BOT_ENDPOINTS=1."""
+    urlpatterns = [
+        path('api/', include(task_urls.async_urlpatterns + task_urls.urlpatterns)),
+    ]
+
+
+@pytest.fixture
+def client(settings, db):
+    """Client for the URL layout used with ASYNC_BOT_ENDPOINTS=1."""
+    settings.ROOT_URLCONF = AsyncBotUrls
+    return SyncAsyncClient()
+
+
+def test_async_endpoints_disabled_by_default():
+    """Test sync DRF actions are served without the setting."""
+    assert not set(task_urls.async_urlpatterns) & set(task_urls.urlpatterns)
+
+
+class TestAsyncUsers:
+    """Tests for async user endpoints."""
+
+    def test_register_new_user(self, client):
+        """Test registering a new user."""
+        response = client.post(
+            '/api/users/register_telegram/',
+            {'telegram_id': 999888777, 'username': 'new_user'},
+            content_type='application/json'
+        )
+        assert response.status_code == 201
+        assert response.json()['username'] == 'new_user'
+        assert User.objects.filter(telegram_id=999888777).exists()
+
+    def test_register_auto_username(self, client):
+        """Test username is generated from telegram_id."""
+        response = client.post(
+            '/api/users/register_telegram/', {'telegram_id': 111}
+        )
+        assert response.status_code == 201
+        assert response.json()['username'] == 'telegram_111'
+
+    def test_register_existing_user(self, client, user):
+        """Test existing user is returned without changes."""
+        response = client.post(
+            '/api/users/register_telegram/',
+            {'telegram_id': user.telegram_id, 'username': 'other'},
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+        assert response.json()['id'] == user.id
+
+    def test_register_invalid(self, client, user):
+        """Test validation errors are returned as 400."""
+        response = client.post(
+            '/api/users/register_telegram/',
+            {'telegram_id': 5, 'username': user.username},
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+        assert 'username' in response.json()
+
+    def test_register_without_telegram_id(self, client):
+        """Test telegram_id is required."""
+        response = client.post(
+            '/api/users/register_telegram/', {},
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+        assert response.json() == {'error': 'telegram_id is required'}
+
+    def test_register_malformed_json(self, client):
+        """Test malformed JSON body is rejected."""
+        response = client.post(
+            '/api/users/register_telegram/', '{',
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+
+    def test_register_wrong_method(self, client):
+        """Test unsupported methods are rejected."""
+        response = client.get('/api/users/register_telegram/')
+        assert response.status_code == 405
+
+    def test_by_telegram(self, client, user):
+        """Test getting user by Telegram ID."""
+        response = client.get(
+            '/api/users/by_telegram/', {'telegram_id': user.telegram_id}
+        )
+        assert response.status_code == 200
+        assert response.json()['username'] == user.username
+
+    def test_by_telegram_not_found(self, client):
+        """Test unknown Telegram ID returns 404."""
+        response = client.get('/api/users/by_telegram/', {'telegram_id': 1})
+        assert response.status_code == 404
+
+
+class TestAsyncTasks:
+    """Tests for async task endpoints."""
+
+    def test_by_telegram(self, client, task, user):
+        """Test listing tasks with categories from the snapshot."""
+        response = client.get(
+            '/api/tasks/by_telegram/', {'telegram_id': user.telegram_id}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['id'] for item in data] == [task.id]
+        assert data[0]['categories'][0]['name'] == 'Test Category'
+        assert data[0]['archived'] is False
+
+    def test_by_telegram_missing_param(self, client):
+        """Test telegram_id is required."""
+        response = client.get('/api/tasks/by_telegram/')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('url', [
+        '/api/tasks/by_telegram/', '/api/users/by_telegram/'
+    ])
+    def test_by_telegram_invalid_param(self, client, url):
+        """Test a non-integer telegram_id returns 400."""
+        response = client.get(url, {'telegram_id': 'abc'})
+        assert response.status_code == 400
+        assert 'telegram_id' in response.json()
+
+    def test_by_telegram_created_range(self, client, user):
+        """Test created_after filter and invalid values."""
+        Task.objects.create(title='Old', user=user)
+        response = client.get('/api/tasks/by_telegram/', {
+            'telegram_id': user.telegram_id,
+            'created_after': (timezone.now() + timedelta(days=1)).isoformat(),
+        })
+        assert response.json() == []
+
+        response = client.get('/api/tasks/by_telegram/', {
+            'telegram_id': user.telegram_id, 'created_after': 'soon'
+        })
+        assert response.status_code == 400
+        assert 'created_after' in response.json()
+
+    def test_by_telegram_include_archived(self, client, task, user):
+        """Test archived tasks are merged newest first."""
+        archived = ArchivedTask.objects.create(
+            title='Archived', status='completed', user=user,
+            created_at=timezone.now() - timedelta(days=90),
+            updated_at=timezone.now() - timedelta(days=60)
+        )
+        response = client.get('/api/tasks/by_telegram/', {
+            'telegram_id': user.telegram_id, 'include_archived': '1'
+        })
+        data = response.json()
+        assert [item['id'] for item in data] == [task.id, archived.id]
+        assert data[1]['archived'] is True
+
+    def test_by_telegram_include_archived_interleaved(self, client, user):
+        """Test the archive merge keeps order and the created range."""
+        now = timezone.now()
+        old = Task.objects.create(title='Old', user=user)
+        Task.objects.filter(pk=old.pk).update(
+            created_at=now - timedelta(days=10)
+        )
+        new = Task.objects.create(title='New', user=user)
+        archived = [
+            ArchivedTask.objects.create(
+                title=f'Archived {days}', status='completed', user=user,
+                created_at=now - timedelta(days=days), updated_at=now
+            )
+            for days in (5, 90)
+        ]
+
+        params = {'telegram_id': user.telegram_id, 'include_archived': '1'}
+        with patch('tasks.async_views.NewestFirst', wraps=NewestFirst) as merge:
+            response = client.get('/api/tasks/by_telegram/', params)
+
+        merge.assert_called_once()
+        assert [item['id'] for item in response.json()] == [
+            new.id, archived[0].id, old.id, archived[1].id
+        ]
+
+        # created_* filters by id, and every row above was just created
+        response = client.get('/api/tasks/by_telegram/', {
+            **params, 'created_before': (now - timedelta(days=1)).isoformat()
+        })
+        assert response.json() == []
+
+    def test_create_for_telegram(self, client, user, category):
+        """Test creating a task with categories."""
+        response = client.post('/api/tasks/create_for_telegram/', {
+            'telegram_id': user.telegram_id,
+            'title': 'Async task',
+            'due_date': (timezone.now() + timedelta(days=1)).isoformat(),
+            'category_ids': [category.id, 'bad-id'],
+        }, content_type='application/json')
+        assert response.status_code == 201
+        data = response.json()
+        assert data['user'] == user.id
+        assert [c['id'] for c in data['categories']] == [category.id]
+        task = Task.objects.get(id=data['id'])
+        assert list(task.categories.all()) == [category]
+
+    def test_create_for_telegram_invalid(self, client, user):
+        """Test task validation errors."""
+        response = client.post('/api/tasks/create_for_telegram/', {
+            'telegram_id': user.telegram_id, 'status': 'unknown'
+        }, content_type='application/json')
+        assert response.status_code == 400
+        assert set(response.json()) == {'title', 'status'}
+
+    def test_create_for_telegram_user_not_found(self, client):
+        """Test unknown Telegram user returns 404."""
+        response = client.post('/api/tasks/create_for_telegram/', {
+            'telegram_id': 1, 'title': 'Task'
+        }, content_type='application/json')
+        assert response.status_code == 404
+
+    def test_update_status(self, client, task):
+        """Test status-only PATCH is handled asynchronously."""
+        response = client.patch(
+            f'/api/tasks/{task.id}/', {'status': 'completed'},
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+        assert response.json()['status'] == 'completed'
+        assert response.json()['categories'][0]['name'] == 'Test Category'
+        task.refresh_from_db()
+        assert task.status == 'completed'
+
+    def test_update_status_invalid(self, client, task):
+        """Test invalid status is rejected."""
+        response = client.patch(
+            f'/api/tasks/{task.id}/', {'status': 'unknown'},
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+
+    def test_update_status_not_found(self, client):
+        """Test status update of a missing task returns 404."""
+        response = client.patch(
+            f'/api/tasks/{ULID()}/', {'status': 'completed'},
+            content_type='application/json'
+        )
+        assert response.status_code == 404
+
+    def test_other_methods_delegate_to_viewset(self, client, task):
+        """Test retrieve, full PATCH and delete use the sync viewset."""
+        response = client.get(f'/api/tasks/{task.id}/')
+        assert response.status_code == 200
+        assert response.json()['title'] == 'Test Task'
+
+        response = client.patch(
+            f'/api/tasks/{task.id}/',
+            {'title': 'Renamed', 'status': 'in_progress'},
+            content_type='application/json'
+        )
+        assert response.json()['title'] == 'Renamed'
+
+        response = client.delete(f'/api/tasks/{task.id}/')
+        assert response.status_code == 204
+        assert not Task.objects.filter(id=task.id).exists()
+
+
+def test_batch_runs_async_endpoints(client, user):
+    """Test batch sub-requests can target async endpoints."""
+    response = client.post('/api/batch/', {'requests': [
+        {'path': f'users/by_telegram/?telegram_id={user.telegram_id}'},
+        {'path': 'health/'},
+    ]}, content_type='application/json')
+    results = response.json()['results']
+    assert results[0]['body']['id'] == user.id
+    assert results[1]['body'] == {'status': 'ok'}
@@ -0,0 +1,237 @@
+"""
+Tests for the change log and the tasks/changes/ feed.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from ulid import ULID
+
+from tasks.changes import prune_changes
+from tasks.fields import ulid_floor
+from tasks.models import Category, Change, Task, User
+from tasks.tasks import archive_completed_tasks, prune_change_log
+
+
+@pytest.fixture(autouse=True)
+def no_feed_lag(settings):
+    """Makes fresh log entries visible immediately."""
+    settings.CHANGE_FEED_LAG_SECONDS = -1
+
+
+def logged(user):
+    return [
+        (change.kind, change.object_id, change.action)
+        for change in Change.objects.filter(user=user)
+    ]
+
+
+def feed(api_client, user, since, **params):
+    return api_client.get('/api/tasks/changes/', {
+        'telegram_id': user.telegram_id, 'since': since, **params
+    })
+
+
+@pytest.fixture
+def cursor(db):
+    """Cursor taken before the test writes anything."""
+    return ulid_floor(timezone.now())
+
+
+class TestChangeLog:
+    """Tests for change log recording."""
+
+    def test_task_lifecycle(self, user, db):
+        """Test task create, update and delete are logged."""
+        task = Task.objects.create(title='Task', user=user)
+        task.status = 'completed'
+        task.save()
+        task_id = task.id
+        task.delete()
+        assert logged(user) == [
+            ('task', task_id, 'upsert'),
+            ('task', task_id, 'upsert'),
+            ('task', task_id, 'delete'),
+        ]
+
+    def test_cursors_are_monotonic(self, user, db):
+        """Test log cursors follow write order."""
+        for i in range(20):
+            Task.objects.create(title=f'Task {i}', user=user)
+        cursors = list(
+            Change.objects.filter(user=user).values_list('cursor', flat=True)
+        )
+        assert cursors == sorted(cursors)
+        titles = [
+            Task.objects.get(id=change.object_id).title
+            for change in Change.objects.filter(user=user)
+        ]
+        assert titles == [f'Task {i}' for i in range(20)]
+
+    def test_category_changes(self, task, category, user, db):
+        """Test category create, rename fan-out and delete are logged."""
+        Change.objects.all().delete()
+        category.name = 'Renamed'
+        category.save()
+        category.save()
+        assert logged(user) == [
+            ('category', category.id, 'upsert'),
+            ('task', task.id, 'upsert'),
+        ]
+
+        Change.objects.all().delete()
+        category_id = category.id
+        category.delete()
+        assert set(logged(user)) == {
+            ('category', category_id, 'delete'),
+            ('task', task.id, 'upsert'),
+        }
+
+    def test_task_category_links(self, task, category, another_category, db):
+        """Test link changes from either side log the task."""
+        Change.objects.all().delete()
+        task.categories.add(another_category)
+        another_category.tasks.remove(task)
+        category.tasks.clear()
+        assert logged(task.user) == [('task', task.id, 'upsert')] * 3
+
+    def test_user_deletion(self, task, category, user, db):
+        """Test deleting a user drops their log without tombstones."""
+        user.delete()
+        assert not Change.objects.exists()
+
+    def test_change_user_cursor_index(self, user, db):
+        """Test feed reads are served by the (user, cursor) index."""
+        queryset = Change.objects.filter(
+            user=user, cursor__gt=str(ULID())
+        ).order_by('cursor')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as db_cursor:
+            db_cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in db_cursor.fetchall())
+        assert 'change_user_cursor_idx' in plan
+
+
+class TestChangeFeed:
+    """Tests for the tasks/changes/ action."""
+
+    def test_initial_cursor(self, api_client, task, user, db):
+        """Test a request without since returns only the current cursor."""
+        response = api_client.get(
+            '/api/tasks/changes/', {'telegram_id': user.telegram_id}
+        )
+        assert response.status_code == 200
+        assert response.data['changes'] == []
+        assert response.data['cursor'] > task.id
+
+    def test_deltas(self, api_client, user, category, cursor, db):
+        """Test deltas carry current state and tombstones, compacted."""
+        kept = Task.objects.create(title='Kept', user=user)
+        kept.categories.add(category)
+        kept.title = 'Kept v2'
+        kept.save()
+        gone = Task.objects.create(title='Gone', user=user)
+        gone_id = gone.id
+        gone.delete()
+
+        response = feed(api_client, user, cursor)
+        assert response.status_code == 200
+        changes = response.data['changes']
+        assert [(c['kind'], c['id'], c['action']) for c in changes] == [
+            ('task', kept.id, 'upsert'),
+            ('task', gone_id, 'delete'),
+        ]
+        assert changes[0]['data']['title'] == 'Kept v2'
+        assert changes[0]['data']['categories'][0]['name'] == category.name
+        assert changes[1]['data'] is None
+        assert response.data['has_more'] is False
+
+        response = feed(api_client, user, response.data['cursor'])
+        assert response.data['changes'] == []
+
+    def test_category_in_feed(self, api_client, user, cursor, db):
+        """Test categories appear in the feed."""
+        category = Category.objects.create(name='Home', user=user)
+        changes = feed(api_client, user, cursor).data['changes']
+        assert changes[0]['kind'] == 'category'
+        assert changes[0]['data']['name'] == 'Home'
+
+    def test_pagination(self, api_client, user, cursor, db):
+        """Test limit pages through the log with has_more."""
+        tasks = [Task.objects.create(title=f'T{i}', user=user) for i in range(5)]
+        first = feed(api_client, user, cursor, limit=3).data
+        assert first['has_more'] is True
+        assert [c['id'] for c in first['changes']] == [t.id for t in tasks[:3]]
+        rest = feed(api_client, user, first['cursor'], limit=3).data
+        assert rest['has_more'] is False
+        assert [c['id'] for c in rest['changes']] == [t.id for t in tasks[3:]]
+
+    def test_other_users_not_visible(self, api_client, user, another_user, cursor, db):
+        """Test the feed only includes the requesting user's changes."""
+        Task.objects.create(title='Other', user=another_user)
+        assert feed(api_client, user, cursor).data['changes'] == []
+
+    def test_lag_hides_fresh_entries(self, api_client, user, cursor, settings, db):
+        """Test entries newer than the lag are held back."""
+        settings.CHANGE_FEED_LAG_SECONDS = 60
+        Task.objects.create(title='Fresh', user=user)
+        data = feed(api_client, user, cursor).data
+        assert data['changes'] == []
+
+    def test_expired_cursor(self, api_client, user, db):
+        """Test cursors older than retention require a full sync."""
+        old = ulid_floor(timezone.now() - timedelta(days=31))
+        response = feed(api_client, user, old)
+        assert response.status_code == 410
+
+    @pytest.mark.parametrize('params', [
+        {'since': 'bad'},
+        {'limit': 'many'},
+    ])
+    def test_invalid_params(self, api_client, user, params, db):
+        """Test invalid cursor and limit are rejected."""
+        response = api_client.get('/api/tasks/changes/', {
+            'telegram_id': user.telegram_id, **params
+        })
+        assert response.status_code == 400
+
+    def test_missing_user(self, api_client, db):
+        """Test telegram_id is required and must exist."""
+        assert api_client.get('/api/tasks/changes/').status_code == 400
+        response = api_client.get('/api/tasks/changes/', {'telegram_id': 1})
+        assert response.status_code == 404
+
+
+class TestChangeLogMaintenance:
+    """Tests for archive tombstones and log pruning."""
+
+    def test_archive_writes_tombstones(self, user, settings, db):
+        """Test archived tasks are logged as deletes in bulk."""
+        settings.TASK_ARCHIVE_AFTER_DAYS = 0
+        tasks = [
+            Task.objects.create(title=f'Done {i}', user=user, status='completed')
+            for i in range(3)
+        ]
+        Task.objects.filter(user=user).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        Change.objects.all().delete()
+
+        archive_completed_tasks()
+
+        assert logged(user) == [('task', t.id, 'delete') for t in tasks]
+
+    def test_prune(self, user, db):
+        """Test entries older than retention are pruned."""
+        old = Change.objects.create(
+            cursor=ulid_floor(timezone.now() - timedelta(days=40)),
+            user=user, kind='task', object_id=str(ULID()), action='delete'
+        )
+        Task.objects.create(title='Fresh', user=user)
+
+        assert prune_change_log() == 'Pruned 1 change log entries'
+        assert not Change.objects.filter(cursor=old.cursor).exists()
+        assert prune_changes(timezone.now()) == 0
+        assert User.objects.filter(id=user.id).exists()
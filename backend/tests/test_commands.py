@@ -0,0 +1,130 @@
+"""
+Tests for management commands.
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from tasks.management.commands.convert_ulid_storage import (
+    Command as ConvertULIDStorageCommand, ulid_columns
+)
+
+PARTITION_COMMAND = 'tasks.management.commands.partition_tasks'
+
+
+class TestConvertULIDStorage:
+    """Tests for convert_ulid_storage command."""
+
+    def test_ulid_columns(self, db):
+        """Test collecting ULID primary and foreign key columns."""
+        columns = set(ulid_columns())
+        assert ('tasks_user', 'id') in columns
+        assert ('tasks_task', 'id') in columns
+        assert ('tasks_task', 'user_id') in columns
+        assert ('tasks_category', 'user_id') in columns
+        assert ('tasks_task_categories', 'task_id') in columns
+        assert ('tasks_task_categories', 'category_id') in columns
+        assert ('tasks_task', 'title') not in columns
+
+    def test_requires_postgresql(self, db):
+        """Test command refuses to run on SQLite."""
+        with pytest.raises(CommandError):
+            call_command('convert_ulid_storage')
+
+    def test_build_statements(self):
+        """Test generated SQL drops and restores foreign keys."""
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = lambda: ('character varying',)
+        cursor.fetchall.side_effect = [
+            [('tasks_task', 'tasks_task_user_id_fk', 'FOREIGN KEY (user_id) '
+              'REFERENCES tasks_user(id) DEFERRABLE INITIALLY DEFERRED')],
+            [('tasks_task_user_id_like',)],
+        ]
+        command = ConvertULIDStorageCommand()
+
+        statements = command.build_statements(cursor)
+
+        assert 'pg_temp.ulid_to_uuid' in statements[0]
+        assert any('DROP CONSTRAINT "tasks_task_user_id_fk"' in s for s in statements)
+        assert 'DROP INDEX "tasks_task_user_id_like"' in statements
+        assert any(
+            s.startswith('ALTER TABLE "tasks_task" ALTER COLUMN "user_id" TYPE uuid')
+            for s in statements
+        )
+        assert statements[-1].startswith(
+            'ALTER TABLE tasks_task ADD CONSTRAINT "tasks_task_user_id_fk"'
+        )
+
+    def test_build_statements_already_converted(self):
+        """Test nothing is generated when columns are already uuid."""
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ('uuid',)
+        assert ConvertULIDStorageCommand().build_statements(cursor) == []
+
+    def test_dry_run(self, db, capsys):
+        """Test dry run prints SQL without executing it."""
+        with patch(
+            'tasks.management.commands.convert_ulid_storage.connection'
+        ) as mock_connection:
+            mock_connection.vendor = 'postgresql'
+            with patch.object(
+                ConvertULIDStorageCommand, 'build_statements',
+                return_value=['SELECT 1']
+            ):
+                call_command('convert_ulid_storage', '--dry-run')
+
+        assert 'SELECT 1;' in capsys.readouterr().out
+
+
+class TestPartitionTasks:
+    """Tests for partition_tasks command."""
+
+    def test_requires_postgresql(self, db):
+        """Test command refuses to run on SQLite."""
+        with pytest.raises(CommandError):
+            call_command('partition_tasks')
+
+    def test_already_partitioned(self, db, capsys):
+        """Test command exits when the table is already partitioned."""
+        with patch(f'{PARTITION_COMMAND}.connection') as mock_connection, \
+                patch(f'{PARTITION_COMMAND}.is_partitioned', return_value=True):
+            mock_connection.vendor = 'postgresql'
+            call_command('partition_tasks')
+
+        assert 'уже секционирована' in capsys.readouterr().out
+
+    def test_dry_run(self, db, capsys):
+        """Test dry run prints conversion SQL."""
+        with patch(f'{PARTITION_COMMAND}.connection') as mock_connection, \
+                patch(f'{PARTITION_COMMAND}.is_partitioned', return_value=False), \
+                patch(
+                    f'{PARTITION_COMMAND}.partition_table_statements',
+                    return_value=['SELECT 1']
+                ):
+            mock_connection.vendor = 'postgresql'
+            call_command('partition_tasks', '--dry-run')
+
+        assert 'SELECT 1;' in capsys.readouterr().out
+
+    def test_converts_and_premakes(self, db, capsys):
+        """Test conversion runs table and maintenance statements."""
+        with patch(f'{PARTITION_COMMAND}.connection') as mock_connection, \
+                patch(f'{PARTITION_COMMAND}.transaction'), \
+                patch(f'{PARTITION_COMMAND}.is_partitioned', return_value=False), \
+                patch(
+                    f'{PARTITION_COMMAND}.partition_table_statements',
+                    return_value=['SELECT 1']
+                ), \
+                patch(
+                    f'{PARTITION_COMMAND}.maintenance_statements',
+                    return_value=['SELECT 2']
+                ):
+            mock_connection.vendor = 'postgresql'
+            call_command('partition_tasks')
+            cursor = mock_connection.cursor.return_value.__enter__.return_value
+            executed = [c.args[0] for c in cursor.execute.call_args_list]
+
+        assert executed == ['SELECT 1', 'SELECT 2']
+        assert 'секционирована' in capsys.readouterr().out
@@ -0,0 +1,237 @@
+"""
+Tests for read replica routing.
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import RequestFactory
+from django.utils import timezone
+from datetime import timedelta
+
+from tasks.models import User, Task
+from todo_project import db_router
+from todo_project.db_router import (
+    ReplicaRouter, ReplicaRoutingMiddleware, replica_reads, mark_recent_write, has_recent_write,
+    replica_is_healthy, replica_lag, choose_replica
+)
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+@pytest.fixture
+def replica(settings):
+    """Enables the simulated replica and clears router state."""
+    settings.REPLICA_DATABASES = ['replica']
+    db_router._lag_checks.clear()
+    db_router._rotation.clear()
+    cache.clear()
+    yield 'replica'
+    db_router._lag_checks.clear()
+    cache.clear()
+
+
+@pytest.fixture
+def replica_user(replica):
+    """User that exists only on the replica with a stale username."""
+    user = User.objects.using('replica').create(
+        username='replica_copy', telegram_id=555
+    )
+    cache.clear()
+    return user
+
+
+class TestReplicaRouter:
+    """Tests for ReplicaRouter."""
+
+    def test_no_replicas(self):
+        """Test reads stay on default without replicas."""
+        with replica_reads():
+            assert ReplicaRouter().db_for_read(Task) is None
+
+    def test_reads_outside_context_use_primary(self, replica):
+        """Test replica is only used when explicitly allowed."""
+        assert ReplicaRouter().db_for_read(Task) is None
+        with replica_reads():
+            assert ReplicaRouter().db_for_read(Task) == 'replica'
+
+    def test_writes_use_primary(self, replica):
+        """Test writes always go to default."""
+        with replica_reads():
+            assert ReplicaRouter().db_for_write(Task) == 'default'
+        assert ReplicaRouter().allow_relation(None, None) is True
+
+    def test_unhealthy_replica_skipped(self, replica):
+        """Test lagging replica falls back to primary."""
+        with patch('todo_project.db_router.replica_lag', return_value=60):
+            assert choose_replica() is None
+
+    def test_lag_check_is_cached(self, replica, settings):
+        """Test replica lag is checked at most once per interval."""
+        settings.REPLICA_LAG_CHECK_INTERVAL = 60
+        with patch(
+            'todo_project.db_router.replica_lag', return_value=0
+        ) as mock_lag:
+            assert replica_is_healthy('replica') is True
+            assert replica_is_healthy('replica') is True
+        assert mock_lag.call_count == 1
+
+    def test_replica_lag_sqlite(self, replica):
+        """Test non-PostgreSQL replicas report no lag."""
+        assert replica_lag('replica') == 0
+
+    def test_replica_lag_postgresql(self):
+        """Test lag query result and failures on PostgreSQL."""
+        connection = MagicMock(vendor='postgresql')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (1.5,)
+        with patch.dict('todo_project.db_router.connections', {'r': connection}):
+            assert replica_lag('r') == 1.5
+            sql = cursor.execute.call_args[0][0]
+            assert 'pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()' in sql
+            cursor.execute.side_effect = DatabaseError
+            assert replica_lag('r') is None
+
+
+class TestReadYourWrites:
+    """Tests for read-your-writes pinning."""
+
+    def test_mark_recent_write(self, replica):
+        """Test recent writes are remembered per telegram_id."""
+        assert has_recent_write(42) is False
+        mark_recent_write(42)
+        assert has_recent_write(42) is True
+        assert has_recent_write(None) is False
+
+    def test_mark_ignored_without_replicas(self):
+        """Test nothing is recorded without replicas."""
+        mark_recent_write(43)
+        assert has_recent_write(43) is False
+
+    def test_save_marks_owner(self, replica, user, category):
+        """Test saving a task pins its owner to primary."""
+        cache.clear()
+        task = Task.objects.create(title='Pinned', user=user)
+        assert has_recent_write(user.telegram_id) is True
+
+        cache.clear()
+        task.categories.add(category)
+        assert has_recent_write(user.telegram_id) is True
+
+    def test_save_marks_user_and_object(self, replica, user):
+        """Test saving a task also pins its user id and its own id."""
+        cache.clear()
+        task = Task.objects.create(title='Pinned', user=user)
+        assert has_recent_write(user.id) is True
+        assert has_recent_write(task.id) is True
+        assert has_recent_write(None, 'other', task.id) is True
+        assert has_recent_write(None, 'other') is False
+
+
+class TestReplicaRoutingMiddleware:
+    """Tests for request-level routing."""
+
+    def test_get_reads_from_replica(self, api_client, replica_user):
+        """Test safe requests are served by the replica."""
+        response = api_client.get(
+            '/api/users/by_telegram/', {'telegram_id': 555}
+        )
+        assert response.status_code == 200
+        assert response.data['username'] == 'replica_copy'
+
+    def test_recent_writer_reads_primary(self, api_client, replica_user):
+        """Test a user who just wrote reads from primary."""
+        api_client.post(
+            '/api/users/register_telegram/',
+            {'telegram_id': 555, 'username': 'primary_user'},
+            format='json'
+        )
+        response = api_client.get(
+            '/api/users/by_telegram/', {'telegram_id': 555}
+        )
+        assert response.data['username'] == 'primary_user'
+
+    @pytest.fixture
+    def written_task(self, replica_user):
+        """Task just written to primary, still stale on the replica."""
+        stale = Task.objects.using('replica').create(
+            title='stale', user=replica_user
+        )
+        user = User.objects.create(
+            id=replica_user.id, username='primary_user', telegram_id=555
+        )
+        cache.clear()
+        return Task.objects.create(id=stale.id, title='fresh', user=user)
+
+    def test_task_detail_after_write_reads_primary(
+        self, api_client, written_task
+    ):
+        """Test a task read by its URL pk after a write uses primary."""
+        response = api_client.get(f'/api/tasks/{written_task.id}/')
+        assert response.json()['title'] == 'fresh'
+
+    def test_user_id_filter_after_write_reads_primary(
+        self, api_client, written_task
+    ):
+        """Test a list filtered by user_id after a write uses primary."""
+        response = api_client.get(
+            '/api/tasks/', {'user_id': str(written_task.user_id)}
+        )
+        titles = [task['title'] for task in response.data['results']]
+        assert titles == ['fresh']
+
+    def test_untouched_task_reads_replica(self, api_client, replica_user):
+        """Test a task nobody wrote recently is still read from the replica."""
+        stale = Task.objects.using('replica').create(
+            title='stale', user=replica_user
+        )
+        cache.clear()
+        response = api_client.get(f'/api/tasks/{stale.id}/')
+        assert response.json()['title'] == 'stale'
+
+    def test_without_replicas_reads_primary(self, api_client, user):
+        """Test requests use default when no replicas are configured."""
+        response = api_client.get(
+            '/api/users/by_telegram/', {'telegram_id': user.telegram_id}
+        )
+        assert response.data['username'] == user.username
+
+    def test_async_middleware(self, replica):
+        """Test the async path applies the same routing decision."""
+        async def get_response(request):
+            return ReplicaRouter().db_for_read(Task)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        factory = RequestFactory()
+        mark_recent_write(555)
+
+        assert async_to_sync(middleware)(factory.get('/')) == 'replica'
+        assert async_to_sync(middleware)(
+            factory.get('/', {'telegram_id': 555})
+        ) is None
+        assert async_to_sync(middleware)(factory.post('/')) is None
+        assert async_to_sync(middleware)(
+            factory.get('/api/tasks/missing/x/')
+        ) == 'replica'
+
+
+class TestDueScanReplica:
+    """Tests for check_due_tasks replica opt-in."""
+
+    @patch('tasks.tasks.send_task_notification.delay')
+    def test_due_scan_reads_replica(self, mock_delay, replica_user, settings):
+        """Test due scan reads from the replica when opted in."""
+        from tasks.tasks import check_due_tasks
+        settings.TASK_DUE_SCAN_USE_REPLICA = True
+        replica_task = Task.objects.using('replica').create(
+            title='Replica overdue',
+            user=replica_user,
+            due_date=timezone.now() - timedelta(hours=1)
+        )
+
+        result = check_due_tasks()
+
+        mock_delay.assert_called_once_with(replica_task.id)
+        assert 'Scheduled 1' in result
@@ -3,11 +3,18 @@ Tests for Django models: User, Category, Task and ULID field.
 """
 
 import pytest
+from unittest.mock import MagicMock
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from ulid import ULID
 
 from tasks.models import User, Category, Task
-from tasks.fields import generate_ulid, ULIDField
+from tasks import fields
+from tasks.fields import (
+    generate_ulid, generate_ulids, is_valid_ulid, ulid_floor, ULIDField
+)
 
 
 class TestULIDField:
@@ -28,6 +35,47 @@ class TestULIDField:
         ulids = [generate_ulid() for _ in range(100)]
         assert len(set(ulids)) == 100
 
+    def test_generate_ulids_monotonic(self):
+        """Test batch ULIDs are valid and strictly increasing."""
+        ulids = generate_ulids(1000)
+        assert len(ulids) == 1000
+        assert ulids == sorted(ulids)
+        assert len(set(ulids)) == 1000
+        assert all(str(ULID.from_str(u)) == u for u in ulids)
+        assert generate_ulid() > ulids[-1]
+
+    def test_generate_ulids_empty(self):
+        """Test requesting zero ULIDs returns empty list."""
+        assert generate_ulids(0) == []
+
+    def test_generate_ulids_increments_randomness(self, monkeypatch):
+        """Test ULIDs within one millisecond differ by one across blocks."""
+        monkeypatch.setattr(fields, '_last_milliseconds', 2 ** 47)
+        monkeypatch.setattr(fields, '_last_randomness', (1 << 20) - 3)
+
+        ulids = generate_ulids(5)
+
+        values = [int(ULID.from_str(u)) for u in ulids]
+        assert values == list(range(values[0], values[0] + 5))
+        assert ULID.from_str(ulids[0]).milliseconds == 2 ** 47
+
+    def test_generate_ulids_overflow_moves_timestamp(self, monkeypatch):
+        """Test randomness overflow advances the timestamp."""
+        monkeypatch.setattr(fields, '_last_milliseconds', 2 ** 47)
+        monkeypatch.setattr(fields, '_last_randomness', fields.RANDOMNESS_MAX)
+
+        ulids = generate_ulids(2)
+
+        assert ULID.from_str(ulids[0]).milliseconds == 2 ** 47 + 1
+        assert ulids[0] < ulids[1]
+
+    def test_reset_monotonic_state(self, monkeypatch):
+        """Test generator state reset used after fork."""
+        monkeypatch.setattr(fields, '_last_milliseconds', 2 ** 47)
+        fields._reset_monotonic_state()
+        assert fields._last_milliseconds == 0
+        assert fields._last_randomness == 0
+
     def test_ulid_field_default_max_length(self):
         """Test ULIDField default max_length."""
         field = ULIDField()
@@ -46,6 +94,94 @@ class TestULIDField:
         assert 'default' not in kwargs
         assert 'editable' not in kwargs
 
+    def test_is_valid_ulid(self):
+        """Test ULID string validation helper."""
+        assert is_valid_ulid(generate_ulid()) is True
+        assert is_valid_ulid(generate_ulid().lower()) is True
+        assert is_valid_ulid('non-existent-id') is False
+        assert is_valid_ulid('U' * 26) is False
+        assert is_valid_ulid(None) is False
+
+    def test_ulid_floor(self):
+        """Test ulid_floor bounds ULIDs generated at a moment."""
+        moment = timezone.now()
+        floor = ulid_floor(moment)
+        assert floor.endswith('0' * 16)
+        assert ULID.from_str(floor).milliseconds == int(moment.timestamp() * 1000)
+        assert str(ULID.from_datetime(moment)) >= floor
+        assert ulid_floor(moment - timedelta(milliseconds=1)) < floor
+
+    def test_ulid_floor_exact_milliseconds(self):
+        """Test the floor is not off by a millisecond from float rounding."""
+        moment = datetime(3000, 1, 1, 0, 7, 18, 883998, tzinfo=dt_timezone.utc)
+        assert ULID.from_str(ulid_floor(moment)).milliseconds == 32503680438883
+
+    def test_ulid_floor_out_of_range(self):
+        """Test moments outside the 48-bit timestamp are clamped."""
+        before_epoch = datetime(1960, 1, 1, tzinfo=dt_timezone.utc)
+        assert ulid_floor(before_epoch) == '0' * 26
+        far = datetime.max.replace(tzinfo=dt_timezone.utc)
+        assert ULID.from_str(ulid_floor(far)).milliseconds < 2 ** 48
+
+    def test_ulid_field_db_type(self):
+        """Test ULIDField uses 16-byte column types."""
+        field = ULIDField()
+        postgres = MagicMock(vendor='postgresql')
+        sqlite = MagicMock(vendor='sqlite')
+        assert field.db_type(postgres) == 'uuid'
+        assert field.db_type(sqlite) == 'blob'
+        assert field.cast_db_type(postgres) == 'uuid'
+
+    def test_ulid_field_db_prep_value(self):
+        """Test ULIDField converts strings to uuid or bytes."""
+        field = ULIDField()
+        value = ULID()
+        postgres = MagicMock(vendor='postgresql')
+        sqlite = MagicMock(vendor='sqlite')
+        assert field.get_db_prep_value(str(value), postgres) == value.to_uuid()
+        assert field.get_db_prep_value(str(value), sqlite) == value.bytes
+        assert field.get_db_prep_value(str(value), sqlite, prepared=True) == value.bytes
+        assert field.get_db_prep_value(None, sqlite) is None
+
+    def test_ulid_field_to_python(self):
+        """Test ULIDField normalizes all storage forms to a string."""
+        field = ULIDField()
+        value = ULID()
+        assert field.to_python(value) == str(value)
+        assert field.to_python(value.to_uuid()) == str(value)
+        assert field.to_python(value.bytes) == str(value)
+        assert field.to_python(memoryview(value.bytes)) == str(value)
+        assert field.to_python(str(value).lower()) == str(value)
+        assert field.to_python(None) is None
+
+    def test_ulid_field_to_python_invalid(self):
+        """Test ULIDField rejects invalid values."""
+        field = ULIDField()
+        with pytest.raises(ValidationError):
+            field.to_python('non-existent-id')
+        with pytest.raises(ValidationError):
+            field.to_python(b'short')
+
+    def test_ulid_stored_as_bytes(self, task, user, db):
+        """Test ULID keys are stored as 16 bytes and read back as strings."""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id, user_id FROM tasks_task')
+            task_id, user_id = cursor.fetchone()
+        assert bytes(task_id) == ULID.from_str(task.id).bytes
+        assert bytes(user_id) == ULID.from_str(user.id).bytes
+
+        task.refresh_from_db()
+        assert isinstance(task.id, str)
+        assert task.user_id == user.id
+        assert Task.objects.filter(id=task.id.lower()).exists()
+
+    def test_ulid_order_matches_string_order(self, user, db):
+        """Test ordering by binary ULID keeps the string order."""
+        ids = sorted(generate_ulid() for _ in range(20))
+        for task_id in reversed(ids):
+            Task.objects.create(id=task_id, title='Ordered', user=user)
+        assert list(Task.objects.order_by('id').values_list('id', flat=True)) == ids
+
 
 class TestUserModel:
     """Tests for User model."""
@@ -86,6 +222,20 @@ class TestUserModel:
         assert isinstance(user.pk, str)
         assert len(user.pk) == 26
 
+    def test_user_timezone_default(self, user):
+        """Test users without a time zone use the project one."""
+        assert user.tzinfo().key == 'America/Adak'
+
+    def test_user_timezone(self, user):
+        """Test a configured time zone is used and validated."""
+        user.timezone = 'Europe/Moscow'
+        user.full_clean()
+        assert user.tzinfo().key == 'Europe/Moscow'
+
+        user.timezone = 'Mars/Olympus'
+        with pytest.raises(ValidationError):
+            user.full_clean()
+
 
 class TestCategoryModel:
     """Tests for Category model."""
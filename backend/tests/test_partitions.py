@@ -0,0 +1,172 @@
+"""
+Tests for Task table partitioning helpers.
+"""
+
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import MagicMock, patch
+
+from ulid import ULID
+
+from tasks.partitions import (
+    month_start, partition_bound, partition_name, partition_month,
+    create_partition_sql, maintenance_statements, maintain_partitions,
+    partition_table_statements
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class TestPartitionHelpers:
+    """Tests for partition naming and bounds."""
+
+    def test_month_start(self):
+        """Test month arithmetic across year boundaries."""
+        moment = utc(2024, 12, 15, 10, 30)
+        assert month_start(moment) == utc(2024, 12, 1)
+        assert month_start(moment, 1) == utc(2025, 1, 1)
+        assert month_start(moment, -12) == utc(2023, 12, 1)
+
+    def test_partition_bound(self):
+        """Test bound is the smallest ULID of the moment as uuid."""
+        bound = partition_bound(utc(2024, 3, 1))
+        ulid = ULID.from_uuid(uuid.UUID(bound))
+        assert ulid.datetime == utc(2024, 3, 1)
+        assert bound.endswith('0000-000000000000')
+
+    def test_partition_name_roundtrip(self):
+        """Test partition month is parsed back from its name."""
+        name = partition_name('tasks_task', utc(2024, 3, 1))
+        assert name == 'tasks_task_p2024_03'
+        assert partition_month('tasks_task', name) == utc(2024, 3, 1)
+        assert partition_month('tasks_task', 'tasks_task_legacy') is None
+        assert partition_month('tasks_task', 'other_p2024_03') is None
+
+    def test_create_partition_sql(self):
+        """Test monthly partition covers one month of ULIDs."""
+        sql = create_partition_sql('tasks_task', utc(2024, 3, 1))
+        assert '"tasks_task_p2024_03" PARTITION OF "tasks_task"' in sql
+        assert f"FROM ('{partition_bound(utc(2024, 3, 1))}')" in sql
+        assert f"TO ('{partition_bound(utc(2024, 4, 1))}')" in sql
+
+
+class TestPartitionMaintenance:
+    """Tests for partition maintenance statements."""
+
+    def test_not_partitioned(self):
+        """Test nothing is done for a plain table."""
+        cursor = MagicMock()
+        cursor.fetchone.return_value = None
+        assert maintenance_statements(cursor, utc(2024, 3, 10)) == []
+
+    def test_premake_and_detach(self, settings):
+        """Test future partitions are created and empty old ones detached."""
+        settings.TASK_PARTITION_PREMAKE_MONTHS = 2
+        settings.TASK_PARTITION_RETENTION_MONTHS = 3
+        cursor = MagicMock()
+        # partitioned table, default partition has no rows of 2024-04 and
+        # 2024-05, then p2023_10 still has tasks, p2023_11 is empty
+        cursor.fetchone.side_effect = [(1,), None, None, (1,), None]
+        cursor.fetchall.return_value = [
+            ('tasks_task_legacy',), ('tasks_task_default',),
+            ('tasks_task_p2023_10',), ('tasks_task_p2023_11',),
+            ('tasks_task_p2023_12',), ('tasks_task_p2024_03',),
+        ]
+
+        statements = maintenance_statements(cursor, utc(2024, 3, 10))
+
+        assert '"tasks_task_p2024_04"' in statements[0]
+        assert '"tasks_task_p2024_05"' in statements[1]
+        assert statements[2] == (
+            'ALTER TABLE "tasks_task" DETACH PARTITION "tasks_task_p2023_11"'
+        )
+        assert len(statements) == 3
+
+    def test_no_retention(self, settings):
+        """Test old partitions are kept without retention setting."""
+        settings.TASK_PARTITION_PREMAKE_MONTHS = 1
+        settings.TASK_PARTITION_RETENTION_MONTHS = 0
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = [(1,), None]
+
+        statements = maintenance_statements(cursor, utc(2024, 3, 10))
+
+        assert len(statements) == 1
+        cursor.fetchall.assert_not_called()
+
+    def test_populated_default_moved(self, settings):
+        """Test rows that fell into the default partition are moved out."""
+        settings.TASK_PARTITION_PREMAKE_MONTHS = 1
+        settings.TASK_PARTITION_RETENTION_MONTHS = 0
+        cursor = MagicMock()
+        # partitioned table, default partition holds rows of 2024-04
+        cursor.fetchone.side_effect = [(1,), (1,)]
+
+        statements = maintenance_statements(cursor, utc(2024, 3, 10))
+
+        lower = partition_bound(utc(2024, 4, 1))
+        upper = partition_bound(utc(2024, 5, 1))
+        where = f"id >= '{lower}' AND id < '{upper}'"
+        assert statements == [
+            'CREATE TABLE "tasks_task_p2024_04" '
+            '(LIKE "tasks_task" INCLUDING ALL)',
+            'INSERT INTO "tasks_task_p2024_04" '
+            f'SELECT * FROM "tasks_task_default" WHERE {where}',
+            f'DELETE FROM "tasks_task_default" WHERE {where}',
+            'ALTER TABLE "tasks_task" ATTACH PARTITION "tasks_task_p2024_04" '
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')",
+        ]
+        sql, params = cursor.execute.call_args_list[1].args
+        assert '"tasks_task_default"' in sql
+        assert params == [lower, upper]
+
+    def test_maintain_disabled(self, settings):
+        """Test maintenance is a no-op unless partitioning is enabled."""
+        settings.TASK_PARTITIONING = False
+        assert maintain_partitions(utc(2024, 3, 10)) == 0
+
+    def test_maintain_enabled(self, settings):
+        """Test maintenance executes generated statements."""
+        settings.TASK_PARTITIONING = True
+        with patch('tasks.partitions.connection') as mock_connection, \
+                patch('tasks.partitions.transaction'), \
+                patch(
+                    'tasks.partitions.maintenance_statements',
+                    return_value=['SELECT 1', 'SELECT 2']
+                ):
+            mock_connection.vendor = 'postgresql'
+            assert maintain_partitions(utc(2024, 3, 10)) == 2
+            cursor = mock_connection.cursor.return_value.__enter__.return_value
+            assert cursor.execute.call_count == 2
+
+    def test_partition_table_statements(self):
+        """Test conversion keeps rows in a legacy partition."""
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [
+            [('tasks_task_categories', 'task_fk',
+              'FOREIGN KEY (task_id) REFERENCES tasks_task(id)')],
+            [('user_fk', 'FOREIGN KEY (user_id) REFERENCES tasks_user(id)')],
+        ]
+
+        statements = partition_table_statements(cursor, utc(2024, 3, 10))
+
+        assert statements[0] == (
+            'ALTER TABLE tasks_task_categories DROP CONSTRAINT "task_fk"'
+        )
+        assert 'RENAME TO "tasks_task_legacy"' in statements[1]
+        assert any('PARTITION BY RANGE (id)' in s for s in statements)
+        assert any(
+            'ATTACH PARTITION "tasks_task_legacy" FOR VALUES FROM (MINVALUE) '
+            f"TO ('{partition_bound(utc(2024, 4, 1))}')" in s
+            for s in statements
+        )
+        assert any('DEFAULT' in s for s in statements)
+        assert statements[-2] == (
+            'ALTER TABLE "tasks_task" ADD CONSTRAINT "user_fk" '
+            'FOREIGN KEY (user_id) REFERENCES tasks_user(id)'
+        )
+        assert statements[-1].startswith(
+            'ALTER TABLE tasks_task_categories ADD CONSTRAINT "task_fk"'
+        )
@@ -0,0 +1,107 @@
+"""
+Tests for signal handlers: category snapshots on tasks.
+"""
+
+from django.core.management import call_command
+
+from tasks.models import Category, Task, ArchivedTask
+
+
+def snapshot_names(task):
+    task.refresh_from_db()
+    return [c['name'] for c in task.category_snapshot]
+
+
+class TestCategorySnapshot:
+    """Tests for Task.category_snapshot maintenance."""
+
+    def test_add_updates_snapshot(self, task, category, another_category, db):
+        """Test adding categories refreshes database and instance."""
+        task.categories.add(another_category)
+        assert [c['name'] for c in task.category_snapshot] == [
+            'Another Category', 'Test Category'
+        ]
+        assert snapshot_names(task) == ['Another Category', 'Test Category']
+        assert task.category_snapshot[1] == {
+            'id': category.id, 'name': 'Test Category', 'color': '#ff5733'
+        }
+
+    def test_set_and_clear(self, task, another_category, db):
+        """Test set() and clear() keep snapshot in sync."""
+        task.categories.set([another_category])
+        assert snapshot_names(task) == ['Another Category']
+        task.categories.clear()
+        assert snapshot_names(task) == []
+
+    def test_reverse_add_and_remove(self, task_without_due_date, category, db):
+        """Test changes from the category side update tasks."""
+        category.tasks.add(task_without_due_date)
+        assert snapshot_names(task_without_due_date) == ['Test Category']
+        category.tasks.remove(task_without_due_date)
+        assert snapshot_names(task_without_due_date) == []
+
+    def test_reverse_clear(self, task, category, db):
+        """Test clearing tasks of a category updates their snapshots."""
+        category.tasks.clear()
+        assert snapshot_names(task) == []
+
+    def test_rename_fans_out(self, multiple_tasks, category, settings, db):
+        """Test renaming a category updates all its tasks in batches."""
+        settings.CATEGORY_SNAPSHOT_BATCH_SIZE = 2
+        category = Category.objects.get(id=category.id)
+        category.name = 'Renamed'
+        category.color = '#000000'
+        category.save()
+
+        for task in multiple_tasks[::2]:
+            task.refresh_from_db()
+            assert task.category_snapshot == [
+                {'id': category.id, 'name': 'Renamed', 'color': '#000000'}
+            ]
+        multiple_tasks[1].refresh_from_db()
+        assert multiple_tasks[1].category_snapshot == []
+
+    def test_save_without_change_skips_fan_out(
+        self, task, category, django_assert_num_queries, db
+    ):
+        """Test saving an unchanged category does not touch tasks."""
+        category = Category.objects.get(id=category.id)
+        with django_assert_num_queries(1):
+            category.save()
+
+    def test_delete_category(self, task, category, db):
+        """Test deleting a category removes it from snapshots."""
+        category.delete()
+        assert snapshot_names(task) == []
+
+    def test_archived_task_snapshot(self, user, category, db):
+        """Test archived tasks keep their own snapshots in sync."""
+        archived = ArchivedTask.objects.create(
+            title='Archived', user=user,
+            created_at=category.created_at, updated_at=category.created_at
+        )
+        archived.categories.add(category)
+        assert snapshot_names(archived) == ['Test Category']
+
+        category.name = 'Renamed'
+        category.save()
+        assert snapshot_names(archived) == ['Renamed']
+
+    def test_list_reads_single_table(
+        self, api_client, multiple_tasks, user, django_assert_num_queries, db
+    ):
+        """Test task list needs no categories query."""
+        with django_assert_num_queries(1):
+            response = api_client.get(
+                '/api/tasks/by_telegram/', {'telegram_id': user.telegram_id}
+            )
+        assert response.data[0]['categories'][0]['name'] == 'Test Category'
+
+    def test_rebuild_command(self, task, category, db, capsys):
+        """Test full snapshot rebuild restores stale snapshots."""
+        Task.objects.filter(id=task.id).update(category_snapshot=[])
+
+        call_command('rebuild_category_snapshots')
+
+        assert snapshot_names(task) == ['Test Category']
+        assert 'пересчитано 1' in capsys.readouterr().out
@@ -6,8 +6,13 @@ from unittest.mock import patch, MagicMock
 from django.utils import timezone
 from datetime import timedelta
 
-from tasks.models import Task
-from tasks.tasks import send_task_notification, check_due_tasks
+from ulid import ULID
+
+from tasks.models import Task, ArchivedTask
+from tasks.tasks import (
+    send_task_notification, check_due_tasks, archive_completed_tasks,
+    maintain_task_partitions
+)
 
 
 class TestSendTaskNotification:
@@ -122,6 +127,21 @@ class TestSendTaskNotification:
             assert overdue_task.title in message
             assert 'Напоминание' in message
 
+    @patch('tasks.tasks.requests.post')
+    def test_notification_uses_configured_api_url(
+        self, mock_post, overdue_task, settings, db
+    ):
+        """Test notifications go to TELEGRAM_API_URL."""
+        mock_post.return_value = MagicMock(status_code=200)
+        settings.TELEGRAM_BOT_TOKEN = 'test-token'
+        settings.TELEGRAM_API_URL = 'http://127.0.0.1:8081'
+
+        send_task_notification(overdue_task.id)
+
+        assert mock_post.call_args[0][0] == (
+            'http://127.0.0.1:8081/bottest-token/sendMessage'
+        )
+
 
 class TestCheckDueTasks:
     """Tests for check_due_tasks periodic task."""
@@ -206,3 +226,88 @@ class TestCheckDueTasks:
 
         assert mock_delay.call_count == 3
         assert 'Scheduled 3' in result
+
+    @patch('tasks.tasks.send_task_notification.delay')
+    def test_check_due_tasks_scan_window(
+        self, mock_delay, user, settings, db
+    ):
+        """Test due scan window is by due date, not by creation time."""
+        settings.TASK_DUE_SCAN_WINDOW_DAYS = 30
+        old = Task.objects.create(
+            id=str(ULID.from_datetime(timezone.now() - timedelta(days=60))),
+            title='Old, recently due',
+            user=user,
+            due_date=timezone.now() - timedelta(hours=1)
+        )
+        Task.objects.create(
+            title='Due long ago',
+            user=user,
+            due_date=timezone.now() - timedelta(days=31)
+        )
+
+        result = check_due_tasks()
+
+        mock_delay.assert_called_once_with(old.id)
+        assert 'Scheduled 1' in result
+
+
+class TestArchiveCompletedTasks:
+    """Tests for archive_completed_tasks periodic task."""
+
+    def make_old(self, task, days=60):
+        Task.objects.filter(id=task.id).update(
+            updated_at=timezone.now() - timedelta(days=days)
+        )
+
+    def test_archives_old_completed_task(self, completed_task, category, db):
+        """Test old completed task moves to archive with categories."""
+        completed_task.categories.add(category)
+        self.make_old(completed_task)
+
+        result = archive_completed_tasks()
+
+        assert 'Archived 1 tasks' in result
+        assert not Task.objects.filter(id=completed_task.id).exists()
+        archived = ArchivedTask.objects.get(id=completed_task.id)
+        assert archived.title == completed_task.title
+        assert archived.created_at == completed_task.created_at
+        assert archived.user_id == completed_task.user_id
+        assert list(archived.categories.all()) == [category]
+
+    def test_keeps_recent_and_open_tasks(self, completed_task, task, db):
+        """Test recent completed and open tasks stay in the hot table."""
+        self.make_old(task)
+
+        result = archive_completed_tasks()
+
+        assert 'Archived 0 tasks' in result
+        assert Task.objects.count() == 2
+        assert not ArchivedTask.objects.exists()
+
+    def test_archives_in_batches(self, user, settings, db):
+        """Test archival processes several batches in one run."""
+        settings.TASK_ARCHIVE_BATCH_SIZE = 2
+        for i in range(5):
+            self.make_old(Task.objects.create(
+                title=f'Done {i}', status='completed', user=user
+            ))
+
+        result = archive_completed_tasks()
+
+        assert 'Archived 5 tasks' in result
+        assert not Task.objects.exists()
+        assert ArchivedTask.objects.count() == 5
+
+
+class TestMaintainTaskPartitions:
+    """Tests for maintain_task_partitions periodic task."""
+
+    def test_noop_without_partitioning(self, db):
+        """Test maintenance does nothing on a plain table."""
+        assert maintain_task_partitions() == 'Executed 0 partition statements'
+
+    @patch('tasks.tasks.maintain_partitions', return_value=3)
+    def test_reports_statements(self, mock_maintain, db):
+        """Test maintenance reports executed statements."""
+        assert maintain_task_partitions() == 'Executed 3 partition statements'
+        mock_maintain.assert_called_once()
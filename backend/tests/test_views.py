@@ -2,7 +2,21 @@
 Tests for API views: UserViewSet, CategoryViewSet, TaskViewSet.
 """
 
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
+from ulid import ULID
+
+from tasks.dashboard import DASHBOARD_KEY, dashboard_version
+from tasks.models import Task, ArchivedTask
+from tasks.views import due_window
 
 
 class TestHealthCheck:
@@ -290,3 +304,578 @@ class TestTaskViewSet:
         results = response.data.get('results', response.data)
         for item in results:
             assert 'created_at' in item
+
+
+class TestTaskCreatedRangeFilter:
+    """Tests for created_after/created_before filters on tasks."""
+
+    def create_task_at(self, user, moment, title):
+        return Task.objects.create(
+            id=str(ULID.from_datetime(moment)),
+            title=title,
+            user=user
+        )
+
+    def test_created_range(self, api_client, user, db):
+        """Test filtering tasks by creation window from ULID keys."""
+        day = datetime(2024, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+        self.create_task_at(user, day - timedelta(days=2), 'Old')
+        self.create_task_at(user, day, 'Inside')
+        self.create_task_at(user, day + timedelta(days=2), 'New')
+
+        response = api_client.get('/api/tasks/', {
+            'created_after': (day - timedelta(days=1)).isoformat(),
+            'created_before': (day + timedelta(days=1)).isoformat(),
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data.get('results', response.data)
+        assert [t['title'] for t in results] == ['Inside']
+
+    def test_created_after_date(self, api_client, user, db):
+        """Test date-only values start at midnight in project timezone."""
+        self.create_task_at(
+            user, datetime(2024, 3, 9, 12, 0, tzinfo=dt_timezone.utc), 'Old'
+        )
+        self.create_task_at(
+            user, datetime(2024, 3, 11, 12, 0, tzinfo=dt_timezone.utc), 'New'
+        )
+
+        response = api_client.get('/api/tasks/by_telegram/', {
+            'telegram_id': user.telegram_id,
+            'created_after': '2024-03-10',
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [t['title'] for t in response.data] == ['New']
+
+    def test_created_after_before_epoch(self, api_client, task, db):
+        """Test dates before ULID time starts match every task."""
+        response = api_client.get('/api/tasks/', {'created_after': '1960-01-01'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+
+    @pytest.mark.parametrize('value', [
+        'yesterday', '2024-02-30', '2024-13-01', '2024-03-10T25:00'
+    ])
+    def test_created_range_invalid(self, api_client, user, db, value):
+        """Test malformed and impossible dates return validation error."""
+        response = api_client.get('/api/tasks/', {'created_before': value})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'created_before' in response.data
+
+    def test_list_tasks_invalid_user_id(self, api_client, task, db):
+        """Test malformed user_id matches no tasks."""
+        response = api_client.get('/api/tasks/', {'user_id': 'not-a-ulid'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 0
+
+
+class TestTaskIncludeArchived:
+    """Tests for include_archived on task lists."""
+
+    @pytest.fixture
+    def archived_task(self, user, category, db):
+        archived = ArchivedTask.objects.create(
+            title='Archived Task',
+            status='completed',
+            user=user,
+            created_at=timezone.now() - timedelta(days=90),
+            updated_at=timezone.now() - timedelta(days=60)
+        )
+        archived.categories.add(category)
+        return archived
+
+    def test_list_excludes_archived_by_default(
+        self, api_client, task, archived_task, db
+    ):
+        """Test archived tasks are hidden unless requested."""
+        response = api_client.get('/api/tasks/')
+        results = response.data['results']
+        assert [t['id'] for t in results] == [task.id]
+        assert results[0]['archived'] is False
+
+    def test_list_include_archived(self, api_client, task, archived_task, db):
+        """Test include_archived appends archived tasks, newest first."""
+        response = api_client.get('/api/tasks/', {'include_archived': '1'})
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        assert [t['id'] for t in results] == [task.id, archived_task.id]
+        assert results[1]['archived'] is True
+        assert results[1]['categories'][0]['name'] == 'Test Category'
+
+    def test_list_include_archived_applies_filters(
+        self, api_client, task, archived_task, db
+    ):
+        """Test filters apply to archived tasks too."""
+        response = api_client.get(
+            '/api/tasks/', {'include_archived': 'true', 'status': 'pending'}
+        )
+        assert [t['id'] for t in response.data['results']] == [task.id]
+
+    def test_list_include_archived_unpaginated(
+        self, api_client, task, archived_task, db
+    ):
+        """Test include_archived works without pagination."""
+        with patch('tasks.views.TaskViewSet.pagination_class', None):
+            response = api_client.get('/api/tasks/', {'include_archived': '1'})
+        assert len(response.data) == 2
+
+    def test_by_telegram_include_archived(
+        self, api_client, task, archived_task, user, db
+    ):
+        """Test by_telegram returns archived tasks when requested."""
+        response = api_client.get('/api/tasks/by_telegram/', {
+            'telegram_id': user.telegram_id,
+            'include_archived': '1',
+        })
+        assert [t['id'] for t in response.data] == [task.id, archived_task.id]
+
+    def test_list_include_archived_pages(self, api_client, user, db):
+        """Test pages merge both tables and read only up to the page end."""
+        now = timezone.now()
+        for n in range(25):
+            moment = now - timedelta(hours=2 * n)
+            hot = Task.objects.create(title=f'Hot {n}', user=user)
+            Task.objects.filter(pk=hot.pk).update(created_at=moment)
+            ArchivedTask.objects.create(
+                title=f'Cold {n}', status='completed', user=user,
+                created_at=moment - timedelta(hours=1),
+                updated_at=moment
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(
+                '/api/tasks/', {'include_archived': '1', 'page': 2}
+            )
+
+        assert response.data['count'] == 50
+        titles = [t['title'] for t in response.data['results']]
+        assert titles[:2] == ['Hot 10', 'Cold 10']
+        assert titles[-1] == 'Cold 19'
+        selects = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and 'COUNT' not in q['sql']
+        ]
+        assert selects and all('LIMIT 40' in sql for sql in selects)
+
+    def test_retrieve_archived(self, api_client, archived_task, db):
+        """Test archived tasks are found by id only when requested."""
+        url = f'/api/tasks/{archived_task.id}/'
+
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        response = api_client.get(url, {'include_archived': '1'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['archived'] is True
+
+        missing = f'/api/tasks/{"0" * 26}/'
+        response = api_client.get(missing, {'include_archived': '1'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestBatch:
+    """Tests for the batch endpoint."""
+
+    def post(self, api_client, requests, **extra):
+        return api_client.post(
+            '/api/batch/', {'requests': requests, **extra}, format='json'
+        )
+
+    def test_batch(self, api_client, task, category, user, db):
+        """Test sub-requests run in order and return their responses."""
+        response = self.post(api_client, [
+            {
+                'method': 'POST', 'path': 'users/register_telegram/',
+                'body': {'telegram_id': user.telegram_id}
+            },
+            {'path': f'tasks/by_telegram/?telegram_id={user.telegram_id}'},
+            {'path': f'/api/categories/?telegram_id={user.telegram_id}'},
+        ])
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        assert [r['status'] for r in results] == [200, 200, 200]
+        assert results[0]['body']['id'] == user.id
+        assert results[1]['body'][0]['id'] == task.id
+        assert results[2]['body']['results'][0]['name'] == category.name
+        assert response.data['committed'] is True
+
+    def test_batch_register_and_dashboard(self, api_client, db):
+        """Test the bot's /start batch registers and loads the dashboard."""
+        response = self.post(api_client, [
+            {
+                'method': 'POST', 'path': 'users/register_telegram/',
+                'body': {'telegram_id': 555, 'username': 'new_user'}
+            },
+            {'path': 'tasks/dashboard/?telegram_id=555'},
+        ])
+        results = response.data['results']
+        assert [r['status'] for r in results] == [201, 200]
+        assert results[1]['body']['tasks'] == []
+
+    def test_batch_write_then_read(self, api_client, task, db):
+        """Test later sub-requests see earlier writes."""
+        response = self.post(api_client, [
+            {
+                'method': 'PATCH', 'path': f'tasks/{task.id}/',
+                'body': {'status': 'completed'}
+            },
+            {'path': f'tasks/{task.id}/'},
+            {'method': 'DELETE', 'path': f'tasks/{task.id}/'},
+        ])
+        results = response.data['results']
+        assert results[1]['body']['status'] == 'completed'
+        assert results[2] == {'status': 204, 'body': None}
+
+    def test_batch_errors_do_not_stop(self, api_client, user, db):
+        """Test failing sub-requests are reported without aborting."""
+        response = self.post(api_client, [
+            {'path': 'users/by_telegram/?telegram_id=1'},
+            {'path': 'missing/'},
+            {'method': 'POST', 'path': 'batch/', 'body': {'requests': []}},
+            {'path': f'users/by_telegram/?telegram_id={user.telegram_id}'},
+        ])
+        assert [r['status'] for r in response.data['results']] == [
+            404, 404, 400, 200
+        ]
+
+    def test_batch_atomic_rollback(self, api_client, user, db):
+        """Test atomic batches roll back on the first error."""
+        response = self.post(api_client, [
+            {
+                'method': 'POST', 'path': 'tasks/create_for_telegram/',
+                'body': {'telegram_id': user.telegram_id, 'title': 'Kept?'}
+            },
+            {
+                'method': 'POST', 'path': 'tasks/create_for_telegram/',
+                'body': {'telegram_id': user.telegram_id}
+            },
+            {'path': 'health/'},
+        ], atomic=True)
+        assert [r['status'] for r in response.data['results']] == [201, 400]
+        assert response.data['committed'] is False
+        assert not Task.objects.filter(title='Kept?').exists()
+
+    def test_batch_atomic_commit(self, api_client, user, db):
+        """Test successful atomic batches are committed."""
+        response = self.post(api_client, [{
+            'method': 'POST', 'path': 'tasks/create_for_telegram/',
+            'body': {'telegram_id': user.telegram_id, 'title': 'Kept'}
+        }], atomic=True)
+        assert response.data['committed'] is True
+        assert Task.objects.filter(title='Kept').exists()
+
+    @pytest.mark.parametrize('requests', [
+        None,
+        [],
+        ['tasks/'],
+        [{'method': 'TRACE', 'path': 'tasks/'}],
+        [{'path': 'http://example.com/api/tasks/'}],
+        [{'path': 'health/'}] * 21,
+    ])
+    def test_batch_invalid(self, api_client, requests, db):
+        """Test malformed batches are rejected before running anything."""
+        response = self.post(api_client, requests)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'error' in response.data
+
+    def test_batch_non_object_body(self, api_client, db):
+        """Test a JSON list body is rejected."""
+        response = api_client.post('/api/batch/', [], format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestTaskDashboard:
+    """Tests for the bot dashboard action."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def get(self, api_client, user):
+        return api_client.get(
+            '/api/tasks/dashboard/', {'telegram_id': user.telegram_id}
+        )
+
+    def test_dashboard(self, api_client, multiple_tasks, category, user, db, settings):
+        """Test dashboard returns what the list window renders."""
+        settings.DASHBOARD_TASKS_LIMIT = 3
+        response = self.get(api_client, user)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.data
+        assert data['user']['id'] == user.id
+        assert [t['title'] for t in data['tasks']] == ['Task 4', 'Task 3', 'Task 2']
+        assert set(data['tasks'][0]) == {
+            'id', 'title', 'description', 'status', 'categories',
+            'due_date', 'created_at'
+        }
+        assert data['tasks_count'] == 5
+        assert data['status_counts'] == {
+            'pending': 3, 'in_progress': 2, 'completed': 0
+        }
+        assert data['categories'] == [
+            {'id': category.id, 'name': category.name, 'color': category.color}
+        ]
+
+    def test_dashboard_queries(
+        self, api_client, multiple_tasks, user, django_assert_num_queries, db
+    ):
+        """Test a fixed number of queries, one when cached."""
+        with django_assert_num_queries(4):
+            self.get(api_client, user)
+        with django_assert_num_queries(1):
+            response = self.get(api_client, user)
+        assert response.data['tasks_count'] == 5
+
+    def test_dashboard_invalidated_by_writes(
+        self, api_client, task, category, user, db,
+        django_capture_on_commit_callbacks
+    ):
+        """Test any write to the user's data refreshes the dashboard."""
+        self.get(api_client, user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.patch(
+                f'/api/tasks/{task.id}/', {'status': 'completed'}, format='json'
+            )
+        assert self.get(api_client, user).data['status_counts']['completed'] == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.create(title='New', user=user)
+        assert self.get(api_client, user).data['tasks_count'] == 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            category.name = 'Renamed'
+            category.save()
+        assert self.get(api_client, user).data['categories'][0]['name'] == 'Renamed'
+
+    def test_dashboard_read_before_commit(
+        self, api_client, task, user, db, django_capture_on_commit_callbacks
+    ):
+        """Test a dashboard cached before the write commits is not served."""
+        stale = self.get(api_client, user).data
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.create(title='New', user=user)
+            # A concurrent request still sees the data before the write
+            # and caches it under the version current at that moment
+            key = DASHBOARD_KEY.format(user.id, dashboard_version(user.id))
+            cache.set(key, stale)
+
+        assert self.get(api_client, user).data['tasks_count'] == 2
+
+    def test_dashboard_not_shared_between_users(
+        self, api_client, task, user, another_user, db
+    ):
+        """Test dashboards are cached per user."""
+        self.get(api_client, user)
+        assert self.get(api_client, another_user).data['tasks_count'] == 0
+
+    def test_dashboard_version_evicted(
+        self, api_client, task, user, db, django_capture_on_commit_callbacks
+    ):
+        """Test a lost version key does not resurrect an old dashboard."""
+        self.get(api_client, user)
+        cache.delete(f'dashboard:version:{user.id}')
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.create(title='New', user=user)
+        assert self.get(api_client, user).data['tasks_count'] == 2
+
+    def test_dashboard_user_not_found(self, api_client, db):
+        """Test unknown Telegram user returns 404."""
+        response = api_client.get('/api/tasks/dashboard/', {'telegram_id': 1})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_dashboard_missing_param(self, api_client, db):
+        """Test telegram_id is required."""
+        response = api_client.get('/api/tasks/dashboard/')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestDueWindows:
+    """Tests for due date filters and the upcoming/overdue actions."""
+
+    @pytest.fixture
+    def due_tasks(self, user):
+        now = timezone.now()
+        week_end = due_window('week', now, user.tzinfo())[1]
+        return {
+            'overdue': Task.objects.create(
+                title='Overdue', user=user, due_date=now - timedelta(hours=2)
+            ),
+            'done': Task.objects.create(
+                title='Done', user=user, status='completed',
+                due_date=now - timedelta(hours=1)
+            ),
+            'soon': Task.objects.create(
+                title='Soon', user=user, due_date=now + (week_end - now) / 2
+            ),
+            'later': Task.objects.create(
+                title='Later', user=user, due_date=now + timedelta(days=30)
+            ),
+            'undated': Task.objects.create(title='Undated', user=user),
+        }
+
+    def titles(self, response):
+        return [item['title'] for item in response.data]
+
+    def test_due_window_today_and_tomorrow(self):
+        """Test day windows end at local midnight."""
+        tz = ZoneInfo('America/Adak')
+        now = datetime(2024, 3, 9, 20, 0, tzinfo=tz)
+        assert due_window('today', now, tz) == (
+            now, datetime(2024, 3, 10, tzinfo=tz)
+        )
+        start, end = due_window('tomorrow', now, tz)
+        assert (start, end) == (
+            datetime(2024, 3, 10, tzinfo=tz), datetime(2024, 3, 11, tzinfo=tz)
+        )
+        # Переход на летнее время: местные сутки короче на час
+        utc = dt_timezone.utc
+        assert end.astimezone(utc) - start.astimezone(utc) == timedelta(hours=23)
+
+    def test_due_window_week(self):
+        """Test the week window ends at the start of next Monday."""
+        tz = ZoneInfo('Europe/Moscow')
+        wednesday = datetime(2024, 5, 15, 12, 0, tzinfo=tz)
+        assert due_window('week', wednesday, tz)[1] == datetime(
+            2024, 5, 20, tzinfo=tz
+        )
+        sunday = datetime(2024, 5, 19, 23, 0, tzinfo=tz)
+        assert due_window('week', sunday, tz)[1] == datetime(
+            2024, 5, 20, tzinfo=tz
+        )
+
+    def test_due_window_user_timezone(self):
+        """Test 'today' depends on the user's local calendar."""
+        now = datetime(2024, 5, 15, 22, 0, tzinfo=dt_timezone.utc)
+        moscow = due_window('today', now, ZoneInfo('Europe/Moscow'))[1]
+        adak = due_window('today', now, ZoneInfo('America/Adak'))[1]
+        assert moscow == datetime(2024, 5, 16, 21, 0, tzinfo=dt_timezone.utc)
+        assert adak == datetime(2024, 5, 16, 9, 0, tzinfo=dt_timezone.utc)
+
+    def test_upcoming(self, api_client, user, due_tasks, db):
+        """Test upcoming returns open tasks due in the window."""
+        response = api_client.get(
+            '/api/tasks/upcoming/', {'telegram_id': user.telegram_id}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Soon' in self.titles(response)
+        assert not {'Overdue', 'Done', 'Later', 'Undated'} & set(
+            self.titles(response)
+        )
+
+    def test_upcoming_tomorrow(self, api_client, user, db):
+        """Test the tomorrow window uses the user's time zone."""
+        user.timezone = 'Europe/Moscow'
+        user.save()
+        tz = ZoneInfo('Europe/Moscow')
+        tomorrow = timezone.localtime(timezone.now(), tz).date() + timedelta(days=1)
+        Task.objects.create(
+            title='Tomorrow noon', user=user,
+            due_date=datetime.combine(tomorrow, datetime.min.time(), tz)
+            + timedelta(hours=12)
+        )
+        response = api_client.get('/api/tasks/upcoming/', {
+            'telegram_id': user.telegram_id, 'window': 'tomorrow'
+        })
+        assert self.titles(response) == ['Tomorrow noon']
+
+    def test_upcoming_invalid(self, api_client, user, db):
+        """Test parameter validation."""
+        assert api_client.get('/api/tasks/upcoming/').status_code == 400
+        response = api_client.get('/api/tasks/upcoming/', {
+            'telegram_id': user.telegram_id, 'window': 'year'
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.get('/api/tasks/upcoming/', {'telegram_id': 1})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_overdue(self, api_client, user, due_tasks, db):
+        """Test overdue returns open tasks past their due date."""
+        response = api_client.get(
+            '/api/tasks/overdue/', {'telegram_id': user.telegram_id}
+        )
+        assert self.titles(response) == ['Overdue']
+        assert api_client.get('/api/tasks/overdue/').status_code == 400
+
+    def test_list_due_filters(self, api_client, user, due_tasks, db):
+        """Test due_after/due_before/overdue list filters."""
+        params = {'telegram_id': user.telegram_id}
+        response = api_client.get('/api/tasks/', {
+            **params,
+            'due_after': timezone.now().isoformat(),
+            'due_before': due_tasks['later'].due_date.isoformat(),
+        })
+        assert [t['title'] for t in response.data['results']] == ['Soon']
+
+        response = api_client.get('/api/tasks/', {**params, 'overdue': '1'})
+        assert [t['title'] for t in response.data['results']] == ['Overdue']
+
+        for name, value in (
+            ('due_before', 'x'), ('due_before', '2024-02-30'),
+            ('due_after', '2024-03-10T25:00'),
+        ):
+            response = api_client.get('/api/tasks/', {**params, name: value})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert name in response.data
+
+    @pytest.mark.parametrize('url', [
+        '/api/tasks/', '/api/tasks/by_telegram/', '/api/tasks/upcoming/',
+        '/api/tasks/overdue/', '/api/tasks/changes/', '/api/tasks/dashboard/',
+        '/api/categories/', '/api/users/by_telegram/',
+    ])
+    def test_invalid_telegram_id(self, api_client, user, db, url):
+        """Test a non-integer telegram_id returns 400."""
+        response = api_client.get(url, {'telegram_id': 'abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'telegram_id' in response.data
+
+    def test_create_for_telegram_invalid_telegram_id(self, api_client, db):
+        """Test a non-integer telegram_id is rejected on writes too."""
+        response = api_client.post('/api/tasks/create_for_telegram/', {
+            'telegram_id': 'abc', 'title': 'Task'
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.post(
+            '/api/users/register_telegram/', {'telegram_id': 'abc'}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_due_filters_user_timezone(self, api_client, user, db):
+        """Test naive due_after/due_before are in the user's time zone."""
+        user.timezone = 'Asia/Tokyo'
+        user.save()
+        tokyo = ZoneInfo('Asia/Tokyo')
+        Task.objects.create(
+            title='Tokyo morning', user=user,
+            due_date=datetime(2024, 5, 15, 9, 0, tzinfo=tokyo)
+        )
+        params = {
+            'due_after': '2024-05-15T08:00', 'due_before': '2024-05-15T10:00'
+        }
+
+        for user_filter in (
+            {'telegram_id': user.telegram_id}, {'user_id': user.id}
+        ):
+            response = api_client.get('/api/tasks/', {**user_filter, **params})
+            assert [t['title'] for t in response.data['results']] == [
+                'Tokyo morning'
+            ]
+        # Без пользователя - в поясе проекта (America/Adak)
+        response = api_client.get('/api/tasks/', params)
+        assert response.data['results'] == []
+
+    def test_due_queries_use_partial_index(self, user, db):
+        """Test due windows are served by the (user, due_date) index."""
+        now = timezone.now()
+        queryset = Task.objects.filter(
+            user=user, due_date__gte=now, due_date__lt=now
+        ).order_by('due_date')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        assert 'task_user_due_date_idx' in plan
@@ -0,0 +1,187 @@
+"""
+Маршрутизация чтения на реплики PostgreSQL.
+
+Реплики перечисляются в REPLICA_DATABASES; без них маршрутизатор ничего
+не меняет и все запросы идут в `default`. Чтение уходит на реплику только
+там, где это явно разрешено: в безопасных HTTP-запросах (через
+ReplicaRoutingMiddleware) и внутри `replica_reads()`, например в проверке
+сроков Celery. Запись всегда идёт в `default`.
+
+После записи данные пользователя читаются из основной базы ещё
+READ_YOUR_WRITES_SECONDS секунд (read-your-writes). Отметки хранятся в
+кеше по telegram_id и id пользователя, а также по id изменённого
+объекта, и запрос читает из основной базы, если отмечен любой из
+telegram_id, user_id его параметров или pk из его URL. Реплика,
+отстающая больше чем на REPLICA_MAX_LAG_SECONDS, временно исключается
+из ротации.
+"""
+
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.urls import Resolver404, resolve
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_rotation = {}
+_lag_checks = {}
+
+RECENT_WRITE_KEY = 'db:recent_write:{}'
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Разрешает (или запрещает) чтение с реплик внутри блока."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def recent_write_keys(ids):
+    return [RECENT_WRITE_KEY.format(value) for value in ids if value]
+
+
+def mark_recent_write(*ids):
+    """
+    Закрепляет чтение за основной базой после записи: ids - telegram_id
+    и id пользователя, id изменённого объекта.
+    """
+    keys = recent_write_keys(ids)
+    if settings.REPLICA_DATABASES and keys:
+        cache.set_many(
+            dict.fromkeys(keys, 1), settings.READ_YOUR_WRITES_SECONDS
+        )
+
+
+def has_recent_write(*ids):
+    keys = recent_write_keys(ids)
+    return bool(keys) and bool(cache.get_many(keys))
+
+
+async def ahas_recent_write(*ids):
+    keys = recent_write_keys(ids)
+    return bool(keys) and bool(await cache.aget_many(keys))
+
+
+def request_ids(request):
+    """telegram_id и user_id из параметров запроса и pk из его URL."""
+    try:
+        pk = resolve(request.path_info).kwargs.get('pk')
+    except Resolver404:
+        pk = None
+    return request.GET.get('telegram_id'), request.GET.get('user_id'), pk
+
+
+def replica_lag(alias):
+    """
+    Отставание реплики в секундах (None, если реплика недоступна).
+
+    Время последней применённой транзакции стареет и тогда, когда на
+    основной базе нет записей, поэтому реплика, применившая всё
+    полученное, считается не отстающей.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT CASE WHEN pg_last_wal_receive_lsn() = '
+                'pg_last_wal_replay_lsn() THEN 0 ELSE COALESCE(EXTRACT('
+                'EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+            )
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return None
+
+
+def replica_is_healthy(alias):
+    """Проверяет отставание реплики не чаще раза в REPLICA_LAG_CHECK_INTERVAL."""
+    now = time.monotonic()
+    checked_at, healthy = _lag_checks.get(alias, (None, True))
+    if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+        lag = replica_lag(alias)
+        healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        _lag_checks[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Следующая здоровая реплика по кругу или None."""
+    replicas = tuple(settings.REPLICA_DATABASES)
+    if not replicas:
+        return None
+    rotation = _rotation.get(replicas)
+    if rotation is None:
+        rotation = _rotation[replicas] = itertools.cycle(replicas)
+    for _ in replicas:
+        alias = next(rotation)
+        if replica_is_healthy(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    """Маршрутизатор: чтение на реплики там, где оно разрешено."""
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для безопасных запросов.
+
+    Запрос к недавно изменённым данным (по telegram_id, user_id или pk
+    объекта в URL) читает из основной базы. Работает и под WSGI, и под ASGI:
+    контекстная переменная видна и в потоках sync_to_async.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def may_use_replica(self, request):
+        return (
+            bool(settings.REPLICA_DATABASES)
+            and request.method in self.SAFE_METHODS
+        )
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        use_replica = (
+            self.may_use_replica(request)
+            and not has_recent_write(*request_ids(request))
+        )
+        with replica_reads(use_replica):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        use_replica = (
+            self.may_use_replica(request)
+            and not await ahas_recent_write(*request_ids(request))
+        )
+        with replica_reads(use_replica):
+            return await self.get_response(request)
@@ -38,10 +38,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'todo_project.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'todo_project.urls'
 
+# Асинхронные эндпоинты бота; включаются для запуска под ASGI (uvicorn)
+ASYNC_BOT_ENDPOINTS = os.environ.get('ASYNC_BOT_ENDPOINTS', '0') == '1'
+
+# Максимум подзапросов в одном запросе к /api/batch/
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -71,6 +78,36 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: POSTGRES_REPLICA_HOSTS=host1:5432,host2
+REPLICA_DATABASES = []
+for index, replica in enumerate(
+    filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')),
+    start=1
+):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['todo_project.db_router.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы,
+# допустимое отставание реплики и период его проверки
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', '5'))
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '2'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '5'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -111,6 +148,53 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
+CELERY_BEAT_SCHEDULE = {
+    'archive-completed-tasks': {
+        'task': 'tasks.tasks.archive_completed_tasks',
+        'schedule': 60 * 60,
+    },
+    'maintain-task-partitions': {
+        'task': 'tasks.tasks.maintain_task_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+    'prune-change-log': {
+        'task': 'tasks.tasks.prune_change_log',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Архивация завершённых задач: возраст (в днях с последнего изменения)
+# и размер пачки, переносимой в одной транзакции
+TASK_ARCHIVE_AFTER_DAYS = int(os.environ.get('TASK_ARCHIVE_AFTER_DAYS', '30'))
+TASK_ARCHIVE_BATCH_SIZE = int(os.environ.get('TASK_ARCHIVE_BATCH_SIZE', '500'))
+
+# Размер пачки при пересчёте снимков категорий задач (Task.category_snapshot)
+CATEGORY_SNAPSHOT_BATCH_SIZE = int(os.environ.get('CATEGORY_SNAPSHOT_BATCH_SIZE', '500'))
+
+# Сводка для бота (tasks/dashboard/): задач на первой странице и TTL кеша
+DASHBOARD_TASKS_LIMIT = int(os.environ.get('DASHBOARD_TASKS_LIMIT', '20'))
+DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS', '300'))
+
+# Журнал изменений (tasks/changes/): срок хранения, задержка выдачи
+# свежих записей и максимальный размер страницы
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', '30'))
+CHANGE_FEED_LAG_SECONDS = float(os.environ.get('CHANGE_FEED_LAG_SECONDS', '2'))
+CHANGE_FEED_PAGE_SIZE = int(os.environ.get('CHANGE_FEED_PAGE_SIZE', '500'))
+
+# Секционирование таблицы задач по месяцам диапазонами ULID (PostgreSQL):
+# сколько будущих секций создавать заранее и через сколько месяцев
+# отсоединять секции, из которых архивация уже убрала все задачи
+# (0 - не отсоединять старые секции)
+TASK_PARTITIONING = os.environ.get('TASK_PARTITIONING', '0') == '1'
+TASK_PARTITION_PREMAKE_MONTHS = int(os.environ.get('TASK_PARTITION_PREMAKE_MONTHS', '2'))
+TASK_PARTITION_RETENTION_MONTHS = int(os.environ.get('TASK_PARTITION_RETENTION_MONTHS', '0'))
+
+# Окно проверки сроков (в днях): check_due_tasks не напоминает о задачах,
+# срок которых прошёл больше окна назад (0 - без ограничения)
+TASK_DUE_SCAN_WINDOW_DAYS = int(os.environ.get('TASK_DUE_SCAN_WINDOW_DAYS', '0'))
+
+# Читать задачи для проверки сроков с реплики (если реплики настроены)
+TASK_DUE_SCAN_USE_REPLICA = os.environ.get('TASK_DUE_SCAN_USE_REPLICA', '0') == '1'
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -120,3 +204,5 @@ REST_FRAMEWORK = {
 
 # Telegram Bot Token for sending notifications
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
+# Адрес Bot API: локальный Bot API сервер или заглушка в бенчмарках
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
@@ -5,11 +5,23 @@ Uses SQLite for faster test execution.
 
 from todo_project.settings import *  # noqa
 
-# Use SQLite for tests
+# Use SQLite for tests; the second database simulates a read replica
+# and is only used when a test enables REPLICA_DATABASES
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+REPLICA_DATABASES = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
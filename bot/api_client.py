@@ -2,52 +2,495 @@
 API client for communication with Django backend.
 """
 
+import asyncio
 import os
 import logging
-from typing import Optional
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlencode
 import aiohttp
 
+from metrics import API_SECONDS
+from resilience import CircuitBreaker, LatencyTracker, backoff_delay
+
 logger = logging.getLogger(__name__)
 
 API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:8000/api')
+API_POOL_SIZE = int(os.environ.get('API_POOL_SIZE', '100'))
+API_KEEPALIVE_SECONDS = float(os.environ.get('API_KEEPALIVE_SECONDS', '30'))
+API_DNS_CACHE_SECONDS = int(os.environ.get('API_DNS_CACHE_SECONDS', '300'))
+API_TIMEOUT_SECONDS = float(os.environ.get('API_TIMEOUT_SECONDS', '30'))
+API_READ_TIMEOUT_SECONDS = float(os.environ.get('API_READ_TIMEOUT_SECONDS', '5'))
+API_WRITE_TIMEOUT_SECONDS = float(
+    os.environ.get('API_WRITE_TIMEOUT_SECONDS', '10')
+)
+API_RETRIES = int(os.environ.get('API_RETRIES', '2'))
+API_RETRY_BASE_SECONDS = float(os.environ.get('API_RETRY_BASE_SECONDS', '0.1'))
+API_RETRY_MAX_SECONDS = float(os.environ.get('API_RETRY_MAX_SECONDS', '2'))
+API_HEDGE_READS = os.environ.get('API_HEDGE_READS', '0') == '1'
+API_BREAKER_FAILURES = int(os.environ.get('API_BREAKER_FAILURES', '5'))
+API_BREAKER_RESET_SECONDS = float(
+    os.environ.get('API_BREAKER_RESET_SECONDS', '30')
+)
+TASK_CACHE_TTL_SECONDS = float(os.environ.get('TASK_CACHE_TTL_SECONDS', '60'))
+TASK_CACHE_SIZE = int(os.environ.get('TASK_CACHE_SIZE', '1000'))
+
+
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+RETRYABLE_STATUSES = (502, 503, 504)
+HEDGE_PERCENTILE = 0.95
+
+# Endpoints slower than a plain read or write by design
+ENDPOINT_TIMEOUTS = {
+    'batch/': API_TIMEOUT_SECONDS,
+    'tasks/changes/': API_WRITE_TIMEOUT_SECONDS,
+}
+
+
+def endpoint_route(endpoint: str) -> str:
+    """Endpoint with object ids replaced, e.g. tasks/{id}/."""
+    return '/'.join(
+        part if not part or part.replace('_', '').isalpha() else '{id}'
+        for part in endpoint.split('?')[0].split('/')
+    )
+
+
+def request_timeout(method: str, route: str) -> float:
+    if route in ENDPOINT_TIMEOUTS:
+        return ENDPOINT_TIMEOUTS[route]
+    if method == 'GET':
+        return API_READ_TIMEOUT_SECONDS
+    return API_WRITE_TIMEOUT_SECONDS
+
+
+class TaskCache:
+    """
+    In-process cache of each user's tasks, indexed by task id.
+
+    An entry per telegram_id holds the tasks seen in the user's last
+    responses (the full list from get_tasks or the dashboard page),
+    whether that is the complete list, and the dashboard itself. Entries
+    expire after `ttl` seconds; beyond `max_users` the least recently
+    used entry is evicted. Writes through APIClient patch the index and
+    drop the dashboard, whose counters are then stale.
+
+    Each user has a generation, bumped by writes and invalidation for
+    that user; a fetch started before it changed is not stored. Writes
+    whose owner is unknown bump every user. Generations of the
+    `max_users` most recently written users are kept, older ones fall
+    back to a shared floor.
+    """
+
+    def __init__(
+        self,
+        ttl: float = TASK_CACHE_TTL_SECONDS,
+        max_users: int = TASK_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._owners: dict = {}
+        self._writes = 0
+        self._floor = 0
+        self._generations: OrderedDict = OrderedDict()
+
+    def generation(self, telegram_id: int) -> int:
+        """Current generation of the user's entry."""
+        return self._generations.get(telegram_id, self._floor)
+
+    def _bump(self, telegram_id: Optional[int]) -> None:
+        self._writes += 1
+        if telegram_id is None:
+            self._floor = self._writes
+            self._generations.clear()
+            return
+        self._generations[telegram_id] = self._writes
+        self._generations.move_to_end(telegram_id)
+        while len(self._generations) > self.max_users:
+            _, oldest = self._generations.popitem(last=False)
+            self._floor = max(self._floor, oldest)
+
+    def _forget(self, telegram_id: int) -> None:
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None:
+            for task_id in entry['tasks']:
+                self._owners.pop(task_id, None)
+
+    def _entry(self, telegram_id: int) -> Optional[dict]:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return None
+        if self.clock() >= entry['expires_at']:
+            self._forget(telegram_id)
+            return None
+        self._entries.move_to_end(telegram_id)
+        return entry
+
+    def _store(self, telegram_id: int, tasks: list, complete: bool) -> dict:
+        self._forget(telegram_id)
+        entry = {
+            'expires_at': self.clock() + self.ttl,
+            'tasks': {task['id']: task for task in tasks},
+            'complete': complete,
+            'dashboard': None,
+        }
+        self._entries[telegram_id] = entry
+        for task in tasks:
+            self._owners[task['id']] = telegram_id
+        while len(self._entries) > self.max_users:
+            self._forget(next(iter(self._entries)))
+        return entry
+
+    def get_tasks(self, telegram_id: int) -> Optional[list]:
+        """Complete cached task list, or None."""
+        entry = self._entry(telegram_id)
+        if entry is None or not entry['complete']:
+            return None
+        return list(entry['tasks'].values())
+
+    def set_tasks(
+        self,
+        telegram_id: int,
+        tasks: list,
+        generation: Optional[int] = None
+    ) -> None:
+        """Store a fetched list unless a write happened since `generation`."""
+        if generation is None or generation == self.generation(telegram_id):
+            self._store(telegram_id, tasks, complete=True)
+
+    def get_task(self, telegram_id: int, task_id: str) -> Optional[dict]:
+        entry = self._entry(telegram_id)
+        return entry['tasks'].get(task_id) if entry else None
+
+    def get_dashboard(self, telegram_id: int) -> Optional[dict]:
+        entry = self._entry(telegram_id)
+        return entry['dashboard'] if entry else None
+
+    def set_dashboard(
+        self,
+        telegram_id: int,
+        dashboard: dict,
+        generation: Optional[int] = None
+    ) -> None:
+        """Store the dashboard and index its page of tasks."""
+        if (generation is not None
+                and generation != self.generation(telegram_id)):
+            return
+        entry = self._entry(telegram_id)
+        if entry is None:
+            entry = self._store(telegram_id, [], complete=False)
+        for task in dashboard.get('tasks', []):
+            entry['tasks'].setdefault(task['id'], task)
+            self._owners[task['id']] = telegram_id
+        entry['dashboard'] = dashboard
+
+    def put_task(self, task: dict, telegram_id: Optional[int] = None) -> None:
+        """Add a created task or replace an updated one."""
+        telegram_id = telegram_id or self._owners.get(task['id'])
+        self._bump(telegram_id)
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return
+        if task['id'] in entry['tasks']:
+            entry['tasks'][task['id']] = task
+        else:
+            # Newest first, as the backend returns them
+            entry['tasks'] = {task['id']: task, **entry['tasks']}
+            self._owners[task['id']] = telegram_id
+        entry['dashboard'] = None
+
+    def drop_task(self, task_id: str) -> None:
+        telegram_id = self._owners.pop(task_id, None)
+        self._bump(telegram_id)
+        entry = self._entries.get(telegram_id)
+        if entry is not None:
+            entry['tasks'].pop(task_id, None)
+            entry['dashboard'] = None
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._bump(telegram_id)
+        self._forget(telegram_id)
+
+    def clear(self) -> None:
+        self._bump(None)
+        self._entries.clear()
+        self._owners.clear()
 
 
 class APIClient:
-    """Async client for ToDo List API."""
+    """
+    Async client for ToDo List API.
+
+    All requests share one ClientSession whose connector keeps
+    connections to the backend alive and caches DNS lookups, so a call
+    does not pay for a new TCP handshake. The session is opened on the
+    first request (or by start()) and closed by close(); main.py ties
+    both to the Dispatcher startup and shutdown.
+
+    Task lists and the dashboard are served from a TaskCache; task
+    writes made through the client patch it, and prewarm_dashboard()
+    fills it ahead of the first task list.
+
+    Concurrent identical GETs (same endpoint and params) share one
+    in-flight request. A write made through the client detaches
+    in-flight GETs, so a caller never joins a read that may predate it.
 
-    def __init__(self):
+    Each request gets its endpoint's timeout; idempotent ones are
+    retried with jittered backoff, reads can be hedged after the
+    endpoint's p95 latency, and a circuit breaker fails calls fast while
+    the backend is down. health() exposes the breaker state, `stats`
+    counters and latencies.
+    """
+
+    def __init__(self, cache: Optional[TaskCache] = None):
         self.base_url = API_BASE_URL
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = cache or TaskCache()
+        self._in_flight: dict = {}
+        self._background: set = set()
+        self.stats: Counter = Counter()
+        self.retries = API_RETRIES
+        self.retry_base = API_RETRY_BASE_SECONDS
+        self.retry_cap = API_RETRY_MAX_SECONDS
+        self.hedge_reads = API_HEDGE_READS
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(
+            API_BREAKER_FAILURES, API_BREAKER_RESET_SECONDS
+        )
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=API_POOL_SIZE,
+            limit_per_host=API_POOL_SIZE,
+            keepalive_timeout=API_KEEPALIVE_SECONDS,
+            ttl_dns_cache=API_DNS_CACHE_SECONDS,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=API_TIMEOUT_SECONDS)
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session; reopened if it was closed."""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def start(self) -> None:
+        """Open the shared session (Dispatcher startup)."""
+        self._session = self.session
+
+    async def close(self) -> None:
+        """Close the shared session and its pooled connections."""
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def _request(
         self,
         method: str,
         endpoint: str,
         data: dict = None,
-        params: dict = None
+        params: dict = None,
+        idempotent: Optional[bool] = None
     ) -> Optional[dict]:
-        """Make HTTP request to API."""
-        url = f"{self.base_url}/{endpoint}"
+        """Make HTTP request to API; the body of a 200/201 response or None."""
+        result = await self._call(method, endpoint, data, params, idempotent)
+        if result is None:
+            return None
+        status, body = result
+        if status in (200, 201):
+            return body
+        if status != 404:
+            logger.error(f"API error {status}: {body}")
+        return None
+
+    async def _call(
+        self,
+        method: str,
+        endpoint: str,
+        data: dict = None,
+        params: dict = None,
+        idempotent: Optional[bool] = None
+    ) -> Optional[tuple]:
+        """(status, body) of a request, coalescing identical concurrent GETs."""
+        if method != 'GET':
+            self._in_flight.clear()
+            try:
+                return await self._send(
+                    method, endpoint, data, params, idempotent
+                )
+            finally:
+                self._in_flight.clear()
 
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        request = self._in_flight.get(key)
+        if request is None:
+            request = asyncio.ensure_future(
+                self._send(method, endpoint, data, params, idempotent)
+            )
+            self._in_flight[key] = request
+
+            def forget(done):
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+
+            request.add_done_callback(forget)
+        else:
+            self.stats['coalesced'] += 1
+        # A cancelled caller must not cancel the request other callers share
+        return await asyncio.shield(request)
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: dict = None,
+        params: dict = None,
+        idempotent: Optional[bool] = None
+    ) -> Optional[tuple]:
+        """
+        Send a request through the circuit breaker; None if it failed.
+
+        Idempotent requests are retried with jittered exponential
+        backoff on connection errors, timeouts and 502/503/504; reads
+        are hedged when enabled. Every 5xx counts against the breaker.
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        route = endpoint_route(endpoint)
+        attempts = 1 + (self.retries if idempotent else 0)
+        error = None
+
+        for attempt in range(attempts):
+            trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+            if not self.breaker.allow():
+                self.stats['short_circuited'] += 1
+                logger.warning(f"Circuit open, skipping {method} {route}")
+                return None
+            try:
+                if attempt:
+                    self.stats['retries'] += 1
+                    await asyncio.sleep(
+                        backoff_delay(attempt, self.retry_base, self.retry_cap)
+                    )
+                if method == 'GET' and self.hedge_reads:
+                    status, body = await self._hedged(
+                        route, endpoint, params
+                    )
+                else:
+                    status, body = await self._attempt(
+                        method, route, endpoint, data, params
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                self.stats['failures'] += 1
+                error = e
+                continue
+            except BaseException:
+                # Cancelled or unexpected: let the next call be the trial
+                if trial:
+                    self.breaker.release()
+                raise
+            if status < 500:
+                self.breaker.record_success()
+                return status, body
+            self.breaker.record_failure()
+            self.stats['failures'] += 1
+            if status not in RETRYABLE_STATUSES:
+                return status, body
+            error = f"status {status}"
+
+        logger.error(f"Request error: {method} {route}: {error}")
+        return None
+
+    async def _attempt(
+        self,
+        method: str,
+        route: str,
+        endpoint: str,
+        data: dict = None,
+        params: dict = None
+    ) -> tuple:
+        """One HTTP exchange with the endpoint's timeout."""
+        self.stats['requests'] += 1
+        started = time.monotonic()
+        status = 'error'
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.request(
-                    method,
-                    url,
-                    json=data,
-                    params=params,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status in (200, 201):
-                        return await response.json()
-                    elif response.status == 404:
-                        return None
-                    else:
-                        text = await response.text()
-                        logger.error(f"API error {response.status}: {text}")
-                        return None
-        except aiohttp.ClientError as e:
-            logger.error(f"Request error: {e}")
-            return None
+            async with self.session.request(
+                method,
+                f"{self.base_url}/{endpoint}",
+                json=data,
+                params=params,
+                timeout=aiohttp.ClientTimeout(
+                    total=request_timeout(method, route)
+                )
+            ) as response:
+                if response.status in (200, 201):
+                    body = await response.json()
+                else:
+                    body = await response.text() or None
+            status = response.status
+        finally:
+            elapsed = time.monotonic() - started
+            API_SECONDS.observe(
+                elapsed, method=method, endpoint=route, status=status
+            )
+        if status not in RETRYABLE_STATUSES:
+            self.latency.record(route, elapsed)
+        return status, body
+
+    async def _hedged(self, route: str, endpoint: str, params: dict) -> tuple:
+        """
+        GET that sends a second copy if the first is slower than the
+        endpoint's recent p95; the first usable response wins.
+        """
+        delay = self.latency.percentile(route, HEDGE_PERCENTILE)
+        first = asyncio.ensure_future(
+            self._attempt('GET', route, endpoint, params=params)
+        )
+        pending = {first}
+        try:
+            if delay is None:
+                return await first
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.stats['hedged'] += 1
+                pending.add(asyncio.ensure_future(
+                    self._attempt('GET', route, endpoint, params=params)
+                ))
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None and (
+                        attempt.result()[0] not in RETRYABLE_STATUSES
+                    ):
+                        if attempt is not first:
+                            self.stats['hedge_wins'] += 1
+                        return attempt.result()
+                if not pending:
+                    # Both copies failed: surface the last failure
+                    return attempt.result()
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+
+    def health(self) -> dict:
+        """Circuit state, counters and recent p95 latency per endpoint."""
+        return {
+            'circuit': self.breaker.state,
+            'stats': dict(self.stats),
+            'p95': self.latency.snapshot(HEDGE_PERCENTILE),
+        }
 
     async def register_user(
         self,
@@ -58,9 +501,32 @@ class APIClient:
         return await self._request(
             'POST',
             'users/register_telegram/',
-            data={'telegram_id': telegram_id, 'username': username}
+            data={'telegram_id': telegram_id, 'username': username},
+            idempotent=True
         )
 
+    async def register_user_and_load(
+        self,
+        telegram_id: int,
+        username: str
+    ) -> Optional[dict]:
+        """
+        Register or get the user and cache their dashboard, in one round
+        trip; the user or None.
+        """
+        generation = self.cache.generation(telegram_id)
+        user, dashboard = await self.batch([
+            {
+                'method': 'POST',
+                'path': 'users/register_telegram/',
+                'body': {'telegram_id': telegram_id, 'username': username},
+            },
+            {'path': 'tasks/dashboard/', 'params': {'telegram_id': telegram_id}},
+        ], idempotent=True)
+        if user is not None and dashboard is not None:
+            self.cache.set_dashboard(telegram_id, dashboard, generation)
+        return user
+
     async def get_user_by_telegram(self, telegram_id: int) -> Optional[dict]:
         """Get user by Telegram ID."""
         return await self._request(
@@ -70,14 +536,113 @@ class APIClient:
         )
 
     async def get_tasks(self, telegram_id: int) -> list:
-        """Get all tasks for user."""
+        """Get all tasks for user (cached)."""
+        tasks = self.cache.get_tasks(telegram_id)
+        if tasks is not None:
+            return tasks
+        generation = self.cache.generation(telegram_id)
         result = await self._request(
             'GET',
             'tasks/by_telegram/',
             params={'telegram_id': telegram_id}
         )
+        if result is None:
+            return []
+        self.cache.set_tasks(telegram_id, result, generation)
+        return result
+
+    async def get_task(self, telegram_id: int, task_id: str) -> Optional[dict]:
+        """Get one of the user's tasks, from the cache when possible."""
+        task = self.cache.get_task(telegram_id, task_id)
+        if task is not None:
+            return task
+        tasks = await self.get_tasks(telegram_id)
+        return next((t for t in tasks if t['id'] == task_id), None)
+
+    def invalidate_tasks(self, telegram_id: int) -> None:
+        """Forget cached tasks of a user (e.g. on an explicit refresh)."""
+        self.cache.invalidate(telegram_id)
+
+    async def get_upcoming(
+        self,
+        telegram_id: int,
+        window: str = 'week'
+    ) -> list:
+        """Get open tasks due today, tomorrow or this week (user's time zone)."""
+        result = await self._request(
+            'GET',
+            'tasks/upcoming/',
+            params={'telegram_id': telegram_id, 'window': window}
+        )
+        return result if result else []
+
+    async def get_overdue(self, telegram_id: int) -> list:
+        """Get open tasks past their due date."""
+        result = await self._request(
+            'GET',
+            'tasks/overdue/',
+            params={'telegram_id': telegram_id}
+        )
         return result if result else []
 
+    async def get_dashboard(self, telegram_id: int) -> Optional[dict]:
+        """Get task list window data (tasks page, counts, categories)."""
+        dashboard = self.cache.get_dashboard(telegram_id)
+        if dashboard is not None:
+            return dashboard
+        generation = self.cache.generation(telegram_id)
+        dashboard = await self._request(
+            'GET',
+            'tasks/dashboard/',
+            params={'telegram_id': telegram_id}
+        )
+        if dashboard is not None:
+            self.cache.set_dashboard(telegram_id, dashboard, generation)
+        return dashboard
+
+    def prewarm_dashboard(
+        self,
+        telegram_id: int,
+        on_failure: Optional[Callable[[], Awaitable]] = None
+    ) -> asyncio.Task:
+        """
+        Load the dashboard into the cache in the background.
+
+        on_failure is awaited if the dashboard could not be loaded.
+        """
+        task = asyncio.ensure_future(self._prewarm(telegram_id, on_failure))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _prewarm(
+        self,
+        telegram_id: int,
+        on_failure: Optional[Callable[[], Awaitable]]
+    ) -> None:
+        dashboard = await self.get_dashboard(telegram_id)
+        if dashboard is None and on_failure is not None:
+            await on_failure()
+
+    async def get_changes(
+        self,
+        telegram_id: int,
+        since: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Optional[dict]:
+        """
+        Get task and category changes after a cursor.
+
+        Without since returns only the current cursor. None means the
+        request failed (including an expired cursor - do a full sync).
+        """
+        params = {'telegram_id': telegram_id}
+        if since:
+            params['since'] = since
+        if limit:
+            params['limit'] = limit
+        return await self._request('GET', 'tasks/changes/', params=params)
+
     async def create_task(
         self,
         telegram_id: int,
@@ -97,11 +662,14 @@ class APIClient:
         if category_ids:
             data['category_ids'] = category_ids
 
-        return await self._request(
+        result = await self._request(
             'POST',
             'tasks/create_for_telegram/',
             data=data
         )
+        if result:
+            self.cache.put_task(result, telegram_id)
+        return result
 
     async def get_categories(self, telegram_id: int) -> list:
         """Get all categories for user."""
@@ -131,21 +699,85 @@ class APIClient:
         status: str
     ) -> Optional[dict]:
         """Update task status."""
-        return await self._request(
+        result = await self._request(
             'PATCH',
             f'tasks/{task_id}/',
             data={'status': status}
         )
+        if result:
+            self.cache.put_task(result)
+        return result
 
     async def delete_task(self, task_id: str) -> bool:
         """Delete task."""
-        url = f"{self.base_url}/tasks/{task_id}/"
+        result = await self._call('DELETE', f'tasks/{task_id}/')
+        deleted = result is not None and result[0] == 204
+        if deleted:
+            self.cache.drop_task(task_id)
+        return deleted
+
+    async def batch(
+        self,
+        requests: list,
+        atomic: bool = False,
+        idempotent: bool = False
+    ) -> list:
+        """
+        Execute several API requests in one round trip via /api/batch/.
+
+        Each request is a dict with `method` (default GET), `path` relative
+        to the API root and optional `params` and `body`. Returns results in
+        the same order: the response body for 200/201, True for 204 and
+        None for failures. With atomic=True the backend runs the requests
+        in one transaction; if any fails, all results are None.
+        idempotent=True lets the whole batch be retried. Writes outside
+        users/ drop the whole task cache once the batch has been answered
+        (or has failed), like single writes do.
+        """
+        writes = any(
+            r.get('method', 'GET').upper() != 'GET'
+            and not r['path'].startswith('users/')
+            for r in requests
+        )
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.delete(url) as response:
-                    return response.status == 204
-        except aiohttp.ClientError:
-            return False
+            result = await self._request(
+                'POST',
+                'batch/',
+                data={
+                    'requests': self._sub_requests(requests),
+                    'atomic': atomic
+                },
+                idempotent=idempotent
+            )
+        finally:
+            if writes:
+                self.cache.clear()
+        if not result or not result.get('committed', True):
+            return [None] * len(requests)
+
+        results = []
+        for item in result['results']:
+            if item['status'] in (200, 201):
+                results.append(item['body'])
+            elif item['status'] == 204:
+                results.append(True)
+            else:
+                results.append(None)
+        return results + [None] * (len(requests) - len(results))
+
+    @staticmethod
+    def _sub_requests(requests: list) -> list:
+        sub_requests = []
+        for request in requests:
+            path = request['path']
+            if request.get('params'):
+                path = f"{path}?{urlencode(request['params'])}"
+            sub_requests.append({
+                'method': request.get('method', 'GET'),
+                'path': path,
+                'body': request.get('body'),
+            })
+        return sub_requests
 
 
 api_client = APIClient()
@@ -0,0 +1,131 @@
+"""
+Per-call latency of APIClient: a session per request vs the shared pool.
+
+Runs the same calls through the old pattern (a new ClientSession for
+every request) and through APIClient's pooled session, then prints
+p50/p99 latency for sequential calls and throughput for concurrent ones.
+By default it targets a local stub backend started by the script itself;
+pass --base-url to measure against a real backend:
+
+    cd bot && python benchmarks/api_session.py
+    cd bot && python benchmarks/api_session.py \\
+        --base-url http://localhost:8000/api --telegram-id 123
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import APIClient  # noqa: E402
+
+
+class PerCallSessionClient(APIClient):
+    """The previous behaviour: a fresh session and connection per call."""
+
+    async def _request(self, method, endpoint, data=None, params=None):
+        async with aiohttp.ClientSession() as session:
+            async with session.request(
+                method,
+                f"{self.base_url}/{endpoint}",
+                json=data,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status in (200, 201):
+                    return await response.json()
+                return None
+
+
+async def start_stub_backend():
+    """Minimal backend answering users/by_telegram/; returns (runner, url)."""
+    async def user_by_telegram(request):
+        return web.json_response({
+            'id': '01HXYZ123456789ABCDEFGHJK',
+            'username': 'bench',
+            'telegram_id': int(request.query['telegram_id']),
+        })
+
+    app = web.Application()
+    app.router.add_get('/api/users/by_telegram/', user_by_telegram)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}/api'
+
+
+async def measure(client, telegram_id, calls, concurrency):
+    """Sequential latencies (seconds) and concurrent calls per second."""
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await client.get_user_by_telegram(telegram_id)
+        latencies.append(time.perf_counter() - started)
+
+    async def worker(count):
+        for _ in range(count):
+            await client.get_user_by_telegram(telegram_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(calls // concurrency) for _ in range(concurrency)
+    ))
+    rate = (calls // concurrency) * concurrency / (time.perf_counter() - started)
+    return sorted(latencies), rate
+
+
+def percentile(values, fraction):
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index] * 1000
+
+
+async def run(args):
+    runner = None
+    base_url = args.base_url
+    if base_url is None:
+        runner, base_url = await start_stub_backend()
+
+    print(
+        f'{"client":<12} {"p50, ms":>10} {"p99, ms":>10} {"calls/s":>10}'
+    )
+    try:
+        for name, client in (
+            ('per-call', PerCallSessionClient()),
+            ('pooled', APIClient()),
+        ):
+            client.base_url = base_url
+            await measure(client, args.telegram_id, args.warmup, 1)
+            latencies, rate = await measure(
+                client, args.telegram_id, args.calls, args.concurrency
+            )
+            await client.close()
+            print(
+                f'{name:<12} {percentile(latencies, 0.5):>10.2f} '
+                f'{percentile(latencies, 0.99):>10.2f} {rate:>10,.0f}'
+            )
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--base-url', default=None)
+    parser.add_argument('--telegram-id', type=int, default=123456789)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
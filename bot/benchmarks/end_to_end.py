@@ -0,0 +1,673 @@
+"""
+End-to-end throughput: bot -> backend -> Celery -> Telegram, all local.
+
+The Django backend (SQLite file in WAL mode, or the usual PostgreSQL with
+--postgres), a Celery worker and beat with a filesystem broker run as
+subprocesses with backend/benchmarks/e2e_settings.py. Telegram is a fake
+Bot API server in this process: the bot and the backend's reminders both
+send to it. The bot is the real Dispatcher from main.create_dispatcher()
+talking to both over HTTP. Two streams of load run in stages of
+increasing rate:
+
+- task creation: new users go through /start and the whole /add dialog;
+  creation latency is the confirm step, from the button press until the
+  bot's replies have reached Telegram;
+- reminders: tasks due --reminder-lead seconds ahead are created through
+  the API; beat runs check_due_tasks every --scan-seconds and the worker
+  sends the reminders, whose lag is counted from the due time to the
+  delivery.
+
+After every stage the benchmark checks which component stopped keeping
+up - the bot (event loop lag, slow replies with a fast backend), the
+backend (API p95 over --slo-ms or failed calls) or Celery (reminders late
+by more than the scan interval plus --slo-ms, undelivered, or a growing
+broker queue) - and stops at the first stage where one did:
+
+    cd bot && python benchmarks/end_to_end.py --create-rate 2 \\
+        --reminder-rate 120 --stages 5
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp  # noqa: E402
+from aiogram import Bot  # noqa: E402
+from aiogram.client.default import DefaultBotProperties  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.enums import ParseMode  # noqa: E402
+from aiogram.types import InlineKeyboardMarkup  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from api_client import api_client  # noqa: E402
+from benchmarks.load_harness import SimulatedUser, percentile  # noqa: E402
+from main import create_dispatcher  # noqa: E402
+from metrics import TelegramTimer  # noqa: E402
+from throttling import OutboundRateLimiter  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / 'backend'
+TOKEN = '42:ENDTOEND'
+CREATE_STEPS = (
+    'start', 'add', 'add_title', 'add_description', 'add_skip_date',
+    'add_confirm',
+)
+CREATED_TEXT = '✅ Задача успешно создана!'
+REMINDER_TITLE = 'e2e-reminder-{}'
+REMINDER_RE = re.compile(r'e2e-reminder-(\d+)')
+SCREEN_METHODS = ('sendMessage', 'editMessageText', 'editMessageReplyMarkup')
+# Event loop lag at which the bot process is considered saturated
+LOOP_LAG_LIMIT = 0.1
+LOOP_SAMPLE_SECONDS = 0.05
+BACKLOG_SAMPLE_SECONDS = 0.5
+
+SERVER_COMMANDS = {
+    'uvicorn': [
+        '-m', 'uvicorn', 'todo_project.asgi:application',
+        '--host', '127.0.0.1', '--port', '{port}',
+        '--workers', '{workers}', '--no-access-log', '--log-level', 'warning',
+    ],
+    'gunicorn': [
+        '-m', 'gunicorn', 'todo_project.wsgi:application',
+        '--bind', '127.0.0.1:{port}', '--workers', '{workers}',
+    ],
+    'runserver': ['manage.py', 'runserver', '--noreload', '127.0.0.1:{port}'],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeTelegramServer:
+    """
+    Bot API over HTTP for the bot and the Celery worker.
+
+    Keeps the last text and inline keyboard of every chat in `screens`
+    (so simulated users press what the bot rendered), every sendMessage
+    in `deliveries` as (time, chat_id, text) and counts calls per method.
+    """
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.screens: Dict[int, dict] = {}
+        self.deliveries: List[tuple] = []
+        self.sent: Dict[int, List[str]] = defaultdict(list)
+        self._message_ids = itertools.count(1_000_000)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        if request.content_type == 'application/json':
+            data = await request.json()
+        else:
+            data = dict(await request.post())
+        self.calls[method] += 1
+        result = True
+        chat_id = data.get('chat_id')
+        if chat_id is not None and method in SCREEN_METHODS:
+            chat_id = int(chat_id)
+            screen = self.screens.get(chat_id, {})
+            message_id = data.get('message_id')
+            message_id = (
+                int(message_id) if message_id else next(self._message_ids)
+            )
+            text = data.get('text') or screen.get('text', '')
+            markup = data.get('reply_markup')
+            if isinstance(markup, str):
+                markup = json.loads(markup)
+            self.screens[chat_id] = {
+                'message_id': message_id,
+                'text': text,
+                'keyboard': (
+                    InlineKeyboardMarkup.model_validate(markup).inline_keyboard
+                    if markup and 'inline_keyboard' in markup else []
+                ),
+            }
+            if method == 'sendMessage':
+                self.deliveries.append((time.time(), chat_id, text))
+                self.sent[chat_id].append(text)
+            result = {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': 42, 'is_bot': True, 'first_name': 'Bot'},
+                'text': text,
+            }
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self) -> str:
+        app = web.Application()
+        # The path is /bot<token>/<method>
+        app.router.add_post('/{token}/{method}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class Stack:
+    """Backend server, Celery worker and beat as subprocesses."""
+
+    def __init__(
+        self,
+        data_dir: Path,
+        telegram_url: str,
+        server: str = 'uvicorn',
+        backend_workers: int = 2,
+        celery_concurrency: int = 4,
+        scan_seconds: float = 5.0,
+        postgres: bool = False
+    ):
+        self.data_dir = data_dir
+        self.broker_dir = data_dir / 'broker'
+        self.server = server
+        self.backend_workers = backend_workers
+        self.celery_concurrency = celery_concurrency
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}/api'
+        self.env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'benchmarks.e2e_settings',
+            'E2E_DATA_DIR': str(data_dir),
+            'E2E_SCAN_SECONDS': str(scan_seconds),
+            'E2E_USE_POSTGRES': '1' if postgres else '0',
+            'TELEGRAM_BOT_TOKEN': TOKEN,
+            'TELEGRAM_API_URL': telegram_url,
+        }
+        self._processes: List[subprocess.Popen] = []
+
+    def _spawn(self, name: str, args: List[str]) -> None:
+        log = open(self.data_dir / f'{name}.log', 'wb')
+        self._processes.append(subprocess.Popen(
+            [sys.executable, *args], cwd=BACKEND_DIR, env=self.env,
+            stdout=log, stderr=subprocess.STDOUT
+        ))
+        log.close()
+
+    async def start(self, timeout: float = 60.0) -> None:
+        for folder in ('broker', 'processed', 'cache'):
+            (self.data_dir / folder).mkdir(parents=True, exist_ok=True)
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '--run-syncdb',
+             '--verbosity', '0'],
+            cwd=BACKEND_DIR, env=self.env, check=True
+        )
+        self._spawn('backend', [
+            part.format(port=self.port, workers=self.backend_workers)
+            for part in SERVER_COMMANDS[self.server]
+        ])
+        self._spawn('worker', [
+            '-m', 'celery', '-A', 'todo_project', 'worker',
+            '-P', 'threads', '-c', str(self.celery_concurrency),
+            '--without-gossip', '--without-mingle', '--without-heartbeat',
+            '-l', 'WARNING',
+        ])
+        self._spawn('beat', [
+            '-m', 'celery', '-A', 'todo_project', 'beat',
+            '-s', str(self.data_dir / 'celerybeat-schedule'), '-l', 'WARNING',
+        ])
+        deadline = time.monotonic() + timeout
+        async with aiohttp.ClientSession() as session:
+            while True:
+                if any(p.poll() is not None for p in self._processes):
+                    raise RuntimeError(f"Stack exited, see {self.data_dir}")
+                try:
+                    async with session.get(f'{self.url}/health/') as response:
+                        if response.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Backend not ready, see {self.data_dir}")
+                await asyncio.sleep(0.2)
+
+    def backlog(self) -> int:
+        """Messages waiting in the Celery broker."""
+        return len(os.listdir(self.broker_dir))
+
+    def stop(self) -> None:
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+class Creator(SimulatedUser):
+    """New user who starts the bot and adds one task."""
+
+    def steps(self):
+        for step, make_update in super().steps():
+            if step in CREATE_STEPS:
+                yield step, make_update
+
+
+class Stage:
+    """Offered rates and measurements of one stage."""
+
+    def __init__(self, number: int, create_rate: float, reminder_rate: float):
+        self.number = number
+        self.create_rate = create_rate
+        self.reminder_rate = reminder_rate
+        self.steps: Dict[str, List[float]] = defaultdict(list)
+        self.flows: List[float] = []
+        self.created = 0
+        self.failed = 0
+        self.api: List[float] = []
+        self.api_errors = 0
+        # reminder number -> due time (epoch seconds)
+        self.reminders: Dict[int, float] = {}
+        self.lags: List[float] = []
+        self.loop_lags: List[float] = []
+        self.backlog: List[int] = []
+
+
+def stats(values: List[float]) -> Optional[dict]:
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'p50': percentile(values, 0.5),
+        'p95': percentile(values, 0.95),
+        'p99': percentile(values, 0.99),
+        'max': max(values),
+    }
+
+
+class EndToEnd:
+    """Drives the bot and the reminder stream against the local stack."""
+
+    def __init__(
+        self,
+        create_rate: float = 1.0,
+        reminder_rate: float = 60.0,
+        stages: int = 4,
+        stage_seconds: float = 30.0,
+        ramp_factor: float = 2.0,
+        reminder_lead: float = 2.0,
+        reminder_users: int = 50,
+        scan_seconds: float = 5.0,
+        slo: float = 0.5,
+        server: str = 'uvicorn',
+        backend_workers: int = 2,
+        celery_concurrency: int = 4,
+        postgres: bool = False,
+        telegram_limits: bool = False,
+        keep_data: bool = False
+    ):
+        self.create_rate = create_rate
+        self.reminder_rate = reminder_rate
+        self.stages = stages
+        self.stage_seconds = stage_seconds
+        self.ramp_factor = ramp_factor
+        self.reminder_lead = reminder_lead
+        self.reminder_users = [900_000 + n for n in range(reminder_users)]
+        self.scan_seconds = scan_seconds
+        self.slo = slo
+        self.server = server
+        self.backend_workers = backend_workers
+        self.celery_concurrency = celery_concurrency
+        self.postgres = postgres
+        self.telegram_limits = telegram_limits
+        self.keep_data = keep_data
+        self.telegram = FakeTelegramServer()
+        self.skipped: Counter = Counter()
+        self.errors = 0
+        self.stage: Optional[Stage] = None
+        self._update_ids = itertools.count(1)
+        self._creators = itertools.count(100_000)
+        self._reminders = itertools.count(1)
+        self._delivered = 0
+
+    # SimulatedUser calls these on its harness
+    def next_update_id(self) -> int:
+        return next(self._update_ids)
+
+    async def feed(self, step: str, update: dict) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dispatcher.feed_raw_update(self.bot, update)
+        except Exception:
+            self.errors += 1
+            logging.exception(f"Step {step} failed")
+        self.stage.steps[step].append(time.perf_counter() - started)
+
+    async def create(self, stage: Stage) -> None:
+        creator = Creator(self, next(self._creators))
+        creator.title = f'Задача {creator.telegram_id}'
+        started = time.perf_counter()
+        await creator.run()
+        stage.flows.append(time.perf_counter() - started)
+        if CREATED_TEXT in self.telegram.sent[creator.telegram_id]:
+            stage.created += 1
+        else:
+            stage.failed += 1
+
+    async def remind(self, stage: Stage) -> None:
+        number = next(self._reminders)
+        due = time.time() + self.reminder_lead
+        started = time.perf_counter()
+        task = await api_client.create_task(
+            self.reminder_users[number % len(self.reminder_users)],
+            REMINDER_TITLE.format(number),
+            due_date=datetime.fromtimestamp(due, timezone.utc).isoformat()
+        )
+        stage.api.append(time.perf_counter() - started)
+        if task is None:
+            stage.api_errors += 1
+        else:
+            stage.reminders[number] = due
+
+    def collect_deliveries(self, stage: Stage) -> None:
+        deliveries = self.telegram.deliveries
+        for at, _, text in deliveries[self._delivered:]:
+            match = REMINDER_RE.search(text)
+            if match is None:
+                continue
+            due = stage.reminders.get(int(match.group(1)))
+            if due is not None:
+                stage.lags.append(at - due)
+        self._delivered = len(deliveries)
+
+    async def pace(self, rate: float, spawn, running: list) -> None:
+        """Start spawn() `rate` times a second, on schedule, for a stage."""
+        if rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for n in itertools.count():
+            at = started + n / rate
+            if at - started >= self.stage_seconds:
+                return
+            await asyncio.sleep(max(0.0, at - loop.time()))
+            running.append(asyncio.create_task(spawn()))
+
+    async def sample_loop(self, stage: Stage) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_SAMPLE_SECONDS
+            await asyncio.sleep(LOOP_SAMPLE_SECONDS)
+            stage.loop_lags.append(max(0.0, loop.time() - expected))
+
+    async def sample_backlog(self, stage: Stage) -> None:
+        while True:
+            stage.backlog.append(self.stack.backlog())
+            await asyncio.sleep(BACKLOG_SAMPLE_SECONDS)
+
+    async def run_stage(self, number: int) -> dict:
+        factor = self.ramp_factor ** (number - 1)
+        stage = self.stage = Stage(
+            number, self.create_rate * factor, self.reminder_rate * factor
+        )
+        samplers = [
+            asyncio.create_task(self.sample_loop(stage)),
+            asyncio.create_task(self.sample_backlog(stage)),
+        ]
+        running: list = []
+        try:
+            await asyncio.gather(
+                self.pace(stage.create_rate, lambda: self.create(stage),
+                          running),
+                self.pace(stage.reminder_rate / 60,
+                          lambda: self.remind(stage), running),
+            )
+            grace = self.scan_seconds + self.reminder_lead + self.slo + 10
+            if running:
+                await asyncio.wait(running, timeout=grace)
+            # Reminders due at the end of the stage are sent one scan later
+            deadline = time.monotonic() + grace
+            while time.monotonic() < deadline:
+                self.collect_deliveries(stage)
+                if len(stage.lags) >= len(stage.reminders):
+                    break
+                await asyncio.sleep(0.2)
+        finally:
+            for sampler in samplers:
+                sampler.cancel()
+        unfinished = sum(not task.done() for task in running)
+        for task in running:
+            task.cancel()
+        return self.summary(stage, unfinished)
+
+    def summary(self, stage: Stage, unfinished: int) -> dict:
+        confirm = stats(stage.steps.get('add_confirm', []))
+        api = stats(stage.api)
+        lags = stats(stage.lags)
+        loop_lag = stats(stage.loop_lags)
+        undelivered = len(stage.reminders) - len(stage.lags)
+        half = len(stage.backlog) // 2
+        backlog_growing = bool(half) and (
+            min(stage.backlog[half:]) > max(stage.backlog[:half])
+        )
+
+        saturated = []
+        backend = stage.api_errors > 0 or (api and api['p95'] > self.slo)
+        if backend:
+            saturated.append('backend')
+        if (undelivered or backlog_growing or (
+                lags and lags['p95'] > self.scan_seconds + self.slo)):
+            saturated.append('celery')
+        if (loop_lag and loop_lag['p95'] > LOOP_LAG_LIMIT) or (
+                not backend and (stage.failed or unfinished or (
+                    confirm and confirm['p95'] > self.slo))):
+            saturated.append('bot')
+
+        return {
+            'stage': stage.number,
+            'create_rate': stage.create_rate,
+            'reminder_rate': stage.reminder_rate,
+            'created': stage.created,
+            'failed': stage.failed,
+            'unfinished': unfinished,
+            'confirm': confirm,
+            'flow': stats(stage.flows),
+            'api': api,
+            'api_errors': stage.api_errors,
+            'reminders': len(stage.reminders),
+            'undelivered': undelivered,
+            'reminder_lag': lags,
+            'backlog_max': max(stage.backlog, default=0),
+            'loop_lag': loop_lag,
+            'saturated': saturated,
+        }
+
+    async def run(self) -> dict:
+        data_dir = Path(tempfile.mkdtemp(prefix='todo-e2e-'))
+        telegram_url = await self.telegram.start()
+        self.stack = Stack(
+            data_dir, telegram_url,
+            server=self.server,
+            backend_workers=self.backend_workers,
+            celery_concurrency=self.celery_concurrency,
+            scan_seconds=self.scan_seconds,
+            postgres=self.postgres,
+        )
+        base_url = api_client.base_url
+        results = []
+        try:
+            await self.stack.start()
+            api_client.base_url = self.stack.url
+            self.bot = Bot(
+                TOKEN,
+                session=AiohttpSession(
+                    api=TelegramAPIServer.from_base(telegram_url)
+                ),
+                default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+            )
+            self.bot.session.middleware(TelegramTimer())
+            if self.telegram_limits:
+                self.bot.session.middleware(OutboundRateLimiter())
+            self.dispatcher = create_dispatcher(metrics_port=0)
+            await self.dispatcher.emit_startup(
+                bot=self.bot, dispatcher=self.dispatcher
+            )
+            try:
+                for telegram_id in self.reminder_users:
+                    await api_client.register_user(
+                        telegram_id, f'reminder_{telegram_id}'
+                    )
+                for number in range(1, self.stages + 1):
+                    results.append(await self.run_stage(number))
+                    if results[-1]['saturated']:
+                        break
+            finally:
+                await self.dispatcher.emit_shutdown(
+                    bot=self.bot, dispatcher=self.dispatcher
+                )
+                await self.bot.session.close()
+        finally:
+            self.stack.stop()
+            await self.telegram.stop()
+            api_client.base_url = base_url
+            api_client.cache.clear()
+            if self.keep_data:
+                print(f"данные и логи: {data_dir}", file=sys.stderr)
+            else:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+        first = next((r for r in results if r['saturated']), None)
+        return {
+            'server': self.server,
+            'database': 'postgresql' if self.postgres else 'sqlite',
+            'scan_seconds': self.scan_seconds,
+            'slo': self.slo,
+            'stages': results,
+            'saturated_stage': first['stage'] if first else None,
+            'saturated': first['saturated'] if first else [],
+            'skipped': dict(self.skipped),
+            'errors': self.errors,
+            'telegram_calls': dict(self.telegram.calls),
+        }
+
+
+def _ms(values: Optional[dict], key: str) -> str:
+    return f"{values[key] * 1000:.0f}" if values else '-'
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"backend {report['server']} на {report['database']}, "
+        f"check_due_tasks каждые {report['scan_seconds']:g} с, "
+        f"SLO {report['slo'] * 1000:.0f} мс"
+    )
+    print(
+        f'\n{"этап":>4} {"созд/с":>7} {"напом/мин":>9} {"создано":>8} '
+        f'{"ошибок":>7} {"p50 мс":>7} {"p95 мс":>7} {"p99 мс":>7} '
+        f'{"API p95":>8} {"лаг p50":>8} {"лаг p95":>8} {"не дост.":>8} '
+        f'{"очередь":>8} {"цикл p95":>9}'
+    )
+    for stage in report['stages']:
+        lag = stage['reminder_lag']
+        print(
+            f"{stage['stage']:>4} {stage['create_rate']:>7.2f} "
+            f"{stage['reminder_rate']:>9.0f} {stage['created']:>8} "
+            f"{stage['failed'] + stage['unfinished']:>7} "
+            f"{_ms(stage['confirm'], 'p50'):>7} "
+            f"{_ms(stage['confirm'], 'p95'):>7} "
+            f"{_ms(stage['confirm'], 'p99'):>7} "
+            f"{_ms(stage['api'], 'p95'):>8} "
+            f"{lag['p50'] if lag else 0:>7.1f}с {lag['p95'] if lag else 0:>7.1f}с "
+            f"{stage['undelivered']:>8} {stage['backlog_max']:>8} "
+            f"{_ms(stage['loop_lag'], 'p95'):>9}"
+        )
+    if report['saturated']:
+        print(
+            f"\nпервым не справился: {', '.join(report['saturated'])} "
+            f"(этап {report['saturated_stage']})"
+        )
+    else:
+        print("\nни один компонент не упёрся в пределы на этих нагрузках")
+    if report['skipped'] or report['errors']:
+        print(
+            f"пропущено шагов: {report['skipped']}, "
+            f"ошибок бота: {report['errors']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--create-rate', type=float, default=1.0,
+                        help='task creations per second in the first stage')
+    parser.add_argument('--reminder-rate', type=float, default=60.0,
+                        help='reminders per minute in the first stage')
+    parser.add_argument('--stages', type=int, default=4)
+    parser.add_argument('--stage-seconds', type=float, default=30.0)
+    parser.add_argument('--ramp-factor', type=float, default=2.0,
+                        help='rate multiplier from one stage to the next')
+    parser.add_argument('--reminder-lead', type=float, default=2.0,
+                        help='seconds from creating a reminder to its due time')
+    parser.add_argument('--reminder-users', type=int, default=50)
+    parser.add_argument('--scan-seconds', type=float, default=5.0,
+                        help='check_due_tasks interval')
+    parser.add_argument('--slo-ms', type=float, default=500)
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS),
+                        default='uvicorn')
+    parser.add_argument('--backend-workers', type=int, default=2)
+    parser.add_argument('--celery-concurrency', type=int, default=4)
+    parser.add_argument('--postgres', action='store_true',
+                        help='use the PostgreSQL from the POSTGRES_* settings')
+    parser.add_argument('--telegram-limits', action='store_true',
+                        help="apply Telegram's send limits in the bot")
+    parser.add_argument('--keep-data', action='store_true',
+                        help='keep the database and process logs')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('aiogram').setLevel(logging.WARNING)
+    benchmark = EndToEnd(
+        create_rate=args.create_rate,
+        reminder_rate=args.reminder_rate,
+        stages=args.stages,
+        stage_seconds=args.stage_seconds,
+        ramp_factor=args.ramp_factor,
+        reminder_lead=args.reminder_lead,
+        reminder_users=args.reminder_users,
+        scan_seconds=args.scan_seconds,
+        slo=args.slo_ms / 1000,
+        server=args.server,
+        backend_workers=args.backend_workers,
+        celery_concurrency=args.celery_concurrency,
+        postgres=args.postgres,
+        telegram_limits=args.telegram_limits,
+        keep_data=args.keep_data,
+    )
+    report = asyncio.run(benchmark.run())
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
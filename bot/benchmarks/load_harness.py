@@ -0,0 +1,514 @@
+"""
+Offline load test of the bot: synthetic users, fake backend, fake Telegram.
+
+Thousands of simulated users go through /start, /tasks, scroll the task
+list, open task details and go back, then add a task through the whole
+/add dialog. Their updates are fed to the real Dispatcher from
+main.create_dispatcher() with `router` and `dialog_router`; replies go to
+a fake Bot API session that keeps the last keyboard of every chat, so
+users press the buttons the bot actually rendered. The backend is an
+in-process aiohttp app with the API endpoints the bot uses. Prints
+updates per second, latency percentiles per step and backend and
+Telegram calls per interaction:
+
+    cd bot && python benchmarks/load_harness.py --users 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.default import DefaultBotProperties  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.enums import ParseMode  # noqa: E402
+from aiogram.types import InlineKeyboardMarkup  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from api_client import api_client  # noqa: E402
+from main import create_dispatcher  # noqa: E402
+from metrics import TelegramTimer  # noqa: E402
+from throttling import OutboundRateLimiter  # noqa: E402
+
+TOKEN = '42:LOADTEST'
+DASHBOARD_TASKS_LIMIT = 20
+STATUSES = ('pending', 'in_progress', 'completed')
+
+# Steps of one simulated session, in order
+STEPS = (
+    'start', 'tasks', 'scroll', 'detail', 'back', 'close',
+    'add', 'add_title', 'add_description', 'add_skip_date', 'add_confirm',
+)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class FakeBackend:
+    """
+    The API endpoints the bot calls, on in-memory users and tasks.
+
+    `calls` counts requests per route; `latency` seconds are added to
+    every response to model a remote backend.
+    """
+
+    def __init__(self, tasks_per_user: int = 12, latency: float = 0.0):
+        self.tasks_per_user = tasks_per_user
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.users: Dict[int, dict] = {}
+        self.tasks: Dict[int, List[dict]] = {}
+        self._ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    def _task(self, telegram_id: int, title: str, description: str = '',
+              due_date: Optional[str] = None) -> dict:
+        number = next(self._ids)
+        return {
+            'id': f'{number:026d}',
+            'title': title,
+            'description': description,
+            'status': STATUSES[number % len(STATUSES)],
+            'due_date': due_date,
+            'categories': [],
+            'created_at': '2025-01-01T10:00:00Z',
+            'telegram_id': telegram_id,
+        }
+
+    def _user_tasks(self, telegram_id: int) -> List[dict]:
+        if telegram_id not in self.tasks:
+            self.tasks[telegram_id] = [
+                self._task(telegram_id, f'Задача {n}', 'Описание задачи')
+                for n in range(self.tasks_per_user)
+            ]
+        return self.tasks[telegram_id]
+
+    @web.middleware
+    async def count(self, request: web.Request, handler):
+        route = request.match_info.route.resource.canonical
+        self.calls[f'{request.method} {route}'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def _register(self, data: dict) -> tuple:
+        """(status, user) of a registration."""
+        telegram_id = data['telegram_id']
+        created = telegram_id not in self.users
+        user = self.users.setdefault(telegram_id, {
+            'id': f'U{telegram_id:025d}',
+            'username': data.get('username'),
+            'telegram_id': telegram_id,
+        })
+        return 201 if created else 200, user
+
+    def _dashboard(self, telegram_id: int) -> dict:
+        tasks = self._user_tasks(telegram_id)
+        return {
+            'tasks': tasks[:DASHBOARD_TASKS_LIMIT],
+            'tasks_count': len(tasks),
+            'status_counts': Counter(task['status'] for task in tasks),
+            'categories': [],
+        }
+
+    async def register(self, request: web.Request) -> web.Response:
+        status, user = self._register(await request.json())
+        return web.json_response(user, status=status)
+
+    async def dashboard(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            self._dashboard(int(request.query['telegram_id']))
+        )
+
+    async def batch(self, request: web.Request) -> web.Response:
+        """The sub-requests /start sends: registration and the dashboard."""
+        results = []
+        for sub in (await request.json())['requests']:
+            path, _, query = sub['path'].partition('?')
+            if path == 'users/register_telegram/':
+                status, body = self._register(sub['body'])
+            elif path == 'tasks/dashboard/':
+                telegram_id = int(parse_qs(query)['telegram_id'][0])
+                status, body = 200, self._dashboard(telegram_id)
+            else:
+                status, body = 404, {'detail': 'Not found.'}
+            results.append({'status': status, 'body': body})
+        return web.json_response({'results': results, 'committed': True})
+
+    async def by_telegram(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            self._user_tasks(int(request.query['telegram_id']))
+        )
+
+    async def create_task(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        telegram_id = data['telegram_id']
+        task = self._task(
+            telegram_id, data['title'], data.get('description', ''),
+            data.get('due_date')
+        )
+        self._user_tasks(telegram_id).insert(0, task)
+        return web.json_response(task, status=201)
+
+    async def update_task(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        task_id = request.match_info['task_id']
+        for tasks in self.tasks.values():
+            for task in tasks:
+                if task['id'] == task_id:
+                    task.update(data)
+                    return web.json_response(task)
+        return web.json_response({'detail': 'Not found.'}, status=404)
+
+    async def categories(self, request: web.Request) -> web.Response:
+        return web.json_response([])
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.count])
+        app.router.add_post('/api/batch/', self.batch)
+        app.router.add_post('/api/users/register_telegram/', self.register)
+        app.router.add_get('/api/tasks/dashboard/', self.dashboard)
+        app.router.add_get('/api/tasks/by_telegram/', self.by_telegram)
+        app.router.add_post(
+            '/api/tasks/create_for_telegram/', self.create_task
+        )
+        app.router.add_patch('/api/tasks/{task_id}/', self.update_task)
+        app.router.add_get('/api/categories/', self.categories)
+        return app
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/api'
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeTelegram(BaseSession):
+    """
+    Bot API session answering in process.
+
+    Sent and edited messages are answered with a Message built the way
+    Telegram would, and the last text and inline keyboard of each chat
+    are kept in `screens`. `calls` counts requests per method.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.screens: Dict[int, dict] = {}
+        self._message_ids = itertools.count(1_000_000)
+
+    async def make_request(self, bot, method, timeout=None):
+        name = method.__api_method__
+        self.calls[name] += 1
+        result = True
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is not None and name in (
+            'sendMessage', 'editMessageText', 'editMessageReplyMarkup'
+        ):
+            screen = self.screens.get(chat_id, {})
+            message_id = getattr(method, 'message_id', None)
+            if message_id is None:
+                message_id = next(self._message_ids)
+            text = getattr(method, 'text', None) or screen.get('text', '')
+            markup = method.reply_markup
+            self.screens[chat_id] = {
+                'message_id': message_id,
+                'text': text,
+                'keyboard': (
+                    markup.inline_keyboard
+                    if isinstance(markup, InlineKeyboardMarkup) else []
+                ),
+            }
+            result = {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': bot.id, 'is_bot': True, 'first_name': 'Bot'},
+                'text': text,
+            }
+        response = self.check_response(
+            bot, method, 200, json.dumps({'ok': True, 'result': result})
+        )
+        return response.result
+
+    async def stream_content(self, *args, **kwargs):  # pragma: no cover
+        yield b''
+
+    async def close(self) -> None:
+        pass
+
+
+class SimulatedUser:
+    """One Telegram user clicking through the bot like a person would."""
+
+    def __init__(self, harness: 'LoadHarness', telegram_id: int):
+        self.harness = harness
+        self.telegram_id = telegram_id
+        self._message_ids = itertools.count(1)
+        self.sender = {
+            'id': telegram_id, 'is_bot': False, 'first_name': 'Load',
+            'username': f'load_{telegram_id}',
+        }
+        self.chat = {'id': telegram_id, 'type': 'private'}
+        self.title = 'Купить молоко'
+
+    def message(self, text: str) -> dict:
+        message_id = next(self._message_ids)
+        return {
+            'update_id': self.harness.next_update_id(),
+            'message': {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': self.chat,
+                'from': self.sender,
+                'text': text,
+            },
+        }
+
+    def press(self, matches) -> Optional[dict]:
+        """Callback update for a button on screen that matches."""
+        screen = self.harness.telegram.screens.get(self.telegram_id)
+        if screen is None:
+            return None
+        buttons = [
+            button for row in screen['keyboard'] for button in row
+            if button.callback_data and matches(button)
+        ]
+        if not buttons:
+            return None
+        return {
+            'update_id': self.harness.next_update_id(),
+            'callback_query': {
+                'id': str(self.harness.next_update_id()),
+                'from': self.sender,
+                'chat_instance': str(self.telegram_id),
+                'data': random.choice(buttons).callback_data,
+                'message': {
+                    'message_id': screen['message_id'],
+                    'date': int(time.time()),
+                    'chat': self.chat,
+                    'text': screen['text'],
+                },
+            },
+        }
+
+    def steps(self):
+        """(step, update factory) pairs of one session."""
+        def text(label):
+            return lambda button: label in button.text
+
+        yield 'start', lambda: self.message('/start')
+        yield 'tasks', lambda: self.message('/tasks')
+        yield 'scroll', lambda: self.press(
+            lambda button: 'tasks_scroll' in button.callback_data
+            and button.text in ('>', '›')
+        )
+        yield 'detail', lambda: self.press(
+            lambda button: 'task_select' in button.callback_data
+        )
+        yield 'back', lambda: self.press(text('Назад'))
+        yield 'close', lambda: self.press(text('Закрыть'))
+        yield 'add', lambda: self.message('/add')
+        yield 'add_title', lambda: self.message(self.title)
+        yield 'add_description', lambda: self.message('2 литра, в магазине')
+        yield 'add_skip_date', lambda: self.press(text('Пропустить'))
+        yield 'add_confirm', lambda: self.press(text('Создать'))
+
+    async def run(self) -> None:
+        for step, make_update in self.steps():
+            update = make_update()
+            if update is None:
+                self.harness.skipped[step] += 1
+                continue
+            await self.harness.feed(step, update)
+
+
+class LoadHarness:
+    """Runs simulated users against the real Dispatcher."""
+
+    def __init__(
+        self,
+        users: int = 1000,
+        concurrency: int = 100,
+        tasks_per_user: int = 12,
+        backend_latency: float = 0.0,
+        telegram_limits: bool = False
+    ):
+        self.users = users
+        self.concurrency = concurrency
+        self.backend = FakeBackend(tasks_per_user, backend_latency)
+        self.telegram = FakeTelegram()
+        self.telegram_limits = telegram_limits
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.skipped: Counter = Counter()
+        self.errors = 0
+        self._update_ids = itertools.count(1)
+
+    def next_update_id(self) -> int:
+        return next(self._update_ids)
+
+    async def feed(self, step: str, update: dict) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dispatcher.feed_raw_update(self.bot, update)
+        except Exception:
+            self.errors += 1
+            logging.exception(f"Step {step} failed")
+        self.latencies[step].append(time.perf_counter() - started)
+
+    async def run(self) -> dict:
+        base_url = api_client.base_url
+        api_client.base_url = await self.backend.start()
+        self.bot = Bot(
+            TOKEN,
+            session=self.telegram,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+        self.bot.session.middleware(TelegramTimer())
+        if self.telegram_limits:
+            self.bot.session.middleware(OutboundRateLimiter())
+        self.dispatcher = create_dispatcher(metrics_port=0)
+        await self.dispatcher.emit_startup(
+            bot=self.bot, dispatcher=self.dispatcher
+        )
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def session(telegram_id: int) -> None:
+            async with semaphore:
+                await SimulatedUser(self, telegram_id).run()
+
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                session(10_000 + n) for n in range(self.users)
+            ))
+            elapsed = time.perf_counter() - started
+        finally:
+            await self.dispatcher.emit_shutdown(
+                bot=self.bot, dispatcher=self.dispatcher
+            )
+            await self.backend.stop()
+            api_client.base_url = base_url
+            api_client.cache.clear()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        updates = sum(len(values) for values in self.latencies.values())
+        everything = [v for values in self.latencies.values() for v in values]
+        return {
+            'users': self.users,
+            'updates': updates,
+            'errors': self.errors,
+            'seconds': elapsed,
+            'updates_per_second': updates / elapsed if elapsed else 0.0,
+            'p50': percentile(everything, 0.5) if everything else 0.0,
+            'p95': percentile(everything, 0.95) if everything else 0.0,
+            'p99': percentile(everything, 0.99) if everything else 0.0,
+            'steps': {
+                step: {
+                    'count': len(values),
+                    'p50': percentile(values, 0.5),
+                    'p95': percentile(values, 0.95),
+                    'p99': percentile(values, 0.99),
+                }
+                for step, values in self.latencies.items()
+            },
+            'skipped': dict(self.skipped),
+            'backend_calls': dict(self.backend.calls),
+            'backend_calls_per_update': (
+                sum(self.backend.calls.values()) / updates if updates else 0.0
+            ),
+            'telegram_calls': dict(self.telegram.calls),
+            'telegram_calls_per_update': (
+                sum(self.telegram.calls.values()) / updates if updates else 0.0
+            ),
+        }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['users']} пользователей, {report['updates']} апдейтов "
+        f"за {report['seconds']:.1f} с: "
+        f"{report['updates_per_second']:,.0f} апд/с, ошибок {report['errors']}"
+    )
+    print(
+        f"задержка p50 {report['p50'] * 1000:.1f} мс, "
+        f"p95 {report['p95'] * 1000:.1f} мс, p99 {report['p99'] * 1000:.1f} мс"
+    )
+    print(f'\n{"шаг":<16} {"апдейтов":>9} {"p50 мс":>8} {"p95 мс":>8} '
+          f'{"p99 мс":>8}')
+    for step in STEPS:
+        stats = report['steps'].get(step)
+        if stats:
+            print(
+                f"{step:<16} {stats['count']:>9} {stats['p50'] * 1000:>8.1f} "
+                f"{stats['p95'] * 1000:>8.1f} {stats['p99'] * 1000:>8.1f}"
+            )
+    if report['skipped']:
+        print(f"\nпропущено (нет кнопки): {report['skipped']}")
+    print(
+        f"\nbackend: {report['backend_calls_per_update']:.2f} вызова на апдейт"
+    )
+    for route, count in sorted(report['backend_calls'].items()):
+        print(f"  {route:<40} {count:>8}")
+    print(
+        f"telegram: {report['telegram_calls_per_update']:.2f} вызова на апдейт"
+    )
+    for method, count in sorted(report['telegram_calls'].items()):
+        print(f"  {method:<40} {count:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='users clicking at the same time')
+    parser.add_argument('--tasks', type=int, default=12,
+                        help='tasks every user starts with')
+    parser.add_argument('--backend-latency-ms', type=float, default=0)
+    parser.add_argument('--telegram-limits', action='store_true',
+                        help="apply Telegram's send limits (slow by design)")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('aiogram').setLevel(logging.WARNING)
+    harness = LoadHarness(
+        users=args.users,
+        concurrency=args.concurrency,
+        tasks_per_user=args.tasks,
+        backend_latency=args.backend_latency_ms / 1000,
+        telegram_limits=args.telegram_limits,
+    )
+    report = asyncio.run(harness.run())
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Throughput of the chat-sharded bot with 1 to 8 worker processes.
+
+Every update is parsed and dispatched by a real aiogram Dispatcher in a
+worker; the handler renders an inline keyboard the way a dialog window
+does (--render times), which is the CPU-bound part of the real bot. No
+Telegram or backend calls are made. Prints updates per second for each
+process count:
+
+    cd bot && python benchmarks/sharded_throughput.py --updates 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.types import (  # noqa: E402
+    InlineKeyboardButton, InlineKeyboardMarkup, Message
+)
+
+from sharding import ShardRouter  # noqa: E402
+
+FACTORY = 'benchmarks.sharded_throughput:create_worker'
+
+
+def create_worker(render: int = 20):
+    """Worker with a handler that renders a task list keyboard."""
+    logging.getLogger('aiogram.event').setLevel(logging.WARNING)
+    router = Router()
+
+    @router.message()
+    async def render_list(message: Message):
+        for _ in range(render):
+            InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(
+                    text=f'📌 {message.text} {n} | 🕐 01.01.2025 10:00',
+                    callback_data=f'task_select:{n:026d}'
+                )]
+                for n in range(10)
+            ]).model_dump_json()
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    return Bot('42:BENCHMARK'), dispatcher
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': 'Задача',
+        },
+    }
+
+
+async def wait_for(processed, count: int) -> None:
+    while processed.value < count:
+        await asyncio.sleep(0.005)
+
+
+async def measure(workers: int, args) -> float:
+    processed = multiprocessing.get_context('spawn').Value('q', 0)
+    router = ShardRouter(
+        FACTORY,
+        workers=workers,
+        queue_size=args.queue_size,
+        factory_kwargs={'render': args.render},
+        processed=processed,
+    )
+    router.start()
+    try:
+        # Warm up: every worker imported aiogram and handled an update
+        for chat_id in range(workers):
+            await router.route(make_update(chat_id, chat_id))
+        await wait_for(processed, workers)
+
+        started = time.perf_counter()
+        for update_id in range(args.updates):
+            await router.route(make_update(update_id, update_id % args.chats))
+        await wait_for(processed, workers + args.updates)
+        return args.updates / (time.perf_counter() - started)
+    finally:
+        await router.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--updates', type=int, default=10000)
+    parser.add_argument('--chats', type=int, default=1000)
+    parser.add_argument('--render', type=int, default=20)
+    parser.add_argument('--queue-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f'{"процессы":>9} {"апд/с":>10} {"ускорение":>10}')
+    baseline = None
+    for workers in args.workers:
+        rate = asyncio.run(measure(workers, args))
+        baseline = baseline or rate
+        print(f'{workers:>9} {rate:>10,.0f} {rate / baseline:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -16,26 +16,48 @@ from aiogram_dialog.widgets.text import Const, Format
 from aiogram_dialog.widgets.input import TextInput, ManagedTextInput
 
 from api_client import api_client
+from metrics import timed
 from states import TaskSG, AddTaskSG
 
 logger = logging.getLogger(__name__)
 
 dialog_router = Router()
 
+# Tasks per page of the task list
+TASKS_SCROLL_HEIGHT = 5
+
 
 # ============== Task List Dialog ==============
 
+@timed('getter')
 async def get_tasks_data(dialog_manager: DialogManager, **kwargs) -> dict:
-    """Get tasks data for the dialog."""
+    """
+    Get tasks data for the dialog from the dashboard endpoint.
+
+    The dashboard holds only the newest tasks; once the list is scrolled
+    to the last page of them, the full list is loaded so older tasks can
+    be reached.
+    """
     event = dialog_manager.event
     telegram_id = event.from_user.id
 
-    tasks = await api_client.get_tasks(telegram_id)
+    dashboard = await api_client.get_dashboard(telegram_id) or {}
+    tasks = dashboard.get("tasks", [])
+    tasks_count = dashboard.get("tasks_count", len(tasks))
+    status_counts = dashboard.get("status_counts", {})
+
+    if len(tasks) < tasks_count:
+        page = await dialog_manager.find("tasks_scroll").get_page()
+        if (page + 1) * TASKS_SCROLL_HEIGHT >= len(tasks):
+            tasks = await api_client.get_tasks(telegram_id) or tasks
 
     return {
         "tasks": tasks,
-        "tasks_count": len(tasks),
-        "has_tasks": len(tasks) > 0
+        "tasks_count": tasks_count,
+        "has_tasks": tasks_count > 0,
+        "pending_count": status_counts.get("pending", 0),
+        "in_progress_count": status_counts.get("in_progress", 0),
+        "completed_count": status_counts.get("completed", 0),
     }
 
 
@@ -48,6 +70,7 @@ def format_task_date(created_at: str) -> str:
         return "—"
 
 
+@timed('callback')
 async def on_task_selected(
     callback: CallbackQuery,
     widget: Any,
@@ -59,6 +82,7 @@ async def on_task_selected(
     await dialog_manager.switch_to(TaskSG.detail)
 
 
+@timed('getter')
 async def get_task_detail_data(
     dialog_manager: DialogManager,
     **kwargs
@@ -68,8 +92,7 @@ async def get_task_detail_data(
     event = dialog_manager.event
     telegram_id = event.from_user.id
 
-    tasks = await api_client.get_tasks(telegram_id)
-    task = next((t for t in tasks if t['id'] == task_id), None)
+    task = await api_client.get_task(telegram_id, task_id)
 
     if task:
         categories = task.get('categories', [])
@@ -100,15 +123,18 @@ async def get_task_detail_data(
     return {"task": None}
 
 
+@timed('callback')
 async def on_refresh_tasks(
     callback: CallbackQuery,
     button: Button,
     dialog_manager: DialogManager
 ):
     """Refresh task list."""
+    api_client.invalidate_tasks(callback.from_user.id)
     await callback.answer("🔄 Список обновлен")
 
 
+@timed('callback')
 async def on_complete_task(
     callback: CallbackQuery,
     button: Button,
@@ -128,7 +154,8 @@ task_dialog = Dialog(
     Window(
         Const("📋 <b>Ваши задачи:</b>\n"),
         Format(
-            "Всего задач: {tasks_count}",
+            "Всего задач: {tasks_count}\n"
+            "⏳ {pending_count} | 🔄 {in_progress_count} | ✅ {completed_count}",
             when=F["has_tasks"]
         ),
         Const(
@@ -148,7 +175,7 @@ task_dialog = Dialog(
             ),
             id="tasks_scroll",
             width=1,
-            height=5,
+            height=TASKS_SCROLL_HEIGHT,
             when=F["has_tasks"]
         ),
         Row(
@@ -187,6 +214,7 @@ dialog_router.include_router(task_dialog)
 
 # ============== Add Task Dialog ==============
 
+@timed('callback')
 async def on_title_entered(
     message: Message,
     widget: ManagedTextInput,
@@ -198,6 +226,7 @@ async def on_title_entered(
     await dialog_manager.switch_to(AddTaskSG.description)
 
 
+@timed('callback')
 async def on_description_entered(
     message: Message,
     widget: ManagedTextInput,
@@ -209,6 +238,7 @@ async def on_description_entered(
     await dialog_manager.switch_to(AddTaskSG.due_date)
 
 
+@timed('callback')
 async def on_skip_description(
     callback: CallbackQuery,
     button: Button,
@@ -219,6 +249,7 @@ async def on_skip_description(
     await dialog_manager.switch_to(AddTaskSG.due_date)
 
 
+@timed('callback')
 async def on_due_date_entered(
     message: Message,
     widget: ManagedTextInput,
@@ -242,6 +273,7 @@ async def on_due_date_entered(
         )
 
 
+@timed('callback')
 async def on_skip_due_date(
     callback: CallbackQuery,
     button: Button,
@@ -252,6 +284,7 @@ async def on_skip_due_date(
     await dialog_manager.switch_to(AddTaskSG.confirm)
 
 
+@timed('getter')
 async def get_confirm_data(dialog_manager: DialogManager, **kwargs) -> dict:
     """Get data for confirmation window."""
     data = dialog_manager.dialog_data
@@ -272,6 +305,7 @@ async def get_confirm_data(dialog_manager: DialogManager, **kwargs) -> dict:
     }
 
 
+@timed('callback')
 async def on_confirm_task(
     callback: CallbackQuery,
     button: Button,
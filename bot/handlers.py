@@ -3,12 +3,14 @@ Command handlers for Telegram bot.
 """
 
 import logging
+from functools import partial
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command, CommandStart
 from aiogram_dialog import DialogManager, StartMode
 
 from api_client import api_client
+from known_users import known_users
 from states import TaskSG, AddTaskSG
 
 logger = logging.getLogger(__name__)
@@ -23,10 +25,24 @@ async def cmd_start(message: Message, dialog_manager: DialogManager):
     telegram_id = user.id
     username = user.username or f"user_{telegram_id}"
 
-    # Register user in backend
-    result = await api_client.register_user(telegram_id, username)
+    # Register user in backend unless it is already known to be there.
+    # The task list usually comes next: have it cached by then
+    registered = await known_users.contains(telegram_id)
+    if registered:
+        # If this fails the user may have been deleted in the backend:
+        # forget them so the next /start registers them again
+        api_client.prewarm_dashboard(
+            telegram_id, partial(known_users.discard, telegram_id)
+        )
+    else:
+        # Registration and the dashboard in one round trip
+        registered = await api_client.register_user_and_load(
+            telegram_id, username
+        ) is not None
+        if registered:
+            await known_users.add(telegram_id)
 
-    if result:
+    if registered:
         await message.answer(
             f"👋 Привет, <b>{user.first_name}</b>!\n\n"
             "Я - бот для управления задачами ToDo List.\n\n"
@@ -0,0 +1,133 @@
+"""
+Telegram ids already registered in the backend.
+
+/start registers the user on every call although the backend only looks
+the user up again after the first one. The bot remembers ids whose
+registration succeeded and skips the call for them. Ids are kept in a
+sorted array (8 bytes each) plus a small set of recent additions; with
+KNOWN_USERS_REDIS_URL they are also stored in a Redis set shared by all
+replicas and workers, which a replica consults on a local miss, so the
+knowledge survives restarts and is filled in lazily, id by id.
+
+A user deleted in the backend would stay "known"; /start therefore
+forgets a skipped user whose dashboard fails to load, and the next
+/start registers them again.
+"""
+
+import logging
+import os
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+KNOWN_USERS_REDIS_URL = os.environ.get('KNOWN_USERS_REDIS_URL', '')
+KNOWN_USERS_KEY = 'bot:known_users'
+
+
+class KnownUsers:
+    """
+    Registered telegram ids, in process and optionally in Redis.
+
+    Redis errors are logged and treated as "unknown": the caller then
+    simply registers the user again.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        key: str = KNOWN_USERS_KEY,
+        merge_every: int = 1024
+    ):
+        self.redis = redis
+        self.key = key
+        self.merge_every = merge_every
+        self._ids = array('q')
+        self._recent: set = set()
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._recent)
+
+    def _has_local(self, telegram_id: int) -> bool:
+        if telegram_id in self._recent:
+            return True
+        index = bisect_left(self._ids, telegram_id)
+        return index < len(self._ids) and self._ids[index] == telegram_id
+
+    def _add_local(self, telegram_id: int) -> None:
+        if self._has_local(telegram_id):
+            return
+        self._recent.add(telegram_id)
+        if len(self._recent) >= self.merge_every:
+            self._merge()
+
+    def _merge(self) -> None:
+        # One pass over the sorted array: copy the runs between the
+        # sorted recent ids instead of inserting them one by one
+        merged = array('q')
+        start = 0
+        for recent_id in sorted(self._recent):
+            end = bisect_left(self._ids, recent_id, start)
+            merged.extend(self._ids[start:end])
+            merged.append(recent_id)
+            start = end
+        merged.extend(self._ids[start:])
+        self._ids = merged
+        self._recent.clear()
+
+    def _discard_local(self, telegram_id: int) -> None:
+        self._recent.discard(telegram_id)
+        index = bisect_left(self._ids, telegram_id)
+        if index < len(self._ids) and self._ids[index] == telegram_id:
+            del self._ids[index]
+
+    async def contains(self, telegram_id: int) -> bool:
+        if self._has_local(telegram_id):
+            return True
+        if self.redis is None:
+            return False
+        try:
+            known = await self.redis.sismember(self.key, telegram_id)
+        except RedisError as e:
+            logger.warning(f"Known users lookup failed: {e}")
+            return False
+        if known:
+            self._add_local(telegram_id)
+        return bool(known)
+
+    async def add(self, telegram_id: int) -> None:
+        """Remember a successfully registered user."""
+        self._add_local(telegram_id)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.sadd(self.key, telegram_id)
+        except RedisError as e:
+            logger.warning(f"Known users update failed: {e}")
+
+    async def discard(self, telegram_id: int) -> None:
+        """Forget a user, e.g. one deleted in the backend."""
+        self._discard_local(telegram_id)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.srem(self.key, telegram_id)
+        except RedisError as e:
+            logger.warning(f"Known users update failed: {e}")
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+def build_known_users() -> KnownUsers:
+    if not KNOWN_USERS_REDIS_URL:
+        return KnownUsers()
+    return KnownUsers(Redis.from_url(KNOWN_USERS_REDIS_URL))
+
+
+known_users = build_known_users()
@@ -12,9 +12,28 @@ from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram_dialog import setup_dialogs
+from aiohttp import web
 
+from api_client import api_client
 from handlers import router
 from dialogs import dialog_router
+from known_users import known_users
+from metrics import (
+    METRICS_PORT, REGISTRY, Gauge, MetricsServer, TelegramTimer, UpdateTimer,
+    instrument_router
+)
+from ordering import UserOrderingMiddleware
+from sharding import (
+    SHARD_INDEX_ENV, SHARD_WORKERS, ShardRouter, build_front_app, poll_updates,
+    run_until_first
+)
+from storage import build_storage
+from throttling import OUTBOUND_GLOBAL_RATE, OutboundRateLimiter
+from webhook import (
+    WEBHOOK_HOST, WEBHOOK_PORT, check_settings, register_webhook, run_webhook
+)
+
+BOT_MODE = os.environ.get('BOT_MODE', 'polling')
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,31 +43,127 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Main function to start the bot."""
-    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    if not bot_token:
-        logger.error("TELEGRAM_BOT_TOKEN environment variable is not set")
-        sys.exit(1)
-
+def create_bot(token: str, global_rate: float = OUTBOUND_GLOBAL_RATE) -> Bot:
     bot = Bot(
-        token=bot_token,
+        token=token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    # Outermost, so reply latency includes waiting for a send slot
+    bot.session.middleware(TelegramTimer())
+    # Keep sends under Telegram's flood limits instead of hitting 429
+    bot.session.middleware(OutboundRateLimiter(global_rate=global_rate))
+    return bot
+
+
+def create_dispatcher(metrics_port: int = METRICS_PORT) -> Dispatcher:
+    dp = Dispatcher(storage=build_storage())
+
+    # Update clock first: the time includes waiting for the user's turn
+    dp.update.outer_middleware(UpdateTimer())
 
-    dp = Dispatcher()
+    # Per-user order and a global cap in front of all routers
+    ordering = UserOrderingMiddleware()
+    dp.update.outer_middleware(ordering)
+    dp['update_ordering'] = ordering
+    REGISTRY.register(Gauge(
+        'bot_updates_in_flight', 'Updates being handled',
+        lambda: ordering.metrics()['in_flight']
+    ))
+    REGISTRY.register(Gauge(
+        'bot_updates_pending', 'Updates of users queued or being handled',
+        lambda: ordering.metrics()['pending']
+    ))
 
     # Register routers
     dp.include_router(router)
     dp.include_router(dialog_router)
+    instrument_router(router)
+    instrument_router(dialog_router)
 
     # Setup dialogs
     setup_dialogs(dp)
 
-    logger.info("Starting bot...")
+    # One pooled backend session for the bot's lifetime
+    dp.startup.register(api_client.start)
+    dp.shutdown.register(api_client.close)
+    dp.shutdown.register(known_users.close)
+
+    if metrics_port:
+        metrics_server = MetricsServer(port=metrics_port)
+        dp.startup.register(metrics_server.start)
+        dp.shutdown.register(metrics_server.stop)
+    return dp
+
+
+def create_worker():
+    """Bot and Dispatcher of a shard worker process."""
+    # The global send limit is per bot, so workers split it
+    bot = create_bot(
+        os.environ['TELEGRAM_BOT_TOKEN'],
+        global_rate=OUTBOUND_GLOBAL_RATE / SHARD_WORKERS
+    )
+    # Each worker serves metrics on its own port after the front's one
+    metrics_port = METRICS_PORT and METRICS_PORT + 1 + int(
+        os.environ.get(SHARD_INDEX_ENV, '0')
+    )
+    return bot, create_dispatcher(metrics_port)
+
+
+async def run_sharded(bot_token: str):
+    """Front process routing updates to SHARD_WORKERS worker processes."""
+    if BOT_MODE == 'webhook':
+        check_settings()
+    shards = ShardRouter('main:create_worker')
+    shards.start()
+
+    async def serve():
+        if BOT_MODE == 'webhook':
+            bot = create_bot(bot_token)
+            try:
+                await register_webhook(bot, create_dispatcher(metrics_port=0))
+            finally:
+                await bot.session.close()
+            runner = web.AppRunner(build_front_app(shards))
+            await runner.setup()
+            await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await runner.cleanup()
+        else:
+            await poll_updates(shards, bot_token)
+
+    try:
+        # A dead worker stops the front: its shard would stall otherwise
+        await run_until_first(serve(), shards.supervise())
+    finally:
+        await shards.stop()
+
+
+async def main():
+    """Main function to start the bot."""
+    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not bot_token:
+        logger.error("TELEGRAM_BOT_TOKEN environment variable is not set")
+        sys.exit(1)
+
+    if SHARD_WORKERS > 1:
+        logger.info(
+            f"Starting bot in {BOT_MODE} mode with {SHARD_WORKERS} workers..."
+        )
+        await run_sharded(bot_token)
+        return
+
+    bot = create_bot(bot_token)
+    dp = create_dispatcher()
+
+    logger.info(f"Starting bot in {BOT_MODE} mode...")
 
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == 'webhook':
+            await run_webhook(dp, bot)
+        else:
+            await dp.start_polling(bot)
     finally:
         await bot.session.close()
 
@@ -0,0 +1,331 @@
+"""
+Latency histograms of the bot, exported in the Prometheus text format.
+
+- bot_update_reply_seconds: from receiving an update to the first
+  message sent or edited in reply - what the user waits for;
+- bot_update_seconds: whole update processing;
+- bot_handler_seconds: aiogram handlers (dialog handlers include
+  aiogram-dialog rendering), dialog getters and callbacks;
+- bot_api_request_seconds: backend calls by endpoint and status;
+- bot_telegram_request_seconds: Bot API calls by method and outcome.
+
+The numbers are served at http://METRICS_HOST:METRICS_PORT/metrics
+(METRICS_PORT=0 turns the server off; shard workers use the following
+ports, one per worker).
+"""
+
+import functools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import (
+    Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+)
+
+from aiogram import BaseMiddleware, Router
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware, NextRequestMiddlewareType
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+
+from throttling import is_limited
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9102'))
+METRICS_PATH = '/metrics'
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> per-bucket counts, then count and sum
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0, 0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def count(self, **labels: Any) -> int:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        series = self._series.get(key)
+        return series[-2] if series else 0
+
+    def collect(self) -> Iterator[str]:
+        for key, series in sorted(self._series.items()):
+            pairs = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(pairs + [('le', _format_number(bound))])
+                yield f'{self.name}_bucket{labels} {count}'
+            labels = _format_labels(pairs + [('le', '+Inf')])
+            yield f'{self.name}_bucket{labels} {series[-2]}'
+            yield f'{self.name}_count{_format_labels(pairs)} {series[-2]}'
+            yield f'{self.name}_sum{_format_labels(pairs)} {series[-1]}'
+
+
+class Gauge:
+    """Value read from a callback at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], float]
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def collect(self) -> Iterator[str]:
+        yield f'{self.name} {_format_number(self.function())}'
+
+
+class Registry:
+    """Named metrics; registering a name again replaces the metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            try:
+                lines.extend(metric.collect())
+            except Exception:
+                logger.exception(f"Failed to collect {metric.name}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+UPDATE_REPLY_SECONDS = REGISTRY.register(Histogram(
+    'bot_update_reply_seconds',
+    'From receiving an update to the first reply sent or edited',
+    ('update_type',),
+))
+UPDATE_SECONDS = REGISTRY.register(Histogram(
+    'bot_update_seconds',
+    'Processing of an update from receipt to the last handler',
+    ('update_type',),
+))
+HANDLER_SECONDS = REGISTRY.register(Histogram(
+    'bot_handler_seconds',
+    'Handlers, dialog getters and dialog callbacks',
+    ('kind', 'name'),
+))
+API_SECONDS = REGISTRY.register(Histogram(
+    'bot_api_request_seconds',
+    'Backend API requests by endpoint and response status',
+    ('method', 'endpoint', 'status'),
+))
+TELEGRAM_SECONDS = REGISTRY.register(Histogram(
+    'bot_telegram_request_seconds',
+    'Telegram Bot API requests by method and outcome',
+    ('method', 'status'),
+))
+
+# Receipt time and whether a reply was sent, per update being handled
+_update_clock: ContextVar[Optional[list]] = ContextVar(
+    '_update_clock', default=None
+)
+
+
+def timed(kind: str) -> Callable:
+    """Record an async function's duration in bot_handler_seconds."""
+    def decorator(function: Callable[..., Awaitable[Any]]) -> Callable:
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                HANDLER_SECONDS.observe(
+                    time.perf_counter() - started,
+                    kind=kind, name=function.__name__
+                )
+        return wrapper
+    return decorator
+
+
+class HandlerTimer(BaseMiddleware):
+    """Inner middleware timing the handler chosen for an event."""
+
+    def __init__(self, router: Router):
+        self.router = router
+
+    def handler_name(self, callback: Callable) -> str:
+        # Dialogs handle their events in methods of the Dialog router
+        if hasattr(callback, '__self__'):
+            return f'{self.router.name}.{callback.__name__.lstrip("_")}'
+        return callback.__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_SECONDS.observe(
+                time.perf_counter() - started,
+                kind='handler',
+                name=self.handler_name(data['handler'].callback)
+            )
+
+
+def instrument_router(router: Router) -> None:
+    """Time message and callback handlers of a router and its children."""
+    for child in router.chain_tail:
+        if any(isinstance(m, HandlerTimer) for m in child.message.middleware):
+            continue
+        timer = HandlerTimer(child)
+        child.message.middleware(timer)
+        child.callback_query.middleware(timer)
+
+
+class UpdateTimer(BaseMiddleware):
+    """Outer update middleware starting the update's clock."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        update_type = event.event_type
+        token = _update_clock.set([started, update_type, False])
+        try:
+            return await handler(event, data)
+        finally:
+            _update_clock.reset(token)
+            UPDATE_SECONDS.observe(
+                time.perf_counter() - started, update_type=update_type
+            )
+
+
+class TelegramTimer(BaseRequestMiddleware):
+    """
+    Bot session middleware timing Bot API calls; the first message sent
+    or edited while handling an update ends its update-to-reply time.
+    Register it before other session middlewares so the time includes
+    their queueing.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = await make_request(bot, method)
+            status = 'ok'
+            return response
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            finished = time.perf_counter()
+            TELEGRAM_SECONDS.observe(
+                finished - started,
+                method=method.__api_method__, status=status
+            )
+            clock = _update_clock.get()
+            if (clock is not None and not clock[2]
+                    and status == 'ok' and is_limited(method)):
+                clock[2] = True
+                UPDATE_REPLY_SECONDS.observe(
+                    finished - clock[0], update_type=clock[1]
+                )
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    return web.Response(
+        body=REGISTRY.render().encode(),
+        headers={'Content-Type': CONTENT_TYPE}
+    )
+
+
+class MetricsServer:
+    """Small aiohttp server for /metrics, started with the Dispatcher."""
+
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get(METRICS_PATH, metrics_view)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics at http://{self.host}:{self.port}{METRICS_PATH}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,130 @@
+"""
+Per-user ordering and a global concurrency cap for incoming updates.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+from resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+UPDATE_MAX_IN_FLIGHT = int(os.environ.get('UPDATE_MAX_IN_FLIGHT', '100'))
+UPDATE_MAX_QUEUE_PER_USER = int(
+    os.environ.get('UPDATE_MAX_QUEUE_PER_USER', '5')
+)
+WAIT_METRIC = 'update'
+
+
+class UserOrderingMiddleware(BaseMiddleware):
+    """
+    Outer update middleware in front of all routers.
+
+    Updates of one user are handled one at a time, in arrival order, so
+    double taps and overlapping dialogs cannot race. At most
+    `max_in_flight` handlers run at once across users; a user's queued
+    updates wait for their turn without taking a global slot. Updates
+    are shed when the user already has `max_queue_per_user` pending, and
+    a callback query identical to one still pending (same message and
+    data) is collapsed into it. Dropped callbacks are answered so the
+    button stops spinning. metrics() reports queue depths, wait times
+    and counters.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = UPDATE_MAX_IN_FLIGHT,
+        max_queue_per_user: int = UPDATE_MAX_QUEUE_PER_USER
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_per_user = max_queue_per_user
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.stats: Counter = Counter()
+        self.waits = LatencyTracker(window=1000, min_samples=1)
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._depth: Counter = Counter()
+        self._pending_callbacks: set = set()
+        self._running = 0
+
+    @staticmethod
+    def callback_key(user_id: int, callback: CallbackQuery) -> tuple:
+        message = callback.message
+        target = message.message_id if message else callback.inline_message_id
+        return user_id, target, callback.data
+
+    async def _dismiss(self, callback: CallbackQuery) -> None:
+        try:
+            await callback.answer()
+        except Exception as e:
+            logger.debug(f"Could not answer dropped callback: {e}")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            return await self._handle(handler, event, data, time.monotonic())
+
+        callback = getattr(event, 'callback_query', None)
+        pending: Optional[tuple] = None
+        if callback is not None:
+            pending = self.callback_key(user.id, callback)
+            if pending in self._pending_callbacks:
+                self.stats['collapsed'] += 1
+                await self._dismiss(callback)
+                return None
+        if self._depth[user.id] >= self.max_queue_per_user:
+            self.stats['shed'] += 1
+            logger.warning(f"Shedding update {event.update_id} of {user.id}")
+            if callback is not None:
+                await self._dismiss(callback)
+            return None
+
+        if pending is not None:
+            self._pending_callbacks.add(pending)
+        self._depth[user.id] += 1
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        queued_at = time.monotonic()
+        try:
+            async with lock:
+                return await self._handle(handler, event, data, queued_at)
+        finally:
+            self._depth[user.id] -= 1
+            if not self._depth[user.id]:
+                del self._depth[user.id]
+                del self._locks[user.id]
+            if pending is not None:
+                self._pending_callbacks.discard(pending)
+
+    async def _handle(self, handler, event, data, queued_at: float) -> Any:
+        async with self.semaphore:
+            self.waits.record(WAIT_METRIC, time.monotonic() - queued_at)
+            self.stats['handled'] += 1
+            self._running += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self._running -= 1
+
+    def metrics(self) -> dict:
+        """Queue depths, wait percentiles (seconds) and counters."""
+        return {
+            'in_flight': self._running,
+            # Users' updates queued or running
+            'pending': sum(self._depth.values()),
+            'users_pending': len(self._depth),
+            'max_user_depth': max(self._depth.values(), default=0),
+            'wait_p50': self.waits.percentile(WAIT_METRIC, 0.5),
+            'wait_p95': self.waits.percentile(WAIT_METRIC, 0.95),
+            **self.stats,
+        }
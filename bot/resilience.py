@@ -0,0 +1,120 @@
+"""
+Tail-latency controls for backend calls: backoff, latency tracking and
+a circuit breaker.
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    cap: float,
+    rng: Callable[[float, float], float] = random.uniform
+) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1+)."""
+    return rng(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies per endpoint."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = self._samples[endpoint] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, endpoint: str, fraction: float) -> Optional[float]:
+        """Latency percentile, or None until enough samples are seen."""
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def snapshot(self, fraction: float = 0.95) -> dict:
+        return {
+            endpoint: self.percentile(endpoint, fraction)
+            for endpoint in self._samples
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the backend is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are refused for `reset_timeout` seconds. Then it is half-open:
+    one trial call is let through, and its outcome closes the circuit
+    or opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give up a trial call that ended without an outcome."""
+        self._trial = False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("Backend recovered, circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial or (
+            self.opened_at is None and self.failures >= self.failure_threshold
+        ):
+            logger.warning(
+                f"Backend unhealthy after {self.failures} failures, "
+                f"circuit open for {self.reset_timeout}s"
+            )
+            self.opened_at = self.clock()
+            self._trial = False
@@ -0,0 +1,366 @@
+"""
+Chat-sharded bot: a front process receiving updates and N workers.
+
+The front process only fetches updates (long polling or webhook) and
+routes each raw update to worker `chat_id % N` over a bounded queue, so
+one chat always lands on the same worker and keeps its order. Workers
+own a Bot and Dispatcher each and parse and handle updates - the
+CPU-bound part - concurrently; the dispatcher's UserOrderingMiddleware
+keeps each user's updates in order. When a worker falls behind its
+queue fills up: polling pauses and the webhook answers 429 so Telegram
+redelivers later. A worker that dies stops the front process instead
+of stalling its shard.
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+from webhook import (
+    HEALTH_PATH, WEBHOOK_PATH, WEBHOOK_SECRET, health, require_secret
+)
+
+logger = logging.getLogger(__name__)
+
+SHARD_WORKERS = int(os.environ.get('SHARD_WORKERS', '1'))
+SHARD_QUEUE_SIZE = int(os.environ.get('SHARD_QUEUE_SIZE', '1000'))
+SHARD_WORKER_CONCURRENCY = int(
+    os.environ.get('SHARD_WORKER_CONCURRENCY', '50')
+)
+SHARD_ENQUEUE_TIMEOUT_SECONDS = float(
+    os.environ.get('SHARD_ENQUEUE_TIMEOUT_SECONDS', '5')
+)
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
+POLLING_TIMEOUT_SECONDS = 30
+# Set in a worker process to its index
+SHARD_INDEX_ENV = 'SHARD_INDEX'
+
+# Update fields whose object carries the chat (or the user, for inline)
+CHAT_SOURCES = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post',
+    'business_message', 'edited_business_message',
+)
+USER_SOURCES = (
+    'inline_query', 'chosen_inline_result', 'shipping_query',
+    'pre_checkout_query', 'poll_answer', 'my_chat_member', 'chat_member',
+    'chat_join_request',
+)
+
+
+def chat_key(update: Dict[str, Any]) -> int:
+    """Chat id of a raw update; user id or update id when there is none."""
+    for field in CHAT_SOURCES:
+        if field in update:
+            return update[field]['chat']['id']
+    callback = update.get('callback_query')
+    if callback is not None:
+        message = callback.get('message')
+        if message is not None:
+            return message['chat']['id']
+        return callback['from']['id']
+    for field in USER_SOURCES:
+        if field in update:
+            event = update[field]
+            if 'chat' in event:
+                return event['chat']['id']
+            sender = event.get('from') or event.get('user') or {}
+            if 'id' in sender:
+                return sender['id']
+    return update.get('update_id', 0)
+
+
+def load_factory(path: str) -> Callable:
+    """`module:function` to the function."""
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+class UpdateFeeder:
+    """
+    Feeds updates to the dispatcher concurrently, at most `limit` at once.
+
+    submit() waits while `limit` updates are in flight, which stops the
+    worker from reading its queue and pushes back on the front process.
+    Per-user order, shedding of floods and collapsing of repeated
+    callbacks are left to the dispatcher's UserOrderingMiddleware: it
+    sees every update of the chat, and a flooding user holds at most
+    UPDATE_MAX_QUEUE_PER_USER slots while other chats keep running.
+    """
+
+    def __init__(self, limit: int = SHARD_WORKER_CONCURRENCY):
+        self.semaphore = asyncio.Semaphore(limit)
+        self._tasks: set = set()
+
+    async def submit(
+        self,
+        handler: Callable[..., Awaitable[Any]],
+        *args: Any
+    ) -> None:
+        await self.semaphore.acquire()
+        task = asyncio.ensure_future(self._run(handler, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, handler, args) -> None:
+        try:
+            await handler(*args)
+        except Exception:
+            logger.exception("Update handler failed")
+        finally:
+            self.semaphore.release()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def drain(self) -> None:
+        """Wait for all submitted updates."""
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+
+async def run_worker(
+    updates,
+    bot,
+    dispatcher,
+    concurrency: int = SHARD_WORKER_CONCURRENCY,
+    processed=None
+) -> None:
+    """
+    Feed updates from a queue to the dispatcher until a None sentinel.
+
+    `processed`, if given, is a shared counter of handled updates.
+    """
+    loop = asyncio.get_running_loop()
+    feeder = UpdateFeeder(concurrency)
+
+    async def handle(update):
+        await dispatcher.feed_raw_update(bot, update)
+        if processed is not None:
+            with processed.get_lock():
+                processed.value += 1
+
+    await dispatcher.emit_startup(bot=bot, dispatcher=dispatcher)
+    try:
+        while True:
+            update = await loop.run_in_executor(None, updates.get)
+            if update is None:
+                break
+            await feeder.submit(handle, update)
+        await feeder.drain()
+    finally:
+        await dispatcher.emit_shutdown(bot=bot, dispatcher=dispatcher)
+        await bot.session.close()
+
+
+def worker_main(
+    index: int,
+    updates,
+    factory: str,
+    factory_kwargs: Dict[str, Any],
+    concurrency: int,
+    processed=None
+) -> None:
+    """Worker process entry point; `factory` returns (bot, dispatcher)."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker {index} - %(name)s - '
+               f'%(levelname)s - %(message)s'
+    )
+    os.environ[SHARD_INDEX_ENV] = str(index)
+    bot, dispatcher = load_factory(factory)(**factory_kwargs)
+    asyncio.run(run_worker(updates, bot, dispatcher, concurrency, processed))
+
+
+class ShardRouter:
+    """
+    Front-side end of the worker processes and their bounded queues.
+
+    Routing to a shard whose worker died raises RuntimeError, and
+    supervise() raises as soon as any worker dies, so the front process
+    exits and is restarted with all its workers. `stats` counts routed updates per shard and how often routing had
+    to wait for (`throttled`) or gave up on (`rejected`) a full queue.
+    """
+
+    def __init__(
+        self,
+        factory: str,
+        workers: int = SHARD_WORKERS,
+        queue_size: int = SHARD_QUEUE_SIZE,
+        concurrency: int = SHARD_WORKER_CONCURRENCY,
+        factory_kwargs: Optional[Dict[str, Any]] = None,
+        processed=None
+    ):
+        self.context = multiprocessing.get_context('spawn')
+        self.queues = [self.context.Queue(queue_size) for _ in range(workers)]
+        self.processes = [
+            self.context.Process(
+                target=worker_main,
+                args=(
+                    index, updates, factory, factory_kwargs or {},
+                    concurrency, processed
+                ),
+                name=f'bot-worker-{index}',
+                daemon=True,
+            )
+            for index, updates in enumerate(self.queues)
+        ]
+        self.stats: Counter = Counter()
+
+    def start(self) -> None:
+        for process in self.processes:
+            process.start()
+        logger.info(f"Started {len(self.processes)} bot workers")
+
+    def check_workers(self) -> None:
+        """Raise RuntimeError if a started worker is not running."""
+        for index, process in enumerate(self.processes):
+            if process.exitcode is not None:
+                raise RuntimeError(
+                    f"Bot worker {index} exited with code {process.exitcode}"
+                )
+
+    async def supervise(self, interval: float = 1.0) -> None:
+        """Check the workers every `interval` seconds until one dies."""
+        while True:
+            self.check_workers()
+            await asyncio.sleep(interval)
+
+    def shard(self, update: Dict[str, Any]) -> int:
+        return chat_key(update) % len(self.queues)
+
+    async def route(
+        self,
+        update: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Queue an update for its worker, waiting while the queue is full.
+
+        Returns False if it is still full after `timeout` seconds;
+        raises RuntimeError if a worker died.
+        """
+        self.check_workers()
+        shard = self.shard(update)
+        updates = self.queues[shard]
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        delay = 0.001
+        while True:
+            try:
+                updates.put_nowait(update)
+            except queue.Full:
+                if deadline is not None and loop.time() >= deadline:
+                    self.stats['rejected'] += 1
+                    return False
+                self.stats['throttled'] += 1
+                self.check_workers()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+                continue
+            self.stats[f'shard_{shard}'] += 1
+            return True
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Let workers finish queued updates, then stop them."""
+        loop = asyncio.get_running_loop()
+        for updates, process in zip(self.queues, self.processes):
+            if not process.is_alive():
+                continue
+            try:
+                await loop.run_in_executor(
+                    None, updates.put, None, True, timeout
+                )
+            except queue.Full:
+                logger.warning(f"{process.name} is stuck, terminating it")
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+async def run_until_first(*coroutines: Awaitable[Any]) -> None:
+    """Run coroutines until one returns or raises, then cancel the rest."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        done, _ = await asyncio.wait(
+            tasks, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def poll_updates(
+    router: ShardRouter,
+    token: str,
+    api_url: str = TELEGRAM_API_URL,
+    timeout: int = POLLING_TIMEOUT_SECONDS
+) -> None:
+    """Long polling that hands raw updates to the workers."""
+    offset = None
+    url = f"{api_url}/bot{token}/getUpdates"
+    async with aiohttp.ClientSession() as session:
+        while True:
+            params = {'timeout': timeout}
+            if offset is not None:
+                params['offset'] = offset
+            try:
+                async with session.get(
+                    url,
+                    params=params,
+                    timeout=aiohttp.ClientTimeout(total=timeout + 10)
+                ) as response:
+                    payload = await response.json(loads=json.loads)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not payload.get('ok'):
+                logger.error(f"getUpdates error: {payload}")
+                await asyncio.sleep(1)
+                continue
+            for update in payload['result']:
+                # Waits while the worker is behind: polling slows down
+                await router.route(update)
+                offset = update['update_id'] + 1
+
+
+def build_front_app(
+    router: ShardRouter,
+    path: str = WEBHOOK_PATH,
+    secret_token: str = WEBHOOK_SECRET,
+    enqueue_timeout: float = SHARD_ENQUEUE_TIMEOUT_SECONDS
+) -> web.Application:
+    """Webhook app that hands raw updates to the workers."""
+    secret_token = require_secret(secret_token)
+
+    async def receive(request: web.Request) -> web.Response:
+        if not secrets.compare_digest(
+            request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''),
+            secret_token
+        ):
+            return web.Response(body='Unauthorized', status=401)
+        update = await request.json()
+        if await router.route(update, timeout=enqueue_timeout):
+            return web.json_response({})
+        # Telegram redelivers the update later
+        return web.Response(status=429)
+
+    app = web.Application()
+    app.router.add_post(path, receive)
+    app.router.add_get(HEALTH_PATH, health)
+    return app
@@ -0,0 +1,172 @@
+"""
+FSM and dialog state storage.
+
+By default state lives in process memory (BOT_STORAGE=memory). With
+BOT_STORAGE=redis, FSM and aiogram-dialog state is kept in Redis so any
+bot replica can continue a dialog and restarts lose nothing. Values are
+stored as compact JSON (large payloads zlib-compressed) and expire after
+FSM_STATE_TTL_SECONDS / FSM_DATA_TTL_SECONDS, so abandoned dialogs do
+not pile up. FSM_WRITE_BACK=1 adds a local buffer that serves reads from
+memory and batches writes to Redis; use it only when every chat is
+always handled by the same process.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+)
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+
+logger = logging.getLogger(__name__)
+
+BOT_STORAGE = os.environ.get('BOT_STORAGE', 'memory')
+FSM_REDIS_URL = os.environ.get('FSM_REDIS_URL', 'redis://redis:6379/2')
+FSM_STATE_TTL_SECONDS = int(os.environ.get('FSM_STATE_TTL_SECONDS', '86400'))
+FSM_DATA_TTL_SECONDS = int(os.environ.get('FSM_DATA_TTL_SECONDS', '86400'))
+FSM_COMPRESS_MIN_BYTES = int(os.environ.get('FSM_COMPRESS_MIN_BYTES', '1024'))
+FSM_WRITE_BACK = os.environ.get('FSM_WRITE_BACK', '0') == '1'
+FSM_FLUSH_SECONDS = float(os.environ.get('FSM_FLUSH_SECONDS', '1'))
+
+# JSON always starts with "{", so the marker cannot clash with it
+COMPRESSED_PREFIX = 'z:'
+
+
+def compact_dumps(data: Dict[str, Any]) -> str:
+    """
+    Serialize state data: JSON without spaces or \\u escapes (Cyrillic
+    takes 2 bytes instead of 6), zlib + base85 above the size threshold.
+    """
+    value = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    encoded = value.encode()
+    if len(encoded) < FSM_COMPRESS_MIN_BYTES:
+        return value
+    packed = COMPRESSED_PREFIX + base64.b85encode(
+        zlib.compress(encoded, 6)
+    ).decode('ascii')
+    return packed if len(packed) < len(encoded) else value
+
+
+def compact_loads(value: str) -> Dict[str, Any]:
+    if value.startswith(COMPRESSED_PREFIX):
+        value = zlib.decompress(
+            base64.b85decode(value[len(COMPRESSED_PREFIX):])
+        ).decode()
+    return json.loads(value)
+
+
+class WriteBackStorage(BaseStorage):
+    """
+    Local buffer in front of another storage.
+
+    Reads are served from memory after the first one; writes are kept
+    locally and flushed to the wrapped storage every `flush_interval`
+    seconds and on close. Beyond `max_keys` clean entries are dropped
+    after a flush.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        flush_interval: float = FSM_FLUSH_SECONDS,
+        max_keys: int = 10000
+    ):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self._states: Dict[StorageKey, Optional[str]] = {}
+        self._data: Dict[StorageKey, Dict[str, Any]] = {}
+        self._dirty_states: set = set()
+        self._dirty_data: set = set()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _schedule_flush(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                return
+            except Exception:
+                logger.exception("FSM write-back flush failed, retrying")
+
+    async def flush(self) -> None:
+        """
+        Write buffered changes to the wrapped storage.
+
+        A key stays dirty until its write succeeds, and also when it
+        was changed again while being written.
+        """
+        for key in list(self._dirty_states):
+            state = self._states[key]
+            await self.storage.set_state(key, state)
+            if self._states[key] == state:
+                self._dirty_states.discard(key)
+        for key in list(self._dirty_data):
+            data = self._data[key]
+            await self.storage.set_data(key, data)
+            if self._data[key] is data:
+                self._dirty_data.discard(key)
+
+        if len(self._states) + len(self._data) > self.max_keys:
+            for key in set(self._states) - self._dirty_states:
+                del self._states[key]
+            for key in set(self._data) - self._dirty_data:
+                del self._data[key]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._states[key] = state.state if isinstance(state, State) else state
+        self._dirty_states.add(key)
+        self._schedule_flush()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        if key not in self._states:
+            self._states[key] = await self.storage.get_state(key)
+        return self._states[key]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self._data[key] = data.copy()
+        self._dirty_data.add(key)
+        self._schedule_flush()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        if key not in self._data:
+            self._data[key] = await self.storage.get_data(key)
+        return self._data[key].copy()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await self.flush()
+        await self.storage.close()
+
+
+def build_storage() -> BaseStorage:
+    """FSM storage selected by BOT_STORAGE."""
+    if BOT_STORAGE != 'redis':
+        return MemoryStorage()
+
+    storage = RedisStorage.from_url(
+        FSM_REDIS_URL,
+        # aiogram-dialog keeps several stacks per chat, keyed by destiny
+        key_builder=DefaultKeyBuilder(with_destiny=True),
+        state_ttl=FSM_STATE_TTL_SECONDS,
+        data_ttl=FSM_DATA_TTL_SECONDS,
+        json_dumps=compact_dumps,
+        json_loads=compact_loads,
+    )
+    logger.info(f"FSM state is stored in Redis at {FSM_REDIS_URL}")
+    if FSM_WRITE_BACK:
+        return WriteBackStorage(storage)
+    return storage
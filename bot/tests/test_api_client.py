@@ -2,20 +2,58 @@
 Tests for API client module.
 """
 
+import asyncio
+import aiohttp
 import pytest
 import re
-from aioresponses import aioresponses
+from unittest.mock import AsyncMock
+from aioresponses import CallbackResult, aioresponses
+from yarl import URL
 
-from api_client import APIClient, api_client
+from api_client import (
+    APIClient, TaskCache, api_client, endpoint_route, request_timeout
+)
+from resilience import CircuitBreaker
 
 
 class TestAPIClient:
     """Tests for APIClient class."""
 
     @pytest.fixture
-    def client(self):
+    async def client(self):
         """Create API client instance."""
-        return APIClient()
+        client = APIClient()
+        yield client
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_session_is_shared(self, client, sample_user_response):
+        """Test requests reuse one pooled session."""
+        await client.start()
+        session = client.session
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/users/by_telegram/.*')
+            m.get(pattern, payload=sample_user_response, repeat=True)
+            m.delete(f'{client.base_url}/tasks/1/', status=204)
+
+            await client.get_user_by_telegram(123456789)
+            await client.get_user_by_telegram(123456789)
+            await client.delete_task('1')
+
+        assert client.session is session
+        assert session.connector.limit_per_host > 0
+        assert session.connector.use_dns_cache
+
+    @pytest.mark.asyncio
+    async def test_session_reopens_after_close(self, client):
+        """Test a closed client opens a new session on the next call."""
+        session = client.session
+        await client.close()
+        await client.close()
+
+        assert session.closed
+        assert client.session is not session
+        assert not client.session.closed
 
     @pytest.mark.asyncio
     async def test_register_user_success(
@@ -86,6 +124,69 @@ class TestAPIClient:
             assert len(result) == 2
             assert result[0]['title'] == 'Test Task 1'
 
+    @pytest.mark.asyncio
+    async def test_get_upcoming(self, client, sample_tasks_response):
+        """Test getting tasks due in a window."""
+        with aioresponses() as m:
+            pattern = re.compile(
+                r'.*/tasks/upcoming/\?telegram_id=123456789&window=tomorrow$'
+            )
+            m.get(pattern, payload=sample_tasks_response)
+
+            result = await client.get_upcoming(123456789, 'tomorrow')
+
+            assert len(result) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_overdue_failure(self, client):
+        """Test overdue tasks fall back to an empty list on errors."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/tasks/overdue/.*')
+            m.get(pattern, status=500)
+
+            result = await client.get_overdue(123456789)
+
+            assert result == []
+
+    @pytest.mark.asyncio
+    async def test_get_dashboard(self, client, sample_tasks_response):
+        """Test getting the task list dashboard."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/tasks/dashboard/\?telegram_id=123456789$')
+            m.get(pattern, payload={
+                'tasks': sample_tasks_response, 'tasks_count': 2
+            })
+
+            result = await client.get_dashboard(123456789)
+
+            assert result['tasks_count'] == 2
+
+    @pytest.mark.asyncio
+    async def test_get_changes(self, client):
+        """Test getting changes after a cursor."""
+        with aioresponses() as m:
+            pattern = re.compile(
+                r'.*/tasks/changes/\?limit=50&since=01ABC&telegram_id=123456789$'
+            )
+            m.get(pattern, payload={
+                'changes': [], 'cursor': '01ABD', 'has_more': False
+            })
+
+            result = await client.get_changes(123456789, '01ABC', limit=50)
+
+            assert result['cursor'] == '01ABD'
+
+    @pytest.mark.asyncio
+    async def test_get_changes_expired(self, client):
+        """Test an expired cursor returns None."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/tasks/changes/.*')
+            m.get(pattern, status=410)
+
+            result = await client.get_changes(123456789, '01ABC')
+
+            assert result is None
+
     @pytest.mark.asyncio
     async def test_get_tasks_empty(self, client):
         """Test getting empty tasks list."""
@@ -314,6 +415,70 @@ class TestAPIClient:
 
             assert result is None
 
+    @pytest.mark.asyncio
+    async def test_batch(self, client, sample_user_response, sample_tasks_response):
+        """Test batch maps sub-responses to results in order."""
+        with aioresponses() as m:
+            m.post(f'{client.base_url}/batch/', payload={
+                'results': [
+                    {'status': 200, 'body': sample_user_response},
+                    {'status': 200, 'body': sample_tasks_response},
+                    {'status': 204, 'body': None},
+                    {'status': 404, 'body': {'detail': 'Not found.'}},
+                ],
+                'committed': True,
+            })
+
+            results = await client.batch([
+                {
+                    'method': 'POST', 'path': 'users/register_telegram/',
+                    'body': {'telegram_id': 123456789}
+                },
+                {'path': 'tasks/by_telegram/', 'params': {'telegram_id': 1}},
+                {'method': 'DELETE', 'path': 'tasks/task123/'},
+                {'path': 'users/by_telegram/', 'params': {'telegram_id': 2}},
+            ])
+
+            assert results == [
+                sample_user_response, sample_tasks_response, True, None
+            ]
+            request = list(m.requests.values())[0][0]
+            sent = request.kwargs['json']['requests']
+            assert sent[1] == {
+                'method': 'GET',
+                'path': 'tasks/by_telegram/?telegram_id=1',
+                'body': None,
+            }
+            assert request.kwargs['json']['atomic'] is False
+
+    @pytest.mark.asyncio
+    async def test_batch_rolled_back(self, client):
+        """Test a rolled back atomic batch yields no results."""
+        with aioresponses() as m:
+            m.post(f'{client.base_url}/batch/', payload={
+                'results': [
+                    {'status': 201, 'body': {'id': 'task1'}},
+                    {'status': 400, 'body': {'title': ['required']}},
+                ],
+                'committed': False,
+            })
+
+            results = await client.batch(
+                [{'method': 'POST', 'path': 'tasks/'}] * 3, atomic=True
+            )
+
+            assert results == [None, None, None]
+
+    @pytest.mark.asyncio
+    async def test_batch_failure(self, client):
+        """Test batch endpoint failure yields None for every request."""
+        with aioresponses() as m:
+            m.post(f'{client.base_url}/batch/', status=500)
+
+            results = await client.batch([{'path': 'health/'}] * 2)
+
+            assert results == [None, None]
+
 
 class TestAPIClientSingleton:
     """Test for api_client singleton instance."""
@@ -322,3 +487,577 @@ class TestAPIClientSingleton:
         """Test that api_client instance is created."""
         assert api_client is not None
         assert isinstance(api_client, APIClient)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTaskCache:
+    """Tests for the per-user task cache."""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    async def client(self, clock):
+        client = APIClient(TaskCache(ttl=60, max_users=2, clock=clock))
+        yield client
+        await client.close()
+
+    @pytest.fixture
+    def tasks_url(self):
+        return re.compile(r'.*/tasks/by_telegram/\?telegram_id=(1|2|3)$')
+
+    @pytest.mark.asyncio
+    async def test_tasks_cached_until_ttl(
+        self, client, clock, tasks_url, sample_tasks_response
+    ):
+        """Test the task list is fetched once per TTL."""
+        with aioresponses() as m:
+            m.get(tasks_url, payload=sample_tasks_response, repeat=True)
+
+            await client.get_tasks(1)
+            cached = await client.get_tasks(1)
+            task = await client.get_task(1, sample_tasks_response[1]['id'])
+            assert sum(map(len, m.requests.values())) == 1
+
+            clock.now = 61
+            await client.get_tasks(1)
+            assert sum(map(len, m.requests.values())) == 2
+
+        assert cached == sample_tasks_response
+        assert task['title'] == 'Test Task 2'
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_not_cached(self, client, tasks_url):
+        """Test errors are not cached."""
+        with aioresponses() as m:
+            m.get(tasks_url, status=500)
+            assert await client.get_tasks(1) == []
+        assert client.cache.get_tasks(1) is None
+
+    @pytest.mark.asyncio
+    async def test_size_bound(self, client, sample_tasks_response):
+        """Test the least recently used user is evicted."""
+        for telegram_id in (1, 2, 3):
+            client.cache.set_tasks(telegram_id, sample_tasks_response)
+        assert client.cache.get_tasks(1) is None
+        assert client.cache.get_tasks(3) == sample_tasks_response
+        assert client.cache.get_task(1, sample_tasks_response[0]['id']) is None
+
+    @pytest.mark.asyncio
+    async def test_get_task_miss_fetches_list(
+        self, client, tasks_url, sample_tasks_response
+    ):
+        """Test an unknown task triggers one list fetch."""
+        with aioresponses() as m:
+            m.get(tasks_url, payload=sample_tasks_response)
+            task = await client.get_task(1, sample_tasks_response[0]['id'])
+            missing = await client.get_task(1, 'missing')
+        assert task['title'] == 'Test Task 1'
+        assert missing is None
+
+    @pytest.mark.asyncio
+    async def test_writes_patch_cache(self, client, sample_tasks_response):
+        """Test create, status update and delete patch the cached list."""
+        client.cache.set_tasks(123456789, sample_tasks_response)
+        client.cache.set_dashboard(123456789, {'tasks': []})
+        task_id = sample_tasks_response[0]['id']
+        created = {'id': '01HXYZ123456789ABCDEFGH03', 'title': 'New'}
+
+        with aioresponses() as m:
+            m.post(
+                f'{client.base_url}/tasks/create_for_telegram/',
+                payload=created, status=201
+            )
+            m.patch(
+                f'{client.base_url}/tasks/{task_id}/',
+                payload={**sample_tasks_response[0], 'status': 'completed'}
+            )
+            m.delete(
+                f'{client.base_url}/tasks/{sample_tasks_response[1]["id"]}/',
+                status=204
+            )
+
+            await client.create_task(123456789, 'New')
+            await client.update_task_status(task_id, 'completed')
+            await client.delete_task(sample_tasks_response[1]['id'])
+
+        tasks = await client.get_tasks(123456789)
+        assert [t['id'] for t in tasks] == [created['id'], task_id]
+        assert tasks[1]['status'] == 'completed'
+        assert client.cache.get_dashboard(123456789) is None
+
+    @pytest.mark.asyncio
+    async def test_dashboard_cached_and_indexed(
+        self, client, sample_tasks_response
+    ):
+        """Test the dashboard is cached and its tasks are indexed."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/tasks/dashboard/.*')
+            m.get(pattern, payload={'tasks': sample_tasks_response})
+
+            await client.get_dashboard(1)
+            dashboard = await client.get_dashboard(1)
+            task = await client.get_task(1, sample_tasks_response[0]['id'])
+
+        assert dashboard['tasks'] == sample_tasks_response
+        assert task['title'] == 'Test Task 1'
+        # A dashboard page is not the complete list
+        assert client.cache.get_tasks(1) is None
+
+    @pytest.mark.asyncio
+    async def test_prewarm_dashboard(self, client, sample_tasks_response):
+        """Test the dashboard is cached in the background."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/tasks/dashboard/.*')
+            m.get(pattern, payload={'tasks': sample_tasks_response})
+
+            await client.prewarm_dashboard(1)
+
+        assert client.cache.get_dashboard(1)['tasks'] == sample_tasks_response
+        assert client._background == set()
+
+    @pytest.mark.asyncio
+    async def test_prewarm_failure_callback(self, client):
+        """Test on_failure runs only when the dashboard cannot be loaded."""
+        on_failure = AsyncMock()
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/tasks/dashboard/.*')
+            m.get(pattern, status=404)
+            m.get(pattern, payload={'tasks': []})
+
+            await client.prewarm_dashboard(1, on_failure)
+            on_failure.assert_awaited_once_with()
+            await client.prewarm_dashboard(1, on_failure)
+
+        on_failure.assert_awaited_once_with()
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_prewarm(self, client):
+        """Test close() does not leave background loads behind."""
+        with aioresponses() as m:
+            m.get(re.compile(r'.*/tasks/dashboard/.*'), exception=AssertionError)
+            task = client.prewarm_dashboard(1)
+            await client.close()
+
+        assert task.done()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_and_batch_writes(
+        self, client, sample_tasks_response
+    ):
+        """Test explicit invalidation and batch writes drop cached tasks."""
+        client.cache.set_tasks(1, sample_tasks_response)
+        client.invalidate_tasks(1)
+        assert client.cache.get_tasks(1) is None
+
+        client.cache.set_tasks(2, sample_tasks_response)
+        with aioresponses() as m:
+            m.post(f'{client.base_url}/batch/', payload={
+                'results': [{'status': 204, 'body': None}], 'committed': True
+            })
+            await client.batch([{'method': 'DELETE', 'path': 'tasks/1/'}])
+        assert client.cache.get_tasks(2) is None
+
+    @pytest.mark.asyncio
+    async def test_read_during_batch_write_not_kept(
+        self, client, tasks_url, sample_tasks_response
+    ):
+        """Test a read that starts while a batch write runs is dropped."""
+        gate = asyncio.Event()
+
+        async def batch(url, **kwargs):
+            await gate.wait()
+            return CallbackResult(payload={
+                'results': [{'status': 204, 'body': None}], 'committed': True
+            })
+
+        with aioresponses() as m:
+            m.post(f'{client.base_url}/batch/', callback=batch)
+            m.get(tasks_url, payload=sample_tasks_response)
+            write = asyncio.ensure_future(
+                client.batch([{'method': 'DELETE', 'path': 'tasks/1/'}])
+            )
+            await asyncio.sleep(0.01)
+            # Served before the backend committed the batch
+            assert await client.get_tasks(2) == sample_tasks_response
+            gate.set()
+            await write
+
+        assert client.cache.get_tasks(2) is None
+
+    @pytest.mark.asyncio
+    async def test_register_user_and_load(
+        self, client, sample_user_response, sample_tasks_response
+    ):
+        """Test /start registration and the dashboard share one request."""
+        client.cache.set_tasks(2, sample_tasks_response)
+        dashboard = {'tasks': sample_tasks_response, 'tasks_count': 2}
+        with aioresponses() as m:
+            url = f'{client.base_url}/batch/'
+            m.post(url, status=503)
+            m.post(url, payload={'results': [
+                {'status': 201, 'body': sample_user_response},
+                {'status': 200, 'body': dashboard},
+            ], 'committed': True})
+            client.retry_base = 0
+
+            user = await client.register_user_and_load(1, 'user')
+
+            sent = m.requests[('POST', URL(url))][-1].kwargs['json']
+        assert user == sample_user_response
+        assert [r['path'] for r in sent['requests']] == [
+            'users/register_telegram/', 'tasks/dashboard/?telegram_id=1'
+        ]
+        assert client.cache.get_dashboard(1) == dashboard
+        # Registration is not a task write
+        assert client.cache.get_tasks(2) == sample_tasks_response
+
+    @pytest.mark.asyncio
+    async def test_concurrent_fetches_for_two_users(
+        self, client, tasks_url, sample_tasks_response
+    ):
+        """Test fetches for different users do not discard each other."""
+        gate = asyncio.Event()
+
+        async def callback(url, **kwargs):
+            await gate.wait()
+            return CallbackResult(payload=sample_tasks_response)
+
+        with aioresponses() as m:
+            m.get(tasks_url, callback=callback, repeat=True)
+            m.delete(
+                f'{client.base_url}/tasks/{sample_tasks_response[0]["id"]}/',
+                status=204
+            )
+            first = asyncio.ensure_future(client.get_tasks(1))
+            second = asyncio.ensure_future(client.get_tasks(2))
+            await asyncio.sleep(0)
+            # A write for user 2 makes only user 2's fetch stale
+            client.cache.set_tasks(2, sample_tasks_response)
+            await client.delete_task(sample_tasks_response[0]['id'])
+            gate.set()
+            await asyncio.gather(first, second)
+
+            assert sum(map(len, m.requests.values())) == 3
+
+        assert client.cache.get_tasks(1) == sample_tasks_response
+        assert client.cache.get_tasks(2) == sample_tasks_response[1:]
+
+    def test_write_for_unknown_user_ignored(self, sample_tasks_response):
+        """Test patching tasks of uncached users is a no-op."""
+        cache = TaskCache()
+        cache.put_task(sample_tasks_response[0])
+        cache.drop_task(sample_tasks_response[0]['id'])
+        assert cache.get_task(1, sample_tasks_response[0]['id']) is None
+
+
+class TestRequestCoalescing:
+    """Tests for single-flight GET coalescing."""
+
+    @pytest.fixture
+    async def client(self):
+        client = APIClient()
+        yield client
+        await client.close()
+
+    @pytest.fixture
+    def gate(self):
+        """Holds mocked responses until released."""
+        return asyncio.Event()
+
+    def slow(self, gate, payload):
+        async def callback(url, **kwargs):
+            await gate.wait()
+            return CallbackResult(payload=payload)
+        return callback
+
+    @pytest.mark.asyncio
+    async def test_identical_gets_share_request(
+        self, client, gate, sample_user_response
+    ):
+        """Test concurrent identical GETs send one request."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/users/by_telegram/.*')
+            m.get(pattern, callback=self.slow(gate, sample_user_response),
+                  repeat=True)
+
+            calls = [
+                asyncio.ensure_future(client.get_user_by_telegram(1))
+                for _ in range(3)
+            ]
+            other = asyncio.ensure_future(client.get_user_by_telegram(2))
+            await asyncio.sleep(0)
+            gate.set()
+            results = await asyncio.gather(*calls, other)
+
+            assert sum(map(len, m.requests.values())) == 2
+
+        assert all(r == sample_user_response for r in results)
+        assert client.stats['requests'] == 2
+        assert client.stats['coalesced'] == 2
+        assert client._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_writes_not_coalesced(self, client, sample_tasks_response):
+        """Test POSTs are always sent."""
+        with aioresponses() as m:
+            url = f'{client.base_url}/tasks/create_for_telegram/'
+            m.post(url, payload=sample_tasks_response[0], repeat=True)
+
+            await asyncio.gather(
+                client.create_task(1, 'Task'), client.create_task(1, 'Task')
+            )
+
+        assert client.stats['requests'] == 2
+        assert client.stats['coalesced'] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(
+        self, client, gate, sample_user_response
+    ):
+        """Test cancelling one waiter leaves the shared request running."""
+        with aioresponses() as m:
+            pattern = re.compile(r'.*/users/by_telegram/.*')
+            m.get(pattern, callback=self.slow(gate, sample_user_response))
+
+            first = asyncio.ensure_future(client.get_user_by_telegram(1))
+            second = asyncio.ensure_future(client.get_user_by_telegram(1))
+            await asyncio.sleep(0)
+            first.cancel()
+            gate.set()
+
+            assert await second == sample_user_response
+            with pytest.raises(asyncio.CancelledError):
+                await first
+
+    @pytest.mark.asyncio
+    async def test_write_detaches_in_flight_reads(
+        self, client, gate, sample_tasks_response
+    ):
+        """Test reads after a write do not join a read that predates it."""
+        with aioresponses() as m:
+            responses = [sample_tasks_response[1:], sample_tasks_response]
+
+            async def callback(url, **kwargs):
+                payload = responses.pop()
+                if payload is sample_tasks_response:
+                    await gate.wait()
+                return CallbackResult(payload=payload)
+
+            pattern = re.compile(r'.*/tasks/by_telegram/.*')
+            m.get(pattern, callback=callback, repeat=True)
+            m.delete(
+                f'{client.base_url}/tasks/{sample_tasks_response[0]["id"]}/',
+                status=204
+            )
+
+            before = asyncio.ensure_future(client.get_tasks(1))
+            await asyncio.sleep(0)
+            await client.delete_task(sample_tasks_response[0]['id'])
+            after = await client.get_tasks(1)
+            gate.set()
+            await before
+
+        assert after == sample_tasks_response[1:]
+        assert client.stats['coalesced'] == 0
+        # The stale read finished last but did not overwrite the cache
+        assert client.cache.get_tasks(1) == sample_tasks_response[1:]
+
+
+class TestTailLatency:
+    """Tests for timeouts, retries, hedging and the circuit breaker."""
+
+    @pytest.fixture
+    async def client(self):
+        client = APIClient()
+        client.retry_base = 0
+        yield client
+        await client.close()
+
+    @pytest.fixture
+    def user_url(self):
+        return re.compile(r'.*/users/by_telegram/.*')
+
+    def test_endpoint_route_and_timeouts(self):
+        """Test ids are folded out of routes and timeouts chosen per route."""
+        assert endpoint_route('tasks/01HXYZ123456789ABCDEFGH01/') == 'tasks/{id}/'
+        assert endpoint_route('tasks/by_telegram/') == 'tasks/by_telegram/'
+        assert request_timeout('GET', 'tasks/by_telegram/') == 5
+        assert request_timeout('PATCH', 'tasks/{id}/') == 10
+        assert request_timeout('POST', 'batch/') == 30
+
+    @pytest.mark.asyncio
+    async def test_read_retried(self, client, user_url, sample_user_response):
+        """Test idempotent calls are retried on gateway errors and errors."""
+        with aioresponses() as m:
+            m.get(user_url, status=503)
+            m.get(user_url, exception=aiohttp.ClientConnectionError())
+            m.get(user_url, payload=sample_user_response)
+
+            result = await client.get_user_by_telegram(1)
+
+        assert result == sample_user_response
+        assert client.stats['retries'] == 2
+        assert client.stats['failures'] == 2
+        assert client.breaker.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_retries_exhausted(self, client, user_url):
+        """Test None after the last retry fails."""
+        with aioresponses() as m:
+            m.get(user_url, status=502, repeat=True)
+            assert await client.get_user_by_telegram(1) is None
+        assert client.stats['requests'] == 3
+
+    @pytest.mark.asyncio
+    async def test_post_not_retried(self, client):
+        """Test non-idempotent writes are sent once."""
+        with aioresponses() as m:
+            m.post(
+                f'{client.base_url}/tasks/create_for_telegram/',
+                status=503, repeat=True
+            )
+            assert await client.create_task(1, 'Task') is None
+        assert client.stats['requests'] == 1
+
+    @pytest.mark.asyncio
+    async def test_register_retried(self, client, sample_user_response):
+        """Test get-or-create registration counts as idempotent."""
+        with aioresponses() as m:
+            url = f'{client.base_url}/users/register_telegram/'
+            m.post(url, status=504)
+            m.post(url, payload=sample_user_response)
+            assert await client.register_user(1, 'user') is not None
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_failures(self, client, user_url):
+        """Test 4xx responses neither retry nor trip the breaker."""
+        with aioresponses() as m:
+            m.get(user_url, status=400)
+            assert await client.get_user_by_telegram(1) is None
+        assert client.stats['retries'] == 0
+        assert client.breaker.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_fails_fast(
+        self, client, user_url, sample_user_response
+    ):
+        """Test an open circuit skips the backend until it recovers."""
+        client.breaker = CircuitBreaker(2, 30, clock := FakeClock())
+        client.retries = 0
+        with aioresponses() as m:
+            m.get(user_url, status=503, repeat=True)
+            await client.get_user_by_telegram(1)
+            await client.get_user_by_telegram(2)
+            assert await client.get_user_by_telegram(3) is None
+            assert client.stats['requests'] == 2
+            assert client.stats['short_circuited'] == 1
+            assert client.health()['circuit'] == 'open'
+
+        clock.now = 30
+        with aioresponses() as m:
+            m.get(user_url, payload=sample_user_response)
+            assert await client.get_user_by_telegram(1) is not None
+        assert client.health()['circuit'] == 'closed'
+
+    @pytest.mark.asyncio
+    async def test_server_errors_trip_breaker(self, client, user_url):
+        """Test a backend answering 500 opens the circuit without retries."""
+        client.breaker = CircuitBreaker(2, 30, FakeClock())
+        with aioresponses() as m:
+            m.get(user_url, status=500, repeat=True)
+            assert await client.get_user_by_telegram(1) is None
+            assert await client.get_user_by_telegram(2) is None
+            assert await client.get_user_by_telegram(3) is None
+
+        assert client.stats['requests'] == 2
+        assert client.stats['retries'] == 0
+        assert client.health()['circuit'] == 'open'
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('outcome', ['cancelled', 'error'])
+    async def test_aborted_trial_released(
+        self, client, user_url, sample_user_response, outcome
+    ):
+        """Test a trial call that ends without an outcome frees the slot."""
+        client.breaker = CircuitBreaker(1, 30, clock := FakeClock())
+        client.breaker.record_failure()
+        clock.now = 30
+        calls = []
+
+        async def callback(url, **kwargs):
+            calls.append(url)
+            if len(calls) > 1:
+                return CallbackResult(payload=sample_user_response)
+            if outcome == 'error':
+                raise ValueError('unexpected')
+            await asyncio.Event().wait()
+
+        with aioresponses() as m:
+            m.get(user_url, callback=callback, repeat=True)
+            trial = asyncio.ensure_future(client.get_user_by_telegram(1))
+            await asyncio.sleep(0.01)
+            # The shared request itself is cancelled, e.g. on shutdown
+            for request in client._in_flight.values():
+                request.cancel()
+            with pytest.raises((asyncio.CancelledError, ValueError)):
+                await trial
+
+            assert client.breaker.state == CircuitBreaker.HALF_OPEN
+            assert await client.get_user_by_telegram(2) is not None
+        assert client.health()['circuit'] == 'closed'
+
+    @pytest.mark.asyncio
+    async def test_hedged_read(self, client, user_url, sample_user_response):
+        """Test a read slower than p95 is hedged and the copy wins."""
+        client.hedge_reads = True
+        for _ in range(client.latency.min_samples):
+            client.latency.record('users/by_telegram/', 0.001)
+        gate = asyncio.Event()
+        calls = []
+
+        async def callback(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                await gate.wait()
+            return CallbackResult(payload=sample_user_response)
+
+        with aioresponses() as m:
+            m.get(user_url, callback=callback, repeat=True)
+            result = await client.get_user_by_telegram(1)
+        gate.set()
+
+        assert result == sample_user_response
+        assert client.stats['hedged'] == 1
+        assert client.stats['hedge_wins'] == 1
+        assert client.health()['p95']['users/by_telegram/'] is not None
+
+    @pytest.mark.asyncio
+    async def test_hedged_read_fast_and_failing(self, client, user_url):
+        """Test fast reads are not hedged and failed copies surface."""
+        client.hedge_reads = True
+        client.retries = 0
+        with aioresponses() as m:
+            m.get(user_url, payload={'id': 1})
+            assert await client.get_user_by_telegram(1) == {'id': 1}
+
+            for _ in range(client.latency.min_samples):
+                client.latency.record('users/by_telegram/', 0.001)
+            m.get(user_url, payload={'id': 2})
+            assert await client.get_user_by_telegram(1) == {'id': 2}
+
+            client.latency = type(client.latency)(min_samples=1)
+            client.latency.record('users/by_telegram/', 0)
+            m.get(user_url, status=503, repeat=True)
+            assert await client.get_user_by_telegram(1) is None
+        assert client.stats['hedge_wins'] == 0
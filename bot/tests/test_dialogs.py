@@ -2,7 +2,10 @@
 Tests for Aiogram-Dialog dialogs.
 """
 
+import re
+
 import pytest
+from aioresponses import aioresponses
 from unittest.mock import AsyncMock, patch, MagicMock
 
 from states import TaskSG, AddTaskSG
@@ -19,13 +22,48 @@ class TestTaskDialogGetters:
         from dialogs import get_tasks_data
 
         with patch('dialogs.api_client') as mock_api:
-            mock_api.get_tasks = AsyncMock(return_value=sample_tasks_response)
+            mock_api.get_dashboard = AsyncMock(return_value={
+                'tasks': sample_tasks_response,
+                'tasks_count': len(sample_tasks_response),
+                'status_counts': {
+                    'pending': 4, 'in_progress': 2, 'completed': 1
+                },
+            })
 
             result = await get_tasks_data(mock_dialog_manager)
 
+            mock_api.get_dashboard.assert_awaited_once_with(123456789)
             assert result['tasks'] == sample_tasks_response
-            assert result['tasks_count'] == 2
+            assert result['tasks_count'] == len(sample_tasks_response)
             assert result['has_tasks'] is True
+            assert result['pending_count'] == 4
+            assert result['completed_count'] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('page, loads_all', [(0, False), (3, True)])
+    async def test_get_tasks_data_scrolls_past_dashboard(
+        self, mock_dialog_manager, page, loads_all
+    ):
+        """Test the full list is loaded on the last page of the dashboard."""
+        from dialogs import get_tasks_data
+
+        tasks = [{'id': str(n), 'title': f'Task {n}'} for n in range(30)]
+        scroll = MagicMock()
+        scroll.get_page = AsyncMock(return_value=page)
+        mock_dialog_manager.find = MagicMock(return_value=scroll)
+
+        with patch('dialogs.api_client') as mock_api:
+            mock_api.get_dashboard = AsyncMock(return_value={
+                'tasks': tasks[:20], 'tasks_count': 30, 'status_counts': {},
+            })
+            mock_api.get_tasks = AsyncMock(return_value=tasks)
+
+            result = await get_tasks_data(mock_dialog_manager)
+
+        mock_dialog_manager.find.assert_called_once_with('tasks_scroll')
+        assert result['tasks'] == (tasks if loads_all else tasks[:20])
+        assert result['tasks_count'] == 30
+        assert mock_api.get_tasks.await_count == int(loads_all)
 
     @pytest.mark.asyncio
     async def test_get_tasks_data_empty(self, mock_dialog_manager):
@@ -33,7 +71,9 @@ class TestTaskDialogGetters:
         from dialogs import get_tasks_data
 
         with patch('dialogs.api_client') as mock_api:
-            mock_api.get_tasks = AsyncMock(return_value=[])
+            mock_api.get_dashboard = AsyncMock(return_value={
+                'tasks': [], 'tasks_count': 0, 'status_counts': {}
+            })
 
             result = await get_tasks_data(mock_dialog_manager)
 
@@ -41,6 +81,19 @@ class TestTaskDialogGetters:
             assert result['tasks_count'] == 0
             assert result['has_tasks'] is False
 
+    @pytest.mark.asyncio
+    async def test_get_tasks_data_backend_error(self, mock_dialog_manager):
+        """Test an unavailable dashboard renders an empty list."""
+        from dialogs import get_tasks_data
+
+        with patch('dialogs.api_client') as mock_api:
+            mock_api.get_dashboard = AsyncMock(return_value=None)
+
+            result = await get_tasks_data(mock_dialog_manager)
+
+            assert result['tasks'] == []
+            assert result['has_tasks'] is False
+
     @pytest.mark.asyncio
     async def test_get_task_detail_data(
         self, mock_dialog_manager, sample_tasks_response
@@ -53,10 +106,13 @@ class TestTaskDialogGetters:
         }
 
         with patch('dialogs.api_client') as mock_api:
-            mock_api.get_tasks = AsyncMock(return_value=sample_tasks_response)
+            mock_api.get_task = AsyncMock(return_value=sample_tasks_response[0])
 
             result = await get_task_detail_data(mock_dialog_manager)
 
+            mock_api.get_task.assert_called_once_with(
+                123456789, sample_tasks_response[0]['id']
+            )
             assert result['task'] is not None
             assert result['title'] == 'Test Task 1'
             assert 'Work' in result['categories']
@@ -71,12 +127,38 @@ class TestTaskDialogGetters:
         }
 
         with patch('dialogs.api_client') as mock_api:
-            mock_api.get_tasks = AsyncMock(return_value=[])
+            mock_api.get_task = AsyncMock(return_value=None)
 
             result = await get_task_detail_data(mock_dialog_manager)
 
             assert result['task'] is None
 
+    @pytest.mark.asyncio
+    async def test_task_detail_after_list_is_cached(
+        self, mock_dialog_manager, sample_tasks_response
+    ):
+        """Test opening a task from the list makes no backend calls."""
+        from api_client import APIClient
+        from dialogs import get_tasks_data, get_task_detail_data
+
+        client = APIClient()
+        with patch('dialogs.api_client', client), aioresponses() as m:
+            m.get(re.compile(r'.*/tasks/dashboard/.*'), payload={
+                'tasks': sample_tasks_response, 'tasks_count': 2
+            })
+            await get_tasks_data(mock_dialog_manager)
+            await get_tasks_data(mock_dialog_manager)
+
+            mock_dialog_manager.dialog_data = {
+                'selected_task_id': sample_tasks_response[1]['id']
+            }
+            result = await get_task_detail_data(mock_dialog_manager)
+
+            assert len(m.requests) == 1
+        await client.close()
+
+        assert result['title'] == 'Test Task 2'
+
 
 class TestTaskDialogHandlers:
     """Tests for task dialog event handlers."""
@@ -0,0 +1,86 @@
+"""
+Tests for the parts of the end-to-end benchmark that run in process.
+"""
+
+import json
+
+import aiohttp
+import pytest
+
+from benchmarks.end_to_end import EndToEnd, FakeTelegramServer, Stage
+
+
+class TestFakeTelegramServer:
+    """Tests for the fake Bot API server."""
+
+    @pytest.mark.asyncio
+    async def test_form_and_json_requests(self):
+        """Test bot (form) and backend (JSON) sends are both recorded."""
+        server = FakeTelegramServer()
+        url = await server.start()
+        markup = {'inline_keyboard': [[{'text': 'OK', 'callback_data': 'ok'}]]}
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f'{url}/bot42:T/sendMessage', data={
+                    'chat_id': '7', 'text': 'hello',
+                    'reply_markup': json.dumps(markup),
+                }) as response:
+                    sent = await response.json()
+                async with session.post(f'{url}/bot42:T/sendMessage', json={
+                    'chat_id': 8, 'text': 'e2e-reminder-3',
+                }) as response:
+                    assert response.status == 200
+                async with session.post(
+                    f'{url}/bot42:T/answerCallbackQuery', data={'id': '1'}
+                ) as response:
+                    answered = await response.json()
+        finally:
+            await server.stop()
+
+        assert sent['result']['chat']['id'] == 7
+        assert server.screens[7]['keyboard'][0][0].callback_data == 'ok'
+        assert server.screens[8]['keyboard'] == []
+        assert [d[1:] for d in server.deliveries] == [
+            (7, 'hello'), (8, 'e2e-reminder-3')
+        ]
+        assert answered == {'ok': True, 'result': True}
+        assert server.calls['sendMessage'] == 2
+
+
+class TestSaturation:
+    """Tests for deciding which component saturated first."""
+
+    def make_stage(self, api=0.05, lag=1.0, loop_lag=0.0, confirm=0.05):
+        stage = Stage(1, 1.0, 60.0)
+        stage.api = [api] * 10
+        stage.reminders = {n: 0.0 for n in range(10)}
+        stage.lags = [lag] * 10
+        stage.loop_lags = [loop_lag] * 10
+        stage.steps['add_confirm'] = [confirm] * 10
+        stage.backlog = [0] * 10
+        return stage
+
+    def test_healthy(self):
+        """Test a stage within every limit saturates nothing."""
+        summary = EndToEnd(scan_seconds=2).summary(self.make_stage(), 0)
+
+        assert summary['saturated'] == []
+        assert summary['undelivered'] == 0
+
+    def test_slow_backend_is_not_blamed_on_the_bot(self):
+        """Test slow replies count against the backend when it is slow."""
+        stage = self.make_stage(api=1.0, confirm=1.2)
+
+        summary = EndToEnd(scan_seconds=2).summary(stage, 0)
+
+        assert summary['saturated'] == ['backend']
+
+    def test_late_reminders_and_busy_loop(self):
+        """Test late reminders blame Celery and loop lag blames the bot."""
+        stage = self.make_stage(lag=3.0, loop_lag=0.2)
+        stage.backlog = [0, 1, 2, 3, 4, 5]
+
+        summary = EndToEnd(scan_seconds=2).summary(stage, 0)
+
+        assert summary['saturated'] == ['celery', 'bot']
+        assert summary['backlog_max'] == 5
@@ -5,9 +5,20 @@ Tests for Telegram bot handlers.
 import pytest
 from unittest.mock import AsyncMock, patch
 
+from fakeredis.aioredis import FakeRedis
+
+from known_users import KnownUsers
 from states import TaskSG, AddTaskSG
 
 
+@pytest.fixture(autouse=True)
+def known():
+    """Fresh known-users set for each test."""
+    known = KnownUsers()
+    with patch('handlers.known_users', known):
+        yield known
+
+
 class TestStartHandler:
     """Tests for /start command handler."""
 
@@ -19,11 +30,11 @@ class TestStartHandler:
         from handlers import cmd_start
 
         with patch('handlers.api_client') as mock_api:
-            mock_api.register_user = AsyncMock(return_value=sample_user_response)
+            mock_api.register_user_and_load = AsyncMock(return_value=sample_user_response)
 
             await cmd_start(mock_message, mock_dialog_manager)
 
-            mock_api.register_user.assert_called_once_with(
+            mock_api.register_user_and_load.assert_called_once_with(
                 mock_message.from_user.id,
                 mock_message.from_user.username
             )
@@ -40,13 +51,59 @@ class TestStartHandler:
         from handlers import cmd_start
 
         with patch('handlers.api_client') as mock_api:
-            mock_api.register_user = AsyncMock(return_value=None)
+            mock_api.register_user_and_load = AsyncMock(return_value=None)
 
             await cmd_start(mock_message, mock_dialog_manager)
 
             mock_message.answer.assert_called_once()
             call_args = mock_message.answer.call_args[0][0]
             assert 'ошибка' in call_args.lower()
+            mock_api.prewarm_dashboard.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_start_skips_known_user(
+        self, mock_message, mock_dialog_manager, sample_user_response, known
+    ):
+        """Test a registered user is not registered again on /start."""
+        from handlers import cmd_start
+
+        with patch('handlers.api_client') as mock_api:
+            mock_api.register_user_and_load = AsyncMock(return_value=sample_user_response)
+
+            await cmd_start(mock_message, mock_dialog_manager)
+            await cmd_start(mock_message, mock_dialog_manager)
+
+            mock_api.register_user_and_load.assert_awaited_once()
+            assert mock_message.answer.call_count == 2
+            assert 'Test' in mock_message.answer.call_args[0][0]
+            # The registration loaded the dashboard; a known user's
+            # dashboard is loaded in the background
+            prewarm = mock_api.prewarm_dashboard.call_args
+        assert await known.contains(mock_message.from_user.id)
+
+        # A failed load for a skipped user forgets it (deleted in backend)
+        telegram_id, on_failure = prewarm.args
+        assert telegram_id == mock_message.from_user.id
+        await on_failure()
+        assert not await known.contains(mock_message.from_user.id)
+
+    @pytest.mark.asyncio
+    async def test_start_uses_shared_known_users(
+        self, mock_message, mock_dialog_manager, known
+    ):
+        """Test a user registered through another replica is skipped."""
+        from handlers import cmd_start
+
+        redis = FakeRedis()
+        await KnownUsers(redis).add(mock_message.from_user.id)
+        known.redis = redis
+
+        with patch('handlers.api_client') as mock_api:
+            mock_api.register_user_and_load = AsyncMock()
+
+            await cmd_start(mock_message, mock_dialog_manager)
+
+            mock_api.register_user_and_load.assert_not_awaited()
 
 
 class TestHelpHandler:
@@ -0,0 +1,99 @@
+"""
+Tests for the known-users set.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import known_users as known_users_module
+from known_users import KnownUsers, build_known_users
+
+
+class TestKnownUsers:
+    """Tests for KnownUsers."""
+
+    @pytest.mark.asyncio
+    async def test_local_ids_merged_into_sorted_array(self):
+        """Test ids stay known after recent ones are merged."""
+        known = KnownUsers(merge_every=3)
+        for telegram_id in (30, 10, 20, 10, 40):
+            await known.add(telegram_id)
+
+        assert list(known._ids) == [10, 20, 30]
+        assert known._recent == {40}
+        assert len(known) == 4
+        for telegram_id in (10, 20, 30, 40):
+            assert await known.contains(telegram_id)
+        assert not await known.contains(25)
+        assert not await known.contains(50)
+
+    @pytest.mark.asyncio
+    async def test_merge_and_discard(self):
+        """Test a batch merges into the middle and ends of the array."""
+        known = KnownUsers(merge_every=3)
+        for telegram_id in (20, 40, 60, 70, 10, 50):
+            await known.add(telegram_id)
+        assert list(known._ids) == [10, 20, 40, 50, 60, 70]
+
+        await known.add(30)
+        await known.discard(30)
+        await known.discard(60)
+        await known.discard(99)
+
+        assert list(known._ids) == [10, 20, 40, 50, 70]
+        assert not await known.contains(30)
+        assert not await known.contains(60)
+
+    @pytest.mark.asyncio
+    async def test_discard_shared(self):
+        """Test a forgotten user is removed from Redis too."""
+        redis = FakeRedis()
+        await KnownUsers(redis).add(7)
+        await KnownUsers(redis).discard(7)
+
+        assert not await KnownUsers(redis).contains(7)
+
+        redis.srem = AsyncMock(side_effect=RedisConnectionError('down'))
+        await KnownUsers(redis).discard(7)
+
+    @pytest.mark.asyncio
+    async def test_redis_shared_between_instances(self):
+        """Test an id added by one replica is found and cached by another."""
+        redis = FakeRedis()
+        await KnownUsers(redis).add(7)
+        other = KnownUsers(redis)
+
+        assert await other.contains(7)
+        assert not await other.contains(8)
+        # Now answered locally
+        await redis.flushall()
+        assert await other.contains(7)
+        await other.close()
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_mean_unknown(self):
+        """Test a failing Redis does not break /start."""
+        redis = FakeRedis()
+        redis.sismember = AsyncMock(side_effect=RedisConnectionError('down'))
+        redis.sadd = AsyncMock(side_effect=RedisConnectionError('down'))
+        known = KnownUsers(redis)
+
+        assert not await known.contains(1)
+        await known.add(1)
+        assert await known.contains(1)
+
+    @pytest.mark.asyncio
+    async def test_build_known_users(self):
+        """Test Redis is used only when a URL is configured."""
+        assert KnownUsers().redis is None
+        assert build_known_users().redis is None
+        with patch.object(
+            known_users_module, 'KNOWN_USERS_REDIS_URL', 'redis://redis:6379/3'
+        ):
+            known = build_known_users()
+        assert known.redis is not None
+        await known.close()
+        await KnownUsers().close()
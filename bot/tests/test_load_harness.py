@@ -0,0 +1,35 @@
+"""
+Smoke test for the offline load harness.
+"""
+
+import pytest
+
+from api_client import api_client
+from benchmarks.load_harness import STEPS, LoadHarness
+
+
+class TestLoadHarness:
+    """Tests for the load harness driving the real dialogs."""
+
+    @pytest.mark.asyncio
+    async def test_sessions_complete(self):
+        """Test every simulated user gets through every step."""
+        base_url = api_client.base_url
+        harness = LoadHarness(users=20, concurrency=5)
+
+        report = await harness.run()
+
+        assert report['errors'] == 0
+        assert report['skipped'] == {}
+        assert report['updates'] == 20 * len(STEPS)
+        assert set(report['steps']) == set(STEPS)
+        calls = report['backend_calls']
+        assert calls['POST /api/tasks/create_for_telegram/'] == 20
+        assert report['telegram_calls']['sendMessage'] > 0
+        assert 0 < report['p50'] <= report['p99']
+        # Each user's new task landed in the fake backend
+        assert all(
+            tasks[0]['title'] == 'Купить молоко'
+            for tasks in harness.backend.tasks.values()
+        )
+        assert api_client.base_url == base_url
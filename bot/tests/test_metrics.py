@@ -0,0 +1,243 @@
+"""
+Tests for latency histograms and the metrics endpoint.
+"""
+
+import re
+import socket
+
+import aiohttp
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from aioresponses import aioresponses
+
+from api_client import APIClient
+from metrics import (
+    API_SECONDS, HANDLER_SECONDS, REGISTRY, TELEGRAM_SECONDS,
+    UPDATE_REPLY_SECONDS, UPDATE_SECONDS, Gauge, Histogram, MetricsServer,
+    Registry, TelegramTimer, UpdateTimer, instrument_router, timed
+)
+
+
+class FakeSession(BaseSession):
+    """Bot API session answering every call without a network."""
+
+    def __init__(self, error=None):
+        super().__init__()
+        self.error = error
+        self.methods = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.methods.append(method.__api_method__)
+        if self.error is not None:
+            raise self.error
+        return True
+
+    async def stream_content(self, *args, **kwargs):  # pragma: no cover
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def message_update(update_id, text='/start'):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': 10, 'type': 'private'},
+            'from': {'id': 10, 'is_bot': False, 'first_name': 'Test'},
+            'text': text,
+        },
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestHistogram:
+    """Tests for the histogram and its text format."""
+
+    def test_render(self):
+        """Test buckets are cumulative and labels are escaped."""
+        registry = Registry()
+        histogram = registry.register(Histogram(
+            'demo_seconds', 'Demo', ('name',), buckets=(0.1, 1)
+        ))
+        registry.register(Gauge('demo_depth', 'Depth', lambda: 3))
+        histogram.observe(0.05, name='a"b')
+        histogram.observe(0.5, name='a"b')
+
+        text = registry.render()
+
+        assert '# TYPE demo_seconds histogram' in text
+        assert 'demo_seconds_bucket{name="a\\"b",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{name="a\\"b",le="1"} 2' in text
+        assert 'demo_seconds_bucket{name="a\\"b",le="+Inf"} 2' in text
+        assert 'demo_seconds_count{name="a\\"b"} 2' in text
+        assert 'demo_seconds_sum{name="a\\"b"} 0.55' in text
+        assert 'demo_depth 3\n' in text
+        assert registry.get('demo_depth').function() == 3
+
+    def test_failing_gauge_skipped(self):
+        """Test a broken gauge does not break the whole scrape."""
+        registry = Registry()
+        registry.register(Gauge('broken', 'Broken', lambda: 1 / 0))
+        registry.register(Gauge('working', 'Working', lambda: 0.5))
+
+        assert 'working 0.5' in registry.render()
+
+    @pytest.mark.asyncio
+    async def test_timed(self):
+        """Test timed() records the wrapped function and keeps its name."""
+        @timed('getter')
+        async def sample_getter(**kwargs):
+            return kwargs
+
+        before = HANDLER_SECONDS.count(kind='getter', name='sample_getter')
+        assert await sample_getter(a=1) == {'a': 1}
+        assert sample_getter.__name__ == 'sample_getter'
+        assert HANDLER_SECONDS.count(
+            kind='getter', name='sample_getter'
+        ) == before + 1
+
+
+class TestDispatcherTiming:
+    """Tests for update, handler and Telegram call timing."""
+
+    @pytest.fixture
+    def dispatcher(self):
+        router = Router(name='commands')
+
+        @router.message()
+        async def echo_handler(message: Message):
+            await message.answer('first')
+            await message.answer('second')
+
+        dispatcher = Dispatcher()
+        dispatcher.update.outer_middleware(UpdateTimer())
+        dispatcher.include_router(router)
+        instrument_router(router)
+        instrument_router(router)
+        return dispatcher
+
+    @pytest.mark.asyncio
+    async def test_update_to_reply(self, dispatcher):
+        """Test one reply time per update and timing of every layer."""
+        session = FakeSession()
+        bot = Bot('42:TEST', session=session)
+        bot.session.middleware(TelegramTimer())
+        replies = UPDATE_REPLY_SECONDS.count(update_type='message')
+        updates = UPDATE_SECONDS.count(update_type='message')
+        handlers = HANDLER_SECONDS.count(kind='handler', name='echo_handler')
+        sends = TELEGRAM_SECONDS.count(method='sendMessage', status='ok')
+
+        await dispatcher.feed_raw_update(bot, message_update(1))
+
+        assert session.methods == ['sendMessage', 'sendMessage']
+        assert UPDATE_REPLY_SECONDS.count(update_type='message') == replies + 1
+        assert UPDATE_SECONDS.count(update_type='message') == updates + 1
+        # instrument_router() twice still times the handler once
+        assert HANDLER_SECONDS.count(
+            kind='handler', name='echo_handler'
+        ) == handlers + 1
+        assert TELEGRAM_SECONDS.count(
+            method='sendMessage', status='ok'
+        ) == sends + 2
+
+    @pytest.mark.asyncio
+    async def test_failed_send_is_not_a_reply(self):
+        """Test errors are labelled and do not end the reply time."""
+        method = SendMessage(chat_id=10, text='x')
+        session = FakeSession(
+            error=TelegramRetryAfter(method, 'Too Many Requests', 1)
+        )
+        bot = Bot('42:TEST', session=session)
+        bot.session.middleware(TelegramTimer())
+        before = TELEGRAM_SECONDS.count(
+            method='sendMessage', status='TelegramRetryAfter'
+        )
+
+        with pytest.raises(TelegramRetryAfter):
+            await bot(method)
+
+        assert TELEGRAM_SECONDS.count(
+            method='sendMessage', status='TelegramRetryAfter'
+        ) == before + 1
+
+    def test_dialog_handler_name(self):
+        """Test Dialog methods are named after their states group."""
+        from dialogs import dialog_router
+        from metrics import HandlerTimer
+
+        dialog = dialog_router.sub_routers[0]
+        timer = HandlerTimer(dialog)
+
+        assert timer.handler_name(dialog._callback_handler) == (
+            'TaskSG.callback_handler'
+        )
+
+
+class TestAPITiming:
+    """Tests for backend call timing."""
+
+    @pytest.mark.asyncio
+    async def test_api_calls_by_endpoint_and_status(self):
+        """Test statuses and connection errors get their own series."""
+        client = APIClient()
+        client.retries = 0
+        pattern = re.compile(r'.*/tasks/dashboard/.*')
+        ok = API_SECONDS.count(
+            method='GET', endpoint='tasks/dashboard/', status=200
+        )
+        errors = API_SECONDS.count(
+            method='GET', endpoint='tasks/dashboard/', status='error'
+        )
+        try:
+            with aioresponses() as m:
+                m.get(pattern, payload={'tasks': []})
+                m.get(pattern, exception=aiohttp.ClientConnectionError())
+                await client.get_dashboard(1)
+                client.cache.clear()
+                await client.get_dashboard(1)
+        finally:
+            await client.close()
+
+        assert API_SECONDS.count(
+            method='GET', endpoint='tasks/dashboard/', status=200
+        ) == ok + 1
+        assert API_SECONDS.count(
+            method='GET', endpoint='tasks/dashboard/', status='error'
+        ) == errors + 1
+
+
+class TestMetricsServer:
+    """Tests for the /metrics endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_serves_registry(self):
+        """Test the endpoint returns the Prometheus text format."""
+        port = free_port()
+        server = MetricsServer(host='127.0.0.1', port=port)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f'http://127.0.0.1:{port}/metrics'
+                ) as response:
+                    body = await response.text()
+                    content_type = response.headers['Content-Type']
+        finally:
+            await server.stop()
+            await server.stop()
+
+        assert content_type.startswith('text/plain; version=0.0.4')
+        assert '# TYPE bot_update_reply_seconds histogram' in body
+        assert body == REGISTRY.render()
@@ -0,0 +1,209 @@
+"""
+Tests for per-user ordering of incoming updates.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import CallbackQuery, Message
+
+from ordering import UserOrderingMiddleware
+
+
+def message_update(update_id, user_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': str(update_id),
+        },
+    }
+
+
+def callback_update(update_id, user_id, data='task_select:1'):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+            'chat_instance': 'ci',
+            'data': data,
+            'message': {
+                'message_id': 7,
+                'date': 0,
+                'chat': {'id': user_id, 'type': 'private'},
+                'text': 'Список задач',
+            },
+        },
+    }
+
+
+class Recorder:
+    """Handlers that record start/end and block until released."""
+
+    def __init__(self):
+        self.events = []
+        self.gate = asyncio.Event()
+
+    async def on_message(self, message: Message):
+        self.events.append(('start', message.from_user.id, message.text))
+        await self.gate.wait()
+        self.events.append(('end', message.from_user.id, message.text))
+
+    async def on_callback(self, callback: CallbackQuery):
+        self.events.append(('callback', callback.from_user.id, callback.id))
+        await self.gate.wait()
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+def make_dispatcher(recorder, **kwargs):
+    ordering = UserOrderingMiddleware(**kwargs)
+    dispatcher = Dispatcher()
+    dispatcher.update.outer_middleware(ordering)
+    router = Router()
+    router.message.register(recorder.on_message)
+    router.callback_query.register(recorder.on_callback)
+    dispatcher.include_router(router)
+    return dispatcher, ordering
+
+
+async def feed(dispatcher, *updates):
+    bot = Bot('42:TEST')
+    tasks = []
+    for update in updates:
+        tasks.append(asyncio.ensure_future(
+            dispatcher.feed_raw_update(bot, update)
+        ))
+        # Let the update reach the middleware in arrival order
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+    return tasks
+
+
+class TestUserOrdering:
+    """Tests for UserOrderingMiddleware."""
+
+    @pytest.mark.asyncio
+    async def test_one_user_in_order_other_users_concurrently(self, recorder):
+        """Test a user's updates run one by one while other users overlap."""
+        dispatcher, ordering = make_dispatcher(recorder)
+
+        tasks = await feed(
+            dispatcher,
+            message_update(1, 10), message_update(2, 10), message_update(3, 20)
+        )
+        # User 10's second update waits; user 20 already runs
+        assert ('start', 10, '1') in recorder.events
+        assert ('start', 20, '3') in recorder.events
+        assert ('start', 10, '2') not in recorder.events
+        metrics = ordering.metrics()
+        assert metrics['in_flight'] == 2
+        assert metrics['pending'] == 3
+        assert metrics['max_user_depth'] == 2
+
+        recorder.gate.set()
+        await asyncio.gather(*tasks)
+        user_events = [e for e in recorder.events if e[1] == 10]
+        assert user_events == [
+            ('start', 10, '1'), ('end', 10, '1'),
+            ('start', 10, '2'), ('end', 10, '2'),
+        ]
+        assert ordering.metrics()['pending'] == 0
+        assert ordering._locks == {}
+
+    @pytest.mark.asyncio
+    async def test_global_cap(self, recorder):
+        """Test no more than max_in_flight handlers run at once."""
+        dispatcher, ordering = make_dispatcher(recorder, max_in_flight=2)
+
+        tasks = await feed(
+            dispatcher, *(message_update(n, 100 + n) for n in range(5))
+        )
+        assert len(recorder.events) == 2
+        assert ordering.metrics()['in_flight'] == 2
+        assert ordering.metrics()['users_pending'] == 5
+
+        recorder.gate.set()
+        await asyncio.gather(*tasks)
+        assert len([e for e in recorder.events if e[0] == 'end']) == 5
+        metrics = ordering.metrics()
+        assert metrics['handled'] == 5
+        assert metrics['wait_p95'] > 0
+
+    @pytest.mark.asyncio
+    async def test_duplicate_callback_collapsed(self, recorder):
+        """Test a repeated tap on a pending button is answered and dropped."""
+        dispatcher, ordering = make_dispatcher(recorder)
+
+        with patch.object(CallbackQuery, 'answer', AsyncMock()) as answer:
+            tasks = await feed(
+                dispatcher,
+                callback_update(1, 10),
+                callback_update(2, 10),
+                callback_update(3, 10, data='task_select:2'),
+            )
+            recorder.gate.set()
+            await asyncio.gather(*tasks)
+
+        assert [e[2] for e in recorder.events] == ['1', '3']
+        assert ordering.stats['collapsed'] == 1
+        answer.assert_awaited_once()
+        assert ordering._pending_callbacks == set()
+
+    @pytest.mark.asyncio
+    async def test_shed_over_user_queue_limit(self, recorder):
+        """Test updates beyond the per-user queue are dropped."""
+        dispatcher, ordering = make_dispatcher(recorder, max_queue_per_user=2)
+
+        with patch.object(CallbackQuery, 'answer', AsyncMock()) as answer:
+            tasks = await feed(
+                dispatcher,
+                message_update(1, 10),
+                message_update(2, 10),
+                message_update(3, 10),
+                callback_update(4, 10),
+                message_update(5, 20),
+            )
+            recorder.gate.set()
+            await asyncio.gather(*tasks)
+
+        handled = [e[2] for e in recorder.events if e[0] == 'start']
+        assert handled == ['1', '5', '2']
+        assert ordering.stats['shed'] == 2
+        answer.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_dismiss_error_is_ignored(self, recorder):
+        """Test a failed answer to a dropped callback does not raise."""
+        dispatcher, ordering = make_dispatcher(recorder)
+
+        failing = AsyncMock(side_effect=RuntimeError('network'))
+        with patch.object(CallbackQuery, 'answer', failing):
+            tasks = await feed(
+                dispatcher, callback_update(1, 10), callback_update(2, 10)
+            )
+            recorder.gate.set()
+            await asyncio.gather(*tasks)
+
+        assert ordering.stats['collapsed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_without_user(self, recorder):
+        """Test updates without a user go straight to the handlers."""
+        ordering = UserOrderingMiddleware()
+        handler = AsyncMock(return_value='done')
+
+        result = await ordering(handler, object(), {})
+
+        assert result == 'done'
+        assert ordering.metrics()['users_pending'] == 0
+        assert ordering.stats['handled'] == 1
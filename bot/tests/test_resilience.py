@@ -0,0 +1,93 @@
+"""
+Tests for backoff, latency tracking and the circuit breaker.
+"""
+
+from resilience import CircuitBreaker, LatencyTracker, backoff_delay
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBackoff:
+    """Tests for jittered exponential backoff."""
+
+    def test_delay_grows_and_is_capped(self):
+        """Test the jitter range doubles per attempt up to the cap."""
+        upper = lambda low, high: high
+        assert backoff_delay(1, 0.1, 2, upper) == 0.1
+        assert backoff_delay(3, 0.1, 2, upper) == 0.4
+        assert backoff_delay(10, 0.1, 2, upper) == 2
+
+    def test_delay_is_jittered(self):
+        """Test delays fall within the full-jitter range."""
+        delays = {backoff_delay(2, 0.1, 2) for _ in range(20)}
+        assert all(0 <= delay <= 0.2 for delay in delays)
+        assert len(delays) > 1
+
+
+class TestLatencyTracker:
+    """Tests for per-endpoint latency percentiles."""
+
+    def test_percentile_needs_samples(self):
+        """Test no percentile until min_samples are recorded."""
+        tracker = LatencyTracker(window=100, min_samples=10)
+        for n in range(9):
+            tracker.record('tasks/', n)
+        assert tracker.percentile('tasks/', 0.95) is None
+        assert tracker.percentile('users/', 0.95) is None
+
+        tracker.record('tasks/', 9)
+        assert tracker.percentile('tasks/', 0.95) == 9
+        assert tracker.percentile('tasks/', 0.5) == 5
+
+    def test_window_slides(self):
+        """Test old samples fall out of the window."""
+        tracker = LatencyTracker(window=5, min_samples=1)
+        for n in range(100):
+            tracker.record('tasks/', n)
+        assert tracker.snapshot(0.0) == {'tasks/': 95}
+
+
+class TestCircuitBreaker:
+    """Tests for the circuit breaker states."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit opens on the threshold and refuses calls."""
+        breaker = CircuitBreaker(3, 30, FakeClock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+    def test_half_open_trial(self):
+        """Test one trial call after the reset timeout decides the state."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(1, 30, clock)
+        breaker.record_failure()
+
+        clock.now = 30
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now = 60
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow() and breaker.allow()
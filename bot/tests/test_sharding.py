@@ -0,0 +1,335 @@
+"""
+Tests for the chat-sharded runner.
+"""
+
+import asyncio
+import multiprocessing
+import queue
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from ordering import UserOrderingMiddleware
+from sharding import (
+    ShardRouter, UpdateFeeder, build_front_app, chat_key, poll_updates,
+    run_until_first, run_worker
+)
+
+FACTORY = 'benchmarks.sharded_throughput:create_worker'
+
+
+def make_update(update_id, chat_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': str(update_id),
+        },
+    }
+
+
+class FakeRouter:
+    """Front-side router recording updates; full when accept is False."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.updates = []
+
+    async def route(self, update, timeout=None):
+        if self.accept:
+            self.updates.append(update)
+        return self.accept
+
+
+class TestChatKey:
+    """Tests for picking the chat of a raw update."""
+
+    @pytest.mark.parametrize('update, expected', [
+        (make_update(1, 10), 10),
+        ({'update_id': 1, 'callback_query': {
+            'from': {'id': 5}, 'message': {'chat': {'id': 11}}}}, 11),
+        ({'update_id': 1, 'callback_query': {'from': {'id': 5}}}, 5),
+        ({'update_id': 1, 'inline_query': {'from': {'id': 6}}}, 6),
+        ({'update_id': 1, 'poll_answer': {'user': {'id': 8}}}, 8),
+        ({'update_id': 1, 'my_chat_member': {'chat': {'id': -7}}}, -7),
+        ({'update_id': 9, 'poll': {'id': 'p'}}, 9),
+    ])
+    def test_chat_key(self, update, expected):
+        """Test the chat is found for different update kinds."""
+        assert chat_key(update) == expected
+
+
+class TestUpdateFeeder:
+    """Tests for bounded concurrent feeding."""
+
+    @pytest.mark.asyncio
+    async def test_limit_applies_backpressure(self):
+        """Test submit waits while the limit is reached."""
+        gate = asyncio.Event()
+
+        async def handle():
+            await gate.wait()
+
+        feeder = UpdateFeeder(limit=2)
+        await feeder.submit(handle)
+        await feeder.submit(handle)
+        third = asyncio.ensure_future(feeder.submit(handle))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+
+        gate.set()
+        await third
+        await feeder.drain()
+        assert feeder.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_isolated(self):
+        """Test a failed update does not stop the next one."""
+        handled = []
+
+        async def handle(n):
+            if n == 0:
+                raise RuntimeError('boom')
+            handled.append(n)
+
+        feeder = UpdateFeeder()
+        await feeder.submit(handle, 0)
+        await feeder.submit(handle, 1)
+        await feeder.drain()
+        assert handled == [1]
+
+
+class TestRunWorker:
+    """Tests for the worker loop."""
+
+    @pytest.mark.asyncio
+    async def test_worker_feeds_dispatcher(self):
+        """Test queued updates reach handlers in per-chat order."""
+        seen = []
+        router = Router()
+
+        @router.message()
+        async def record(message: Message):
+            seen.append((message.chat.id, message.message_id))
+
+        started = []
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        dispatcher.startup.register(lambda: started.append(True))
+        updates = queue.Queue()
+        for update_id in range(6):
+            updates.put(make_update(update_id, update_id % 2))
+        updates.put(None)
+        processed = multiprocessing.Value('q', 0)
+
+        await run_worker(updates, Bot('42:TEST'), dispatcher, 4, processed)
+
+        assert started == [True]
+        assert processed.value == 6
+        assert [n for chat, n in seen if chat == 0] == [0, 2, 4]
+        assert [n for chat, n in seen if chat == 1] == [1, 3, 5]
+
+
+    @pytest.mark.asyncio
+    async def test_flooding_chat_does_not_starve_others(self):
+        """Test the ordering middleware sheds a flood before it fills slots."""
+        seen = []
+        gate = asyncio.Event()
+        router = Router()
+
+        @router.message()
+        async def record(message: Message):
+            if message.chat.id == 1:
+                await gate.wait()
+            seen.append((message.chat.id, message.message_id))
+
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        ordering = UserOrderingMiddleware(max_queue_per_user=2)
+        dispatcher.update.outer_middleware(ordering)
+        updates = queue.Queue()
+        for update_id in range(10):
+            updates.put(make_update(update_id, 1))
+        updates.put(make_update(10, 2))
+        updates.put(None)
+
+        worker = asyncio.ensure_future(
+            run_worker(updates, Bot('42:TEST'), dispatcher, 4)
+        )
+        for _ in range(100):
+            if seen:
+                break
+            await asyncio.sleep(0.01)
+        assert seen == [(2, 10)]
+        gate.set()
+        await worker
+
+        assert seen[1:] == [(1, 0), (1, 1)]
+        assert ordering.stats['shed'] == 8
+
+
+class DeadProcess:
+    """Stand-in for a worker process that has exited."""
+
+    name = 'bot-worker-0'
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+class TestShardRouter:
+    """Tests for routing updates to worker queues."""
+
+    @pytest.mark.asyncio
+    async def test_same_chat_same_shard(self):
+        """Test a chat always maps to one shard."""
+        router = ShardRouter(FACTORY, workers=4, queue_size=10)
+        assert router.shard(make_update(1, 42)) == router.shard(make_update(2, 42))
+        assert {router.shard(make_update(1, chat)) for chat in range(8)} == {
+            0, 1, 2, 3
+        }
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self):
+        """Test routing waits on a full queue and gives up after timeout."""
+        router = ShardRouter(FACTORY, workers=1, queue_size=1)
+        assert await router.route(make_update(1, 1))
+        assert not await router.route(make_update(2, 1), timeout=0.02)
+        assert router.stats['rejected'] == 1
+
+        pending = asyncio.ensure_future(router.route(make_update(3, 1)))
+        await asyncio.sleep(0.02)
+        assert not pending.done()
+        router.queues[0].get(timeout=1)
+        assert await pending
+        assert router.stats['throttled'] > 0
+        assert router.stats['shard_0'] == 2
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_fails_fast(self):
+        """Test routing and supervision stop when a worker died."""
+        router = ShardRouter(FACTORY, workers=1, queue_size=1)
+        router.check_workers()
+        assert await router.route(make_update(1, 1))
+        router.processes = [DeadProcess()]
+
+        with pytest.raises(RuntimeError, match='exited'):
+            await router.route(make_update(2, 1))
+        with pytest.raises(RuntimeError):
+            await run_until_first(
+                router.supervise(interval=0.01), asyncio.Event().wait()
+            )
+        # A full queue of a dead worker does not block stopping
+        await router.stop(timeout=0.01)
+
+    @pytest.mark.asyncio
+    async def test_run_until_first(self):
+        """Test the other coroutines are cancelled when one finishes."""
+        other = asyncio.Event()
+
+        async def wait():
+            try:
+                await other.wait()
+            except asyncio.CancelledError:
+                other.set()
+                raise
+
+        await run_until_first(asyncio.sleep(0), wait())
+        assert other.is_set()
+
+    @pytest.mark.asyncio
+    async def test_worker_processes(self):
+        """Test real worker processes handle routed updates and stop."""
+        processed = multiprocessing.get_context('spawn').Value('q', 0)
+        router = ShardRouter(
+            FACTORY, workers=2, queue_size=10,
+            factory_kwargs={'render': 1}, processed=processed
+        )
+        router.start()
+        try:
+            for update_id in range(10):
+                await router.route(make_update(update_id, update_id % 3))
+        finally:
+            await router.stop(timeout=60)
+
+        assert processed.value == 10
+        assert not any(process.is_alive() for process in router.processes)
+
+
+class TestFront:
+    """Tests for the front process receiving updates."""
+
+    def test_webhook_front_requires_secret(self):
+        """Test the front refuses to serve updates without a secret."""
+        with pytest.raises(RuntimeError):
+            build_front_app(FakeRouter(), secret_token='')
+
+    @pytest.mark.asyncio
+    async def test_webhook_front(self):
+        """Test the webhook checks the secret and reports full queues."""
+        router = FakeRouter()
+        client = TestClient(TestServer(
+            build_front_app(router, path='/hook', secret_token='s')
+        ))
+        await client.start_server()
+        try:
+            headers = {'X-Telegram-Bot-Api-Secret-Token': 's'}
+            response = await client.post('/hook', json=make_update(1, 1))
+            assert response.status == 401
+
+            response = await client.post(
+                '/hook', json=make_update(1, 1), headers=headers
+            )
+            assert response.status == 200
+            assert router.updates == [make_update(1, 1)]
+
+            router.accept = False
+            response = await client.post(
+                '/hook', json=make_update(2, 1), headers=headers
+            )
+            assert response.status == 429
+        finally:
+            await client.close()
+
+    @pytest.mark.asyncio
+    async def test_polling_front(self):
+        """Test long polling routes raw updates and advances the offset."""
+        offsets = []
+        batches = [[make_update(5, 1), make_update(6, 2)], [make_update(7, 1)]]
+
+        async def get_updates(request):
+            offsets.append(request.query.get('offset'))
+            if not batches:
+                await asyncio.sleep(10)
+            return web.json_response({'ok': True, 'result': batches.pop(0)})
+
+        app = web.Application()
+        app.router.add_get('/bot42:TEST/getUpdates', get_updates)
+        server = TestServer(app)
+        await server.start_server()
+        router = FakeRouter()
+        polling = asyncio.ensure_future(poll_updates(
+            router, '42:TEST', api_url=str(server.make_url('')).rstrip('/')
+        ))
+        try:
+            for _ in range(100):
+                if len(router.updates) == 3:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            polling.cancel()
+            await asyncio.gather(polling, return_exceptions=True)
+            await server.close()
+
+        assert [u['update_id'] for u in router.updates] == [5, 6, 7]
+        assert offsets[:3] == [None, '7', '8']
@@ -0,0 +1,263 @@
+"""
+Tests for FSM and dialog state storage.
+"""
+
+import asyncio
+import base64
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+from aiogram.fsm.storage.base import DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+from fakeredis.aioredis import FakeRedis
+
+import storage as storage_module
+from states import AddTaskSG
+from storage import (
+    WriteBackStorage, build_storage, compact_dumps, compact_loads
+)
+
+KEY = StorageKey(bot_id=42, chat_id=1, user_id=1)
+
+DIALOG_DATA = {
+    'title': 'Купить молоко',
+    'description': 'В магазине у дома',
+    'due_date': None,
+}
+
+
+class CountingStorage(MemoryStorage):
+    """Memory storage counting calls to it."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    async def set_state(self, key, state=None):
+        self.calls.append('set_state')
+        await super().set_state(key, state)
+
+    async def get_state(self, key):
+        self.calls.append('get_state')
+        return await super().get_state(key)
+
+    async def set_data(self, key, data):
+        self.calls.append('set_data')
+        await super().set_data(key, data)
+
+    async def get_data(self, key):
+        self.calls.append('get_data')
+        return await super().get_data(key)
+
+
+class FailingStorage(CountingStorage):
+    """Counting storage whose first `failures` writes raise."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    async def set_state(self, key, state=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('redis is down')
+        await super().set_state(key, state)
+
+
+class TestCompactSerialization:
+    """Tests for compact state serialization."""
+
+    def test_round_trip_is_smaller(self):
+        """Test Cyrillic data is stored without escapes or spaces."""
+        value = compact_dumps(DIALOG_DATA)
+        assert compact_loads(value) == DIALOG_DATA
+        assert len(value.encode()) < len(json.dumps(DIALOG_DATA))
+        assert 'Купить' in value
+
+    def test_large_payload_compressed(self):
+        """Test payloads above the threshold are compressed."""
+        data = {'tasks': [DIALOG_DATA] * 100}
+        value = compact_dumps(data)
+        assert value.startswith('z:')
+        assert len(value) < len(json.dumps(data, ensure_ascii=False)) / 5
+        assert compact_loads(value) == data
+
+    def test_incompressible_payload_kept(self):
+        """Test compression is skipped when it does not help."""
+        data = {'noise': base64.b85encode(os.urandom(2048)).decode()}
+        assert compact_loads(compact_dumps(data)) == data
+        assert not compact_dumps(data).startswith('z:')
+
+
+class TestRedisStorage:
+    """Tests for the Redis storage configuration."""
+
+    @pytest.fixture
+    async def redis_storage(self):
+        storage = RedisStorage(
+            FakeRedis(),
+            key_builder=DefaultKeyBuilder(with_destiny=True),
+            state_ttl=60,
+            data_ttl=120,
+            json_dumps=compact_dumps,
+            json_loads=compact_loads,
+        )
+        yield storage
+        await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_state_survives_new_instance(self, redis_storage):
+        """Test another process sees the state and data, with TTLs."""
+        await redis_storage.set_state(KEY, AddTaskSG.description)
+        await redis_storage.set_data(KEY, DIALOG_DATA)
+
+        other = RedisStorage(
+            redis_storage.redis,
+            key_builder=redis_storage.key_builder,
+            json_loads=compact_loads,
+        )
+        assert await other.get_state(KEY) == AddTaskSG.description.state
+        assert await other.get_data(KEY) == DIALOG_DATA
+
+        builder = redis_storage.key_builder
+        assert 0 < await redis_storage.redis.ttl(builder.build(KEY, 'state')) <= 60
+        assert 60 < await redis_storage.redis.ttl(builder.build(KEY, 'data')) <= 120
+
+    @pytest.mark.asyncio
+    async def test_build_storage(self):
+        """Test the storage is chosen by configuration."""
+        assert isinstance(build_storage(), MemoryStorage)
+
+        with patch.object(storage_module, 'BOT_STORAGE', 'redis'):
+            redis_storage = build_storage()
+            assert isinstance(redis_storage, RedisStorage)
+            assert redis_storage.key_builder.with_destiny
+            assert redis_storage.data_ttl == storage_module.FSM_DATA_TTL_SECONDS
+            await redis_storage.close()
+
+            with patch.object(storage_module, 'FSM_WRITE_BACK', True):
+                buffered = build_storage()
+                assert isinstance(buffered, WriteBackStorage)
+                assert isinstance(buffered.storage, RedisStorage)
+                await buffered.close()
+
+
+class TestWriteBackStorage:
+    """Tests for the local write-back buffer."""
+
+    @pytest.fixture
+    def backend(self):
+        return CountingStorage()
+
+    @pytest.mark.asyncio
+    async def test_reads_served_locally(self, backend):
+        """Test only the first read reaches the wrapped storage."""
+        await backend.set_data(KEY, DIALOG_DATA)
+        backend.calls.clear()
+        buffered = WriteBackStorage(backend, flush_interval=60)
+
+        for _ in range(3):
+            assert await buffered.get_data(KEY) == DIALOG_DATA
+            assert await buffered.get_state(KEY) is None
+
+        assert backend.calls == ['get_data', 'get_state']
+
+    @pytest.mark.asyncio
+    async def test_writes_batched(self, backend):
+        """Test transitions are flushed once after the interval."""
+        buffered = WriteBackStorage(backend, flush_interval=0.01)
+        for state in (AddTaskSG.title, AddTaskSG.description, AddTaskSG.confirm):
+            await buffered.set_state(KEY, state)
+            await buffered.update_data(KEY, {'step': state.state})
+        assert backend.calls == ['get_data']
+
+        await asyncio.sleep(0.05)
+
+        assert backend.calls.count('set_state') == 1
+        assert backend.calls.count('set_data') == 1
+        assert await backend.get_state(KEY) == AddTaskSG.confirm.state
+        assert await backend.get_data(KEY) == {'step': AddTaskSG.confirm.state}
+
+    @pytest.mark.asyncio
+    async def test_returned_data_is_a_copy(self, backend):
+        """Test callers cannot change buffered data in place."""
+        buffered = WriteBackStorage(backend, flush_interval=60)
+        await buffered.set_data(KEY, {'title': 'a'})
+        data = await buffered.get_data(KEY)
+        data['title'] = 'b'
+        assert await buffered.get_data(KEY) == {'title': 'a'}
+        await buffered.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes(self, backend):
+        """Test pending writes reach the storage on shutdown."""
+        buffered = WriteBackStorage(backend, flush_interval=60)
+        await buffered.set_state(KEY, AddTaskSG.title)
+        await buffered.set_data(KEY, DIALOG_DATA)
+
+        await buffered.close()
+
+        assert await backend.get_state(KEY) == AddTaskSG.title.state
+        assert await backend.get_data(KEY) == DIALOG_DATA
+
+    @pytest.mark.asyncio
+    async def test_clean_entries_evicted(self, backend):
+        """Test the buffer drops flushed entries beyond max_keys."""
+        buffered = WriteBackStorage(backend, flush_interval=60, max_keys=2)
+        for chat_id in range(3):
+            key = StorageKey(bot_id=42, chat_id=chat_id, user_id=chat_id)
+            await buffered.set_state(key, AddTaskSG.title)
+        await buffered.flush()
+
+        assert buffered._states == {}
+        key = StorageKey(bot_id=42, chat_id=2, user_id=2)
+        assert await buffered.get_state(key) == AddTaskSG.title.state
+        await buffered.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_write_kept_dirty(self):
+        """Test a failed flush keeps the changes for the next one."""
+        backend = FailingStorage(failures=1)
+        buffered = WriteBackStorage(backend, flush_interval=60)
+        await buffered.set_state(KEY, AddTaskSG.title)
+
+        with pytest.raises(ConnectionError):
+            await buffered.flush()
+        assert buffered._dirty_states == {KEY}
+
+        await buffered.close()
+        assert await backend.get_state(KEY) == AddTaskSG.title.state
+
+    @pytest.mark.asyncio
+    async def test_flusher_logs_and_retries(self, caplog):
+        """Test background flush errors are logged and retried."""
+        backend = FailingStorage(failures=1)
+        buffered = WriteBackStorage(backend, flush_interval=0.01)
+        await buffered.set_state(KEY, AddTaskSG.title)
+
+        await asyncio.sleep(0.05)
+
+        assert 'FSM write-back flush failed' in caplog.text
+        assert await backend.get_state(KEY) == AddTaskSG.title.state
+        assert buffered._dirty_states == set()
+
+    @pytest.mark.asyncio
+    async def test_change_during_write_stays_dirty(self, backend):
+        """Test data changed while it is being written is flushed again."""
+        buffered = WriteBackStorage(backend, flush_interval=60)
+        await buffered.set_data(KEY, {'step': 1})
+        original = backend.set_data
+
+        async def set_data(key, data):
+            await buffered.set_data(KEY, {'step': 2})
+            await original(key, data)
+
+        with patch.object(backend, 'set_data', set_data):
+            await buffered.flush()
+        assert buffered._dirty_data == {KEY}
+
+        await buffered.close()
+        assert await backend.get_data(KEY) == {'step': 2}
@@ -0,0 +1,202 @@
+"""
+Tests for outbound rate limiting.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, EditMessageText, SendMessage
+
+from throttling import (
+    BULK, INTERACTIVE, OutboundRateLimiter, PriorityGate, TokenBucket,
+    bulk_sends, is_limited, send_priority
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def send(chat_id, text='hi'):
+    return SendMessage(chat_id=chat_id, text=text)
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_burst_then_rate(self):
+        """Test capacity is available at once, then tokens refill at rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        for _ in range(2):
+            assert bucket.delay() == 0
+            bucket.consume()
+        assert bucket.delay() == pytest.approx(0.5)
+
+        clock.now += 0.5
+        assert bucket.delay() == 0
+        clock.now += 10
+        bucket.consume()
+        # Refill stops at capacity
+        assert bucket.tokens == pytest.approx(1)
+
+    def test_pause(self):
+        """Test a paused bucket waits even with tokens left."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=5, clock=clock)
+
+        bucket.pause(3)
+        assert bucket.delay() == pytest.approx(3)
+        assert not bucket.idle
+        clock.now += 3
+        assert bucket.idle
+
+
+class TestPriorityGate:
+    """Tests for PriorityGate."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_before_bulk(self):
+        """Test queued interactive requests overtake queued bulk ones."""
+        gate = PriorityGate(TokenBucket(rate=100, capacity=1))
+        order = []
+
+        async def request(name, priority):
+            queued = await gate.acquire(priority)
+            order.append((name, queued))
+
+        await request('first', INTERACTIVE)
+        await asyncio.gather(
+            request('bulk-1', BULK),
+            request('bulk-2', BULK),
+            request('reply', INTERACTIVE),
+        )
+
+        assert order == [
+            ('first', False),
+            ('reply', True), ('bulk-1', True), ('bulk-2', True),
+        ]
+        assert gate.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_skipped(self):
+        """Test a cancelled request does not take a token."""
+        gate = PriorityGate(TokenBucket(rate=50, capacity=1))
+        await gate.acquire()
+
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await gate.acquire()
+
+        assert gate.waiting == 0
+
+
+class TestOutboundRateLimiter:
+    """Tests for the session middleware."""
+
+    def test_limited_methods(self):
+        """Test only message sends and edits count against the limits."""
+        assert is_limited(send(1))
+        assert is_limited(EditMessageText(text='x', inline_message_id='m'))
+        assert not is_limited(AnswerCallbackQuery(callback_query_id='1'))
+
+    @pytest.mark.asyncio
+    async def test_per_chat_limit_does_not_block_other_chats(self):
+        """Test a busy chat queues while another chat is sent at once."""
+        limiter = OutboundRateLimiter(
+            global_rate=1000, chat_rate=20, chat_burst=1
+        )
+        sent = []
+
+        async def make_request(bot, method):
+            sent.append(method.chat_id)
+            return 'ok'
+
+        results = await asyncio.gather(
+            limiter(make_request, None, send(1)),
+            limiter(make_request, None, send(1)),
+            limiter(make_request, None, send(2)),
+        )
+
+        assert results == ['ok'] * 3
+        assert sent == [1, 2, 1]
+        assert limiter.stats['queued'] == 1
+        assert limiter.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_groups_use_group_rate(self):
+        """Test negative and @username chat ids get the group bucket."""
+        limiter = OutboundRateLimiter(chat_rate=1, group_rate=0.25)
+
+        assert limiter.chat_gate(5).bucket.rate == 1
+        assert limiter.chat_gate(-100).bucket.rate == 0.25
+        assert limiter.chat_gate('@channel').bucket.rate == 0.25
+
+    @pytest.mark.asyncio
+    async def test_unlimited_method_passes_through(self):
+        """Test callback answers are not queued."""
+        limiter = OutboundRateLimiter(global_rate=1)
+        make_request = AsyncMock(return_value=True)
+
+        for n in range(5):
+            await limiter(
+                make_request, None, AnswerCallbackQuery(callback_query_id=str(n))
+            )
+
+        assert make_request.await_count == 5
+        assert limiter.stats['queued'] == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_retried(self):
+        """Test a 429 pauses the chat and the request is sent again."""
+        limiter = OutboundRateLimiter(global_rate=1000, chat_rate=1000)
+        method = send(1)
+        make_request = AsyncMock(side_effect=[
+            TelegramRetryAfter(method, 'Too Many Requests', retry_after=0.05),
+            'ok',
+        ])
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await limiter(make_request, None, method)
+
+        assert result == 'ok'
+        assert loop.time() - started >= 0.04
+        assert limiter.stats['retry_after'] == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_gives_up(self):
+        """Test the error reaches the caller once retries run out."""
+        limiter = OutboundRateLimiter(global_rate=1000, max_retries=1)
+        method = EditMessageText(text='x', inline_message_id='m')
+        error = TelegramRetryAfter(method, 'Too Many Requests', retry_after=0.01)
+        make_request = AsyncMock(side_effect=error)
+
+        with pytest.raises(TelegramRetryAfter):
+            await limiter(make_request, None, method)
+
+        assert make_request.await_count == 2
+        assert limiter.global_gate.bucket.blocked_until > 0
+
+    def test_idle_chats_forgotten(self):
+        """Test full, unpaused chat buckets are dropped at max_chats."""
+        limiter = OutboundRateLimiter(max_chats=2)
+        limiter.chat_gate(1)
+        limiter.chat_gate(2).bucket.pause(60)
+        limiter.chat_gate(3)
+
+        assert set(limiter._chats) == {2, 3}
+
+    def test_bulk_sends(self):
+        """Test bulk_sends lowers the priority only inside the block."""
+        with bulk_sends():
+            assert send_priority.get() == BULK
+        assert send_priority.get() == INTERACTIVE
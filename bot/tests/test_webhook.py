@@ -0,0 +1,241 @@
+"""
+Tests for webhook mode, with a local fake Telegram posting updates.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+import webhook
+from webhook import BoundedRequestHandler, build_app, register_webhook
+
+SECRET = 'webhook-secret'
+
+
+def make_update(update_id):
+    """Telegram update with a text message."""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': 1, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'Test'},
+            'text': f'message {update_id}',
+        },
+    }
+
+
+class Recorder:
+    """Message handler that records updates, optionally held by a gate."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.seen = []
+        self.running = 0
+        self.max_running = 0
+
+    async def handle(self, message: Message):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.gate.wait()
+            if message.text == 'message 0':
+                raise RuntimeError('handler failure')
+            self.seen.append(message.message_id)
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+async def telegram(recorder):
+    """Fake Telegram: a client posting updates to the webhook app."""
+    router = Router()
+    router.message()(recorder.handle)
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    bot = Bot('42:TEST')
+    app = build_app(
+        dispatcher, bot, path='/hook', secret_token=SECRET, max_concurrency=2
+    )
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+async def post_update(client, update, secret=SECRET):
+    return await client.post(
+        '/hook',
+        json=update,
+        headers={'X-Telegram-Bot-Api-Secret-Token': secret}
+    )
+
+
+async def settle(recorder, count):
+    for _ in range(100):
+        if len(recorder.seen) >= count:
+            return
+        await asyncio.sleep(0.01)
+
+
+class TestWebhook:
+    """Tests for the webhook app."""
+
+    @pytest.mark.asyncio
+    async def test_update_processed(self, telegram, recorder):
+        """Test a posted update reaches the handlers."""
+        response = await post_update(telegram, make_update(1))
+        assert response.status == 200
+        await settle(recorder, 1)
+        assert recorder.seen == [1]
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_rejected(self, telegram, recorder):
+        """Test updates without the secret token are refused."""
+        response = await post_update(telegram, make_update(1), secret='wrong')
+        assert response.status == 401
+        response = await telegram.post('/hook', json=make_update(2))
+        assert response.status == 401
+        await asyncio.sleep(0.05)
+        assert recorder.seen == []
+
+    @pytest.mark.asyncio
+    async def test_answers_before_processing(self, telegram, recorder):
+        """Test Telegram gets its response while handlers still run."""
+        recorder.gate.clear()
+        response = await post_update(telegram, make_update(1))
+        assert response.status == 200
+        assert recorder.seen == []
+
+        recorder.gate.set()
+        await settle(recorder, 1)
+        assert recorder.seen == [1]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self, telegram, recorder):
+        """Test no more than max_concurrency updates run at once."""
+        recorder.gate.clear()
+        for update_id in range(1, 6):
+            await post_update(telegram, make_update(update_id))
+        await asyncio.sleep(0.05)
+        assert recorder.running == 2
+
+        recorder.gate.set()
+        await settle(recorder, 5)
+        assert sorted(recorder.seen) == [1, 2, 3, 4, 5]
+        assert recorder.max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_isolated(self, telegram, recorder):
+        """Test a failing update does not affect the next ones."""
+        await post_update(telegram, make_update(0))
+        await post_update(telegram, make_update(1))
+        await settle(recorder, 1)
+        assert recorder.seen == [1]
+
+    @pytest.mark.asyncio
+    async def test_health(self, telegram):
+        """Test the load balancer health check."""
+        response = await telegram.get('/healthz')
+        assert response.status == 200
+        assert await response.json() == {'status': 'ok'}
+
+
+class TestBoundedRequestHandler:
+    """Tests for shutdown and webhook registration."""
+
+    @pytest.mark.asyncio
+    async def test_close_drains_updates(self, recorder):
+        """Test shutdown waits for accepted updates, then cancels."""
+        router = Router()
+        router.message()(recorder.handle)
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        bot = Bot('42:TEST')
+        handler = BoundedRequestHandler(
+            dispatcher, bot, max_concurrency=1, drain_timeout=0.05
+        )
+        recorder.gate.clear()
+        for update_id in (1, 2):
+            task = asyncio.create_task(
+                handler._background_feed_update(bot, make_update(update_id))
+            )
+            handler._background_feed_update_tasks.add(task)
+            task.add_done_callback(handler._background_feed_update_tasks.discard)
+        await asyncio.sleep(0)
+        assert handler.pending == 2
+
+        await handler.close()
+
+        assert recorder.seen == []
+        assert handler.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_register_webhook(self):
+        """Test startup points Telegram at the deployment."""
+        bot = AsyncMock()
+        dispatcher = Dispatcher()
+        with patch.multiple(
+            webhook, WEBHOOK_BASE_URL='https://bot.example.com/',
+            WEBHOOK_SECRET=SECRET
+        ):
+            await register_webhook(bot, dispatcher)
+
+        kwargs = bot.set_webhook.call_args.kwargs
+        assert kwargs['url'] == 'https://bot.example.com/telegram/webhook'
+        assert kwargs['secret_token'] == SECRET
+
+    @pytest.mark.asyncio
+    async def test_run_webhook_requires_url(self):
+        """Test webhook mode refuses to start without a public URL."""
+        with patch.object(webhook, 'WEBHOOK_BASE_URL', ''):
+            with pytest.raises(RuntimeError):
+                await webhook.run_webhook(Dispatcher(), AsyncMock())
+
+    @pytest.mark.asyncio
+    async def test_run_webhook_requires_secret(self):
+        """Test webhook mode refuses to start without a secret token."""
+        bot = AsyncMock()
+        with patch.multiple(
+            webhook, WEBHOOK_BASE_URL='https://bot.example.com',
+            WEBHOOK_SECRET=''
+        ):
+            with pytest.raises(RuntimeError, match='WEBHOOK_SECRET'):
+                await webhook.run_webhook(Dispatcher(), bot)
+            with pytest.raises(RuntimeError):
+                build_app(Dispatcher(), bot, secret_token='')
+            with pytest.raises(RuntimeError):
+                await register_webhook(bot, Dispatcher())
+
+        bot.set_webhook.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_run_webhook(self):
+        """Test the server registers the webhook and stops when cancelled."""
+        bot = AsyncMock()
+        with patch.multiple(
+            webhook, WEBHOOK_BASE_URL='https://bot.example.com',
+            WEBHOOK_SECRET=SECRET, WEBHOOK_HOST='127.0.0.1', WEBHOOK_PORT=0
+        ):
+            server = asyncio.create_task(webhook.run_webhook(Dispatcher(), bot))
+            for _ in range(100):
+                if bot.set_webhook.called:
+                    break
+                await asyncio.sleep(0.01)
+            server.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await server
+
+        bot.set_webhook.assert_called_once()
+        bot.session.close.assert_called_once()
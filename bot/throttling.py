@@ -0,0 +1,243 @@
+"""
+Outbound rate limiting for requests the bot sends to Telegram.
+
+Telegram allows about 30 messages per second across all chats, one per
+second in a private chat and 20 per minute in a group; beyond that it
+answers 429 with retry_after. The session middleware below keeps sends
+under those limits with token buckets, queues what does not fit yet,
+and on a 429 pauses the chat for retry_after seconds and resends the
+request, so handlers never see TelegramRetryAfter unless retries run
+out. Replies to the user go ahead of bulk sends queued with
+bulk_sends().
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware, NextRequestMiddlewareType
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_GLOBAL_RATE = float(os.environ.get('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_CHAT_RATE = float(os.environ.get('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_GROUP_RATE = float(os.environ.get('OUTBOUND_GROUP_RATE', '0.33'))
+OUTBOUND_CHAT_BURST = int(os.environ.get('OUTBOUND_CHAT_BURST', '3'))
+OUTBOUND_MAX_RETRIES = int(os.environ.get('OUTBOUND_MAX_RETRIES', '3'))
+
+INTERACTIVE = 0
+BULK = 1
+
+# Methods that post or change messages count against the limits
+LIMITED_PREFIXES = ('send', 'copy', 'forward', 'edit')
+UNLIMITED_METHODS = {'sendChatAction'}
+
+send_priority: ContextVar[int] = ContextVar('send_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def bulk_sends() -> Iterator[None]:
+    """Sends made inside the block yield to interactive replies."""
+    token = send_priority.set(BULK)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+def is_limited(method: TelegramMethod) -> bool:
+    name = method.__api_method__
+    return name.startswith(LIMITED_PREFIXES) and name not in UNLIMITED_METHODS
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second up to `capacity`; pause() blocks it entirely
+    for a while, e.g. for a retry_after.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self) -> float:
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        return now
+
+    def delay(self) -> float:
+        """Seconds until a token can be taken."""
+        now = self._refill()
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        """Full and not paused: forgetting it changes nothing."""
+        return self.delay() == 0 and self.tokens >= self.capacity
+
+
+class PriorityGate:
+    """
+    Hands out a bucket's tokens to waiting requests, lower priority value
+    first and in arrival order within a priority.
+    """
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: int = INTERACTIVE) -> bool:
+        """Take a token; True if the request had to queue for it."""
+        if not self._waiters and self.bucket.delay() == 0:
+            self.bucket.consume()
+            return False
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), turn))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.ensure_future(self._run())
+        await turn
+        return True
+
+    async def _run(self) -> None:
+        while self._waiters:
+            delay = self.bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, turn = heapq.heappop(self._waiters)
+            # Cancelled while waiting
+            if turn.done():
+                continue
+            self.bucket.consume()
+            turn.set_result(None)
+
+
+class OutboundRateLimiter(BaseRequestMiddleware):
+    """
+    Bot session middleware enforcing Telegram's send limits.
+
+    A limited request first waits for its chat's bucket (a negative or
+    @username chat id is a group), then for the global one. On
+    TelegramRetryAfter the chat (or, without a chat, everything) is
+    paused for retry_after seconds and the request is queued again, at
+    most `max_retries` times. `stats` counts queued requests and 429s.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = OUTBOUND_GLOBAL_RATE,
+        chat_rate: float = OUTBOUND_CHAT_RATE,
+        group_rate: float = OUTBOUND_GROUP_RATE,
+        chat_burst: int = OUTBOUND_CHAT_BURST,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        max_chats: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self.clock = clock
+        self.global_gate = PriorityGate(
+            TokenBucket(global_rate, global_rate, clock)
+        )
+        self._chats: Dict[Union[int, str], PriorityGate] = {}
+        self.stats: Counter = Counter()
+
+    def chat_gate(self, chat_id: Union[int, str]) -> PriorityGate:
+        gate = self._chats.get(chat_id)
+        if gate is None:
+            if len(self._chats) >= self.max_chats:
+                self._forget_idle()
+            group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if group else self.chat_rate
+            gate = PriorityGate(TokenBucket(rate, self.chat_burst, self.clock))
+            self._chats[chat_id] = gate
+        return gate
+
+    def _forget_idle(self) -> None:
+        for chat_id, gate in list(self._chats.items()):
+            if not gate.waiting and gate.bucket.idle:
+                del self._chats[chat_id]
+
+    @property
+    def waiting(self) -> int:
+        """Requests queued for a token."""
+        return self.global_gate.waiting + sum(
+            gate.waiting for gate in self._chats.values()
+        )
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not is_limited(method):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, 'chat_id', None)
+        priority = send_priority.get()
+        retries = 0
+        while True:
+            queued = chat_id is not None and (
+                await self.chat_gate(chat_id).acquire(priority)
+            )
+            if await self.global_gate.acquire(priority) or queued:
+                self.stats['queued'] += 1
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.stats['retry_after'] += 1
+                gate = self.global_gate if chat_id is None else (
+                    self.chat_gate(chat_id)
+                )
+                gate.bucket.pause(e.retry_after)
+                if retries >= self.max_retries:
+                    raise
+                retries += 1
+                logger.warning(
+                    f"{method.__api_method__} to {chat_id} hit flood control, "
+                    f"retrying in {e.retry_after}s"
+                )
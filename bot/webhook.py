@@ -0,0 +1,152 @@
+"""
+Webhook mode: an embedded aiohttp server receiving updates from Telegram.
+
+Updates are acknowledged immediately and processed in the background, at
+most WEBHOOK_MAX_CONCURRENCY at a time. Every replica behind a load
+balancer serves the same path, and requests without the secret token are
+rejected; webhook mode does not start without WEBHOOK_SECRET.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import (
+    SimpleRequestHandler, setup_application
+)
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BASE_URL = os.environ.get('WEBHOOK_BASE_URL', '')
+WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', '/telegram/webhook')
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')
+WEBHOOK_HOST = os.environ.get('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.environ.get('WEBHOOK_PORT', '8080'))
+WEBHOOK_MAX_CONCURRENCY = int(os.environ.get('WEBHOOK_MAX_CONCURRENCY', '100'))
+WEBHOOK_DRAIN_SECONDS = float(os.environ.get('WEBHOOK_DRAIN_SECONDS', '10'))
+HEALTH_PATH = '/healthz'
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Background webhook handler with a limit on updates processed at once.
+
+    Telegram gets its response as soon as the update is read; updates
+    beyond the limit wait for a free slot. On shutdown the handler waits
+    up to `drain_timeout` seconds for accepted updates to finish.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+        drain_timeout: float = WEBHOOK_DRAIN_SECONDS,
+        **kwargs: Any
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.drain_timeout = drain_timeout
+
+    async def _background_feed_update(
+        self,
+        bot: Bot,
+        update: Dict[str, Any]
+    ) -> None:
+        async with self.semaphore:
+            try:
+                await super()._background_feed_update(bot, update)
+            except Exception:
+                logger.exception(
+                    f"Failed to process update {update.get('update_id')}"
+                )
+
+    @property
+    def pending(self) -> int:
+        """Accepted updates not processed yet."""
+        return len(self._background_feed_update_tasks)
+
+    async def close(self) -> None:
+        tasks = set(self._background_feed_update_tasks)
+        if tasks:
+            logger.info(f"Waiting for {len(tasks)} updates to finish")
+            _, unfinished = await asyncio.wait(tasks, timeout=self.drain_timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        await super().close()
+
+
+def require_secret(secret_token: str) -> str:
+    """The secret token; without one anybody could post forged updates."""
+    if not secret_token:
+        raise RuntimeError("WEBHOOK_SECRET is required in webhook mode")
+    return secret_token
+
+
+def check_settings() -> None:
+    """Refuse to start webhook mode without a public URL or a secret."""
+    if not WEBHOOK_BASE_URL:
+        raise RuntimeError("WEBHOOK_BASE_URL is required in webhook mode")
+    require_secret(WEBHOOK_SECRET)
+
+
+async def health(request: web.Request) -> web.Response:
+    """Liveness probe for the load balancer."""
+    return web.json_response({'status': 'ok'})
+
+
+def build_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    path: str = WEBHOOK_PATH,
+    secret_token: str = WEBHOOK_SECRET,
+    max_concurrency: int = WEBHOOK_MAX_CONCURRENCY
+) -> web.Application:
+    """aiohttp app serving the webhook path and a health check."""
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher,
+        bot,
+        max_concurrency=max_concurrency,
+        secret_token=require_secret(secret_token)
+    ).register(app, path=path)
+    app.router.add_get(HEALTH_PATH, health)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def register_webhook(bot: Bot, dispatcher: Dispatcher) -> None:
+    """
+    Point Telegram at this deployment (Dispatcher startup).
+
+    The webhook is not removed on shutdown: other replicas keep serving it.
+    """
+    await bot.set_webhook(
+        url=WEBHOOK_BASE_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=require_secret(WEBHOOK_SECRET),
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        # Telegram accepts 1-100 simultaneous connections
+        max_connections=min(WEBHOOK_MAX_CONCURRENCY, 100),
+    )
+    logger.info(f"Webhook set to {WEBHOOK_BASE_URL}{WEBHOOK_PATH}")
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """Serve the webhook until cancelled."""
+    check_settings()
+    dispatcher.startup.register(register_webhook)
+
+    runner = web.AppRunner(
+        build_app(dispatcher, bot, secret_token=WEBHOOK_SECRET)
+    )
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logger.info(f"Listening for updates on {WEBHOOK_HOST}:{WEBHOOK_PORT}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()